@@ -0,0 +1,45 @@
+"""acceso_diario counter
+
+Revision ID: 3b8e1f4a9c21
+Revises: 99dd97e8c086
+Create Date: 2026-10-17 09:12:40.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8e1f4a9c21'
+down_revision: Union[str, Sequence[str], None] = '99dd97e8c086'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1️⃣ Contador de asistencias por (cliente, día)
+    op.create_table(
+        'acceso_diario',
+        sa.Column('id_cliente', sa.Integer(), nullable=False),
+        sa.Column('fecha', sa.Date(), nullable=False),
+        sa.Column('accesos', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['id_cliente'], ['cliente.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id_cliente', 'fecha'),
+    )
+
+    # 2️⃣ Backfill desde el histórico de asistencia
+    op.execute("""
+        INSERT INTO acceso_diario (id_cliente, fecha, accesos)
+        SELECT id_cliente, DATE(fecha_hora_entrada), COUNT(*)
+        FROM asistencia
+        WHERE id_cliente IS NOT NULL AND fecha_hora_entrada IS NOT NULL
+        GROUP BY id_cliente, DATE(fecha_hora_entrada)
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('acceso_diario')
@@ -0,0 +1,47 @@
+"""hot path indexes
+
+Revision ID: 5c2d7e9b4f13
+Revises: 3b8e1f4a9c21
+Create Date: 2026-10-17 10:03:18.742519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c2d7e9b4f13'
+down_revision: Union[str, Sequence[str], None] = '3b8e1f4a9c21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (nombre, tabla, columnas) — ver app/check_indexes.py para la consulta de cada uno
+INDICES = [
+    # AsistenciaRepository: filtros por cliente + rango de fechas
+    ('ix_asistencia_cliente_fecha', 'asistencia', ['id_cliente', 'fecha_hora_entrada']),
+    # AsistenciaRepository: filtros por sede + rango de fechas
+    ('ix_asistencia_sede_fecha', 'asistencia', ['id_sede', 'fecha_hora_entrada']),
+    # ReportesService: conteos/series por rango con id_venta IS NOT NULL (cubriente)
+    ('ix_asistencia_fecha_venta', 'asistencia', ['fecha_hora_entrada', 'id_venta']),
+    # find_active_for_client / snapshot de acceso: venta vigente más reciente
+    ('ix_venta_membresia_cliente_fin', 'venta_membresia', ['id_cliente', 'fecha_fin']),
+    # list_membership_summaries_paginated / resumen_membresias: última venta
+    # por fecha_inicio (cubriente para el MAX y la ventana)
+    ('ix_venta_membresia_cliente_inicio', 'venta_membresia', ['id_cliente', 'fecha_inicio', 'fecha_fin']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for nombre, tabla, columnas in INDICES:
+        op.create_index(nombre, tabla, columnas, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Las FKs conservan su índice propio (creado con la tabla)
+    for nombre, tabla, _ in reversed(INDICES):
+        op.drop_index(nombre, table_name=tabla)
@@ -0,0 +1,54 @@
+"""asistencia_diaria rollup
+
+Revision ID: 8e4a6c1d2b57
+Revises: 5c2d7e9b4f13
+Create Date: 2026-10-17 15:41:08.527316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e4a6c1d2b57'
+down_revision: Union[str, Sequence[str], None] = '5c2d7e9b4f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1️⃣ Rollup de asistencias por (día, sede, permitido, con_venta)
+    #    (fecha encabeza la PK: los reportes leen rangos de días)
+    op.create_table(
+        'asistencia_diaria',
+        sa.Column('fecha', sa.Date(), nullable=False),
+        sa.Column('id_sede', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('permitido', sa.Boolean(), nullable=False),
+        sa.Column('con_venta', sa.Boolean(), nullable=False),
+        sa.Column('total', sa.Integer(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('fecha', 'id_sede', 'permitido', 'con_venta'),
+    )
+
+    # 2️⃣ Backfill desde el histórico de asistencia
+    op.execute("""
+        INSERT INTO asistencia_diaria (id_sede, fecha, permitido, con_venta, total)
+        SELECT COALESCE(id_sede, 0), DATE(fecha_hora_entrada),
+               motivo_error IS NULL, id_venta IS NOT NULL, COUNT(*)
+        FROM asistencia
+        WHERE fecha_hora_entrada IS NOT NULL
+        GROUP BY COALESCE(id_sede, 0), DATE(fecha_hora_entrada),
+                 motivo_error IS NULL, id_venta IS NOT NULL
+    """)
+
+    # 3️⃣ Los reportes leen el rollup: (fecha_hora_entrada, id_venta) ya no
+    #    sirve a ninguna consulta (la reconstrucción por días usa ix_asistencia_sede_fecha)
+    op.drop_index('ix_asistencia_fecha_venta', table_name='asistencia')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_asistencia_fecha_venta', 'asistencia', ['fecha_hora_entrada', 'id_venta'])
+    op.drop_table('asistencia_diaria')
@@ -0,0 +1,156 @@
+"""cliente.id_venta_actual
+
+Revision ID: a91f3e7c5d08
+Revises: 8e4a6c1d2b57
+Create Date: 2026-10-17 17:22:51.904163
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a91f3e7c5d08'
+down_revision: Union[str, Sequence[str], None] = '8e4a6c1d2b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Purga de huellas con la misma regla que d387b37e9436: la venta de
+# MAX(fecha_fin) de cada cliente vencida hace más de 3 meses (NO la de
+# id_venta_actual, que es la de fecha_inicio más reciente). El anti-join
+# (sonda sobre ix_venta_membresia_cliente_fin) reemplaza el GROUP BY de
+# toda venta_membresia; los empates en fecha_fin se registran igual que antes.
+SP_PURGAR = """
+CREATE PROCEDURE sp_purgar_huellas_por_vencimiento_3m()
+BEGIN
+  INSERT INTO huella_purgada_log (
+    cliente_id, venta_membresia_id, fecha_fin_ultima_membresia,
+    id_huella_prev, tenia_template, nombre, apellido, documento, correo, motivo
+  )
+  SELECT
+    c.id,
+    vm.id,
+    vm.fecha_fin,
+    c.id_huella,
+    (c.huella_template IS NOT NULL AND LENGTH(c.huella_template) > 0),
+    c.nombre, c.apellido, c.documento, c.correo,
+    'VENCIDO_3_MESES'
+  FROM cliente c
+  JOIN venta_membresia vm ON vm.id_cliente = c.id
+  WHERE (c.id_huella IS NOT NULL OR c.huella_template IS NOT NULL)
+    AND vm.fecha_fin IS NOT NULL
+    AND vm.fecha_fin < (CURDATE() - INTERVAL 3 MONTH)
+    AND NOT EXISTS (
+      SELECT 1 FROM venta_membresia v2
+      WHERE v2.id_cliente = c.id
+        AND v2.fecha_fin > vm.fecha_fin
+    );
+
+  UPDATE cliente c
+  JOIN venta_membresia vm ON vm.id_cliente = c.id
+  SET c.id_huella = NULL,
+      c.huella_template = NULL
+  WHERE (c.id_huella IS NOT NULL OR c.huella_template IS NOT NULL)
+    AND vm.fecha_fin IS NOT NULL
+    AND vm.fecha_fin < (CURDATE() - INTERVAL 3 MONTH)
+    AND NOT EXISTS (
+      SELECT 1 FROM venta_membresia v2
+      WHERE v2.id_cliente = c.id
+        AND v2.fecha_fin > vm.fecha_fin
+    );
+END
+"""
+
+# Versión de d387b37e9436 (para downgrade)
+SP_PURGAR_ANTERIOR = """
+CREATE PROCEDURE sp_purgar_huellas_por_vencimiento_3m()
+BEGIN
+  INSERT INTO huella_purgada_log (
+    cliente_id, venta_membresia_id, fecha_fin_ultima_membresia,
+    id_huella_prev, tenia_template, nombre, apellido, documento, correo, motivo
+  )
+  SELECT
+    c.id,
+    vm_last.id,
+    vm_last.fecha_fin,
+    c.id_huella,
+    (c.huella_template IS NOT NULL AND LENGTH(c.huella_template) > 0),
+    c.nombre, c.apellido, c.documento, c.correo,
+    'VENCIDO_3_MESES'
+  FROM cliente c
+  JOIN (
+      SELECT vm1.id, vm1.id_cliente, vm1.fecha_fin
+      FROM venta_membresia vm1
+      JOIN (
+          SELECT id_cliente, MAX(fecha_fin) AS max_fecha
+          FROM venta_membresia
+          GROUP BY id_cliente
+      ) m ON m.id_cliente = vm1.id_cliente AND m.max_fecha = vm1.fecha_fin
+  ) vm_last ON vm_last.id_cliente = c.id
+  WHERE (c.id_huella IS NOT NULL OR c.huella_template IS NOT NULL)
+    AND vm_last.fecha_fin IS NOT NULL
+    AND vm_last.fecha_fin < (CURDATE() - INTERVAL 3 MONTH)
+    AND EXISTS (
+      SELECT 1 FROM venta_membresia vm2
+      WHERE vm2.id = vm_last.id
+        AND (vm2.estado = 'VENCIDO' OR vm2.fecha_fin < CURDATE())
+    );
+
+  UPDATE cliente c
+  JOIN (
+      SELECT vm1.id_cliente, vm1.fecha_fin
+      FROM venta_membresia vm1
+      JOIN (
+          SELECT id_cliente, MAX(fecha_fin) AS max_fecha
+          FROM venta_membresia
+          GROUP BY id_cliente
+      ) m ON m.id_cliente = vm1.id_cliente AND m.max_fecha = vm1.fecha_fin
+  ) vm_last ON vm_last.id_cliente = c.id
+  SET c.id_huella = NULL,
+      c.huella_template = NULL
+  WHERE (c.id_huella IS NOT NULL OR c.huella_template IS NOT NULL)
+    AND vm_last.fecha_fin IS NOT NULL
+    AND vm_last.fecha_fin < (CURDATE() - INTERVAL 3 MONTH);
+END
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1️⃣ Puntero a la última venta (fecha_inicio DESC, id DESC)
+    op.add_column('cliente', sa.Column('id_venta_actual', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'fk_cliente_venta_actual', 'cliente', 'venta_membresia',
+        ['id_venta_actual'], ['id'], ondelete='SET NULL',
+    )
+
+    # 2️⃣ Backfill (misma regla que ClienteRepository.actualizar_venta_actual)
+    op.execute("""
+        UPDATE cliente c
+        SET c.id_venta_actual = (
+            SELECT vm.id FROM venta_membresia vm
+            WHERE vm.id_cliente = c.id
+            ORDER BY vm.fecha_inicio DESC, vm.id DESC
+            LIMIT 1
+        )
+    """)
+
+    # 3️⃣ Procedimiento de purga de huellas (misma regla, sin GROUP BY global)
+    conn = op.get_bind()
+    with op.get_context().autocommit_block():
+        conn.exec_driver_sql("DROP PROCEDURE IF EXISTS sp_purgar_huellas_por_vencimiento_3m;")
+        conn.exec_driver_sql(SP_PURGAR)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    conn = op.get_bind()
+    with op.get_context().autocommit_block():
+        conn.exec_driver_sql("DROP PROCEDURE IF EXISTS sp_purgar_huellas_por_vencimiento_3m;")
+        conn.exec_driver_sql(SP_PURGAR_ANTERIOR)
+
+    op.drop_constraint('fk_cliente_venta_actual', 'cliente', type_='foreignkey')
+    op.drop_column('cliente', 'id_venta_actual')
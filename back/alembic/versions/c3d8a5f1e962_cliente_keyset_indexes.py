@@ -0,0 +1,40 @@
+"""cliente keyset indexes
+
+Revision ID: c3d8a5f1e962
+Revises: a91f3e7c5d08
+Create Date: 2026-10-17 18:41:07.315842
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d8a5f1e962'
+down_revision: Union[str, Sequence[str], None] = 'a91f3e7c5d08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Campos de SORT_FIELDS sin índice propio (id es la PK; documento y correo
+# ya son UNIQUE). InnoDB añade la PK a cada índice secundario, así que
+# (columna) ya sirve como (columna, id) para el keyset de list_clientes.
+INDICES = [
+    ('ix_cliente_nombre', 'cliente', ['nombre']),
+    ('ix_cliente_apellido', 'cliente', ['apellido']),
+    ('ix_cliente_fecha_nacimiento', 'cliente', ['fecha_nacimiento']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for nombre, tabla, columnas in INDICES:
+        op.create_index(nombre, tabla, columnas, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for nombre, tabla, _ in reversed(INDICES):
+        op.drop_index(nombre, table_name=tabla)
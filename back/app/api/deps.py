@@ -10,6 +10,7 @@ from app.core.config import settings
 from app.db.session import get_db
 from app.models.usuario import Usuario
 from app.services.usuario_service import UsuarioService
+from app.mqtt_client import segmento_valido
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/login"
@@ -75,4 +76,17 @@ class RoleChecker:
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="No tiene permisos suficientes para realizar esta acción"
             )
-        return user
\ No newline at end of file
+        return user
+
+
+def validar_destino_mqtt(sede: str, *devices: str) -> None:
+    """
+    422 si sede/device no sirven como nivel de topic MQTT (vacíos, con
+    comodines + / # o con '/'): publish() los rechazaría siempre.
+    """
+    for valor in (sede, *devices):
+        if not segmento_valido(valor):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Nombre de sede/dispositivo inválido para MQTT: {valor!r}",
+            )
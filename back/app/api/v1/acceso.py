@@ -1,23 +1,26 @@
 # app/api/v1/acceso.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import time
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
-from typing import Optional
+from datetime import datetime
+from typing import List, Optional
 
-from app.db.session import get_db
+from app.db.session import get_async_db
 from app.services.acceso_service import AccesoService
-from app.repositories.cliente_repository import ClienteRepository
+from app.services.acceso_metrics import Cronometro, acceso_metrics
 from app.api import deps
 
 router = APIRouter()
 servicio_acceso = AccesoService()
-cliente_repo = ClienteRepository()
 
 
 # -------- Request / Response --------
 class AccesoFlexibleRequest(BaseModel):
     id_huella: Optional[int] = Field(None)
     documento: Optional[str] = Field(None, max_length=20)
+    id_sede: int = Field(1, ge=1)  # sede del lector (asistencia y métricas)
 
     # Pydantic v2 config
     model_config = ConfigDict(extra="forbid")
@@ -54,27 +57,89 @@ class AccesoResponse(BaseModel):
     mensaje: str
 
 
+class AccesoBatchItem(AccesoFlexibleRequest):
+    """Escaneo almacenado offline por el dispositivo."""
+    timestamp: datetime
+
+    # Fechas con zona horaria -> hora local naive (como fecha_hora_entrada);
+    # sin microsegundos: DATETIME guarda segundos y el timestamp es la clave
+    # de idempotencia (id_cliente, timestamp) de los reintentos
+    @field_validator("timestamp")
+    @classmethod
+    def _to_local_naive(cls, v: datetime):
+        if v.tzinfo is not None:
+            v = v.astimezone().replace(tzinfo=None)
+        return v.replace(microsecond=0)
+
+
+class AccesoBatchRequest(BaseModel):
+    registros: List[AccesoBatchItem] = Field(..., min_length=1, max_length=1000)
+
+
+class AccesoBatchResultado(AccesoResponse):
+    indice: int
+    duplicado: bool = False
+
+
+class AccesoBatchResponse(BaseModel):
+    resultados: List[AccesoBatchResultado]
+
+
 # -------- Endpoint unificado --------
 @router.post("/verificar-acceso", response_model=AccesoResponse)
-def verificar_acceso(request: AccesoFlexibleRequest, db: Session = Depends(get_db)):
+async def verificar_acceso(
+    request: AccesoFlexibleRequest,
+    http_request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+):
     """
     Verifica acceso por huella O por documento (cédula).
     - Si viene id_huella: busca Cliente por id_huella.
     - Si viene documento: busca Cliente por documento.
-    Reusa AccesoService.verificar_acceso(cliente_id).
+    Ruta async (AsyncSession): no ocupa un hilo del threadpool por escaneo.
+    La decisión pasa por la cache de acceso: en un hit no se ejecuta ningún SELECT.
+    Tiempos por etapa: header Server-Timing (también en 404/HTTPException)
+    y GET /acceso/metrics.
     """
-    if request.id_huella is not None:
-        cliente = cliente_repo.get_by_id_huella(db, id_huella=request.id_huella)
-        metodo = "huella"
-    else:
-        cliente = cliente_repo.get_by_documento(db, documento=request.documento)  # type: ignore[arg-type]
-        metodo = "documento"
+    crono = Cronometro()
+    # "http": desde la llegada de la petición (MarcaTiempoMiddleware) hasta aquí
+    t_inicio = getattr(http_request.state, "t_inicio", None) or time.perf_counter()
+    crono.sumar("http", time.perf_counter() - t_inicio)
+    tipo_acceso = "huella" if request.id_huella is not None else "documento"
+    error = None
+    try:
+        return await servicio_acceso.verificar_acceso_credencial_async(
+            db, id_huella=request.id_huella, documento=request.documento,
+            id_sede=request.id_sede, crono=crono,
+        )
+    except HTTPException as e:
+        error = e
+        raise
+    finally:
+        crono.sumar("total", time.perf_counter() - t_inicio)
+        acceso_metrics.observar(crono, tipo_acceso=tipo_acceso, id_sede=request.id_sede)
+        timing = crono.server_timing()
+        response.headers["Server-Timing"] = timing
+        # La respuesta de error no es `response`: el header va en la excepción
+        if error is not None:
+            error.headers = {**(error.headers or {}), "Server-Timing": timing}
 
-    if not cliente:
-        raise HTTPException(status_code=404, detail=f"Acceso denegado: {metodo} no registrado en el sistema.")
 
-    # Si tu AccesoService acepta tipo_acceso (recomendado):
-    return servicio_acceso.verificar_acceso(db, cliente.id, tipo_acceso=metodo)
+@router.get("/metrics", response_class=PlainTextResponse)
+def metricas_acceso():
+    """Histogramas por etapa del control de acceso (formato Prometheus)."""
+    return PlainTextResponse(acceso_metrics.render(), media_type="text/plain; version=0.0.4")
 
-    # Si NO acepta tipo_acceso aún, usa esta línea en su lugar:
-    # return servicio_acceso.verificar_acceso(db, cliente.id)
+
+@router.post("/verificar-acceso/batch", response_model=AccesoBatchResponse)
+async def verificar_acceso_batch(request: AccesoBatchRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Reproduce en bloque los escaneos que un ESP32 almacenó sin conexión.
+    Un solo INSERT masivo y un solo commit; devuelve una decisión por registro
+    (en el mismo orden en que se enviaron).
+    Idempotente: un escaneo ya guardado (mismo cliente y timestamp) no se
+    vuelve a insertar ni a contar; vuelve con duplicado=true.
+    """
+    resultados = await servicio_acceso.verificar_acceso_batch_async(db, request.registros)
+    return AccesoBatchResponse(resultados=resultados)
@@ -7,6 +7,7 @@ from pydantic import BaseModel
 import base64
 import binascii
 from app.repositories.cliente_repository import ClienteRepository
+from app.repositories import keyset
 from typing import Optional, Dict
 from app.schemas.common import Page
 from app.schemas.membresia_resumen import ResumenMembresia
@@ -42,6 +43,9 @@ SORT_FIELDS: Dict[str, str] = {
     "fecha_nacimiento": "fecha_nacimiento",
 }
 
+# Orden fijo del resumen de membresías (lo firma cada cursor)
+ORDEN_RESUMEN = "fecha_inicio:desc"
+
 class HuellaRequest(BaseModel):
     huella_base64: str
 
@@ -63,43 +67,63 @@ def create_cliente(data: ClienteCreateRequest, db: Session = Depends(get_db)):
     return service.create(db, cliente_a_crear)
 
 
+def _paginas(total: Optional[int], size: int) -> Optional[int]:
+    if total is None:
+        return None
+    return max((total + size - 1) // size, 1)
+
+
+def _enlaces(request: Request, ventana: keyset.Ventana, clave, orden: str = ""):
+    """(next, prev): la URL actual con el cursor opaco en lugar de `page`."""
+    siguiente, anterior = ventana.cursores(clave, orden)
+    base = request.url.remove_query_params("page")
+
+    def link_for(token: Optional[str]) -> Optional[str]:
+        return str(base.include_query_params(cursor=token)) if token else None
+
+    return link_for(siguiente), link_for(anterior)
+
+
 @router.get("/", response_model=Page[ClienteResponse], dependencies=[Depends(permitir_staff)])
 def list_clientes(
     request: Request,
     db: Session = Depends(get_db),
-    page: int = Query(1, ge=1, description="Número de página (1..N)"),
+    page: int = Query(1, ge=1, description="Número de página (1..N); se ignora si llega cursor"),
     size: int = Query(20, ge=1, le=200, description="Tamaño de página"),
     q: Optional[str] = Query(None, description="Búsqueda por nombre, apellido, documento o correo"),
     sort: str = Query("nombre", description=f"Campo de orden: {', '.join(SORT_FIELDS.keys())}"),
     order: str = Query("asc", pattern="^(asc|desc)$", description="asc|desc"),
+    cursor: Optional[str] = Query(None, description="Cursor opaco de next/prev (paginación keyset)"),
+    include_total: Optional[bool] = Query(None, description="Calcular total/pages (COUNT). Por defecto sólo sin cursor"),
     ):
     if sort not in SORT_FIELDS:
         raise HTTPException(status_code=400, detail=f"Campo sort inválido. Usa: {', '.join(SORT_FIELDS)}")
 
-    total, items, pages, page = service.get_paginated(
+    sort_attr = SORT_FIELDS[sort]
+    total, ventana = service.get_paginated(
         db=db,
         page=page,
         size=size,
         q=q,
-        sort_attr=SORT_FIELDS[sort],
+        sort_attr=sort_attr,
         descending=(order == "desc"),
+        cursor=cursor,
+        include_total=include_total,
+    )
+    next_link, prev_link = _enlaces(
+        request, ventana, lambda c: (getattr(c, sort_attr), c.id), f"{sort_attr}:{order}"
     )
-
-    def link_for(p: int) -> Optional[str]:
-        if p < 1 or (total and p > pages):
-            return None
-        return str(request.url.include_query_params(page=p, size=size, q=q, sort=sort, order=order))
 
     return Page[ClienteResponse](
-        items=items,
-        page=page,
+        items=ventana.filas,
+        page=ventana.pagina,
         size=size,
         total=total,
-        pages=pages,
-        has_next=page < pages,
-        has_prev=page > 1,
-        next=link_for(page + 1) if page < pages else None,
-        prev=link_for(page - 1) if page > 1 else None,
+        pages=_paginas(total, size),
+        has_next=ventana.hay_siguiente,
+        has_prev=ventana.hay_anterior,
+        next=next_link,
+        prev=prev_link,
     )
 
 
@@ -170,6 +194,8 @@ def listar_resumen_membresias(
     size: int = Query(20, ge=1, le=200),
     q: Optional[str] = Query(None, description="Buscar por nombre, documento o correo"),
     filtro: str = Query("todas", regex="^(todas|activas|por_vencer|vencidas)$"),
+    cursor: Optional[str] = Query(None, description="Cursor opaco de next/prev (paginación keyset)"),
+    include_total: Optional[bool] = Query(None, description="Calcular total/pages (COUNT). Por defecto sólo sin cursor"),
 ):
     """
     Lista paginada: por cada cliente, su última venta de membresía (si existe).
@@ -182,16 +208,6 @@ def listar_resumen_membresias(
     c = Cliente
     vm = VentaMembresia
 
-    # subconsulta: última venta por cliente (max fecha_inicio)
-    subq = (
-        db.query(
-            vm.id_cliente.label("id_cliente"),
-            func.max(vm.fecha_inicio).label("max_fecha"),
-        )
-        .group_by(vm.id_cliente)
-        .subquery()
-    )
-
     days_left = func.datediff(vm.fecha_fin, func.curdate())
 
     base_q = (
@@ -209,8 +225,8 @@ def listar_resumen_membresias(
             vm.estado,
             days_left.label("days_left"),
         )
-        .outerjoin(subq, subq.c.id_cliente == c.id)
-        .outerjoin(vm, and_(vm.id_cliente == subq.c.id_cliente, vm.fecha_inicio == subq.c.max_fecha))
+        # última venta por cliente: puntero mantenido cliente.id_venta_actual
+        .outerjoin(vm, vm.id == c.id_venta_actual)
     )
 
     # búsqueda
@@ -233,20 +249,28 @@ def listar_resumen_membresias(
         base_q = base_q.filter(and_(days_left > 5, vm.estado != "vencida"))
     # "todas": sin filtro extra
 
-    total = base_q.count()
-
-    # orden: ventas nulas al final, luego por fecha_inicio desc
-    base_q = base_q.order_by(vm.fecha_inicio.is_(None).asc(), vm.fecha_inicio.desc())
-
-    # paginación
-    pages = (total + size - 1) // size if total else 1
-    if pages < 1:
-        pages = 1
-    if page > pages:
-        page = pages
-    offset = (page - 1) * size
-
-    rows = base_q.offset(offset).limit(size).all()
+    cur = None
+    if cursor:
+        try:
+            cur = keyset.decodificar_cursor(cursor, ORDEN_RESUMEN)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Cursor inválido: {e}")
+        page = cur.pagina
+
+    if include_total is None:
+        include_total = cur is None
+    total = base_q.count() if include_total else None
+    if cur is None and total:
+        page = min(page, _paginas(total, size))
+
+    # orden: ventas nulas al final (NULL es el menor en MySQL), luego por
+    # fecha_inicio desc; keyset sobre (fecha_inicio, id) desde el cursor
+    paged_q = keyset.aplicar(base_q, vm.fecha_inicio, c.id, True, cur, size)
+    if cur is None and page > 1:
+        paged_q = paged_q.offset((page - 1) * size)
+
+    ventana = keyset.ventana(paged_q.all(), size, cur, page)
+    rows = ventana.filas
 
     items = [
         {
@@ -266,21 +290,18 @@ def listar_resumen_membresias(
         for r in rows
     ]
 
-    def link_for(p: int) -> Optional[str]:
-        if p < 1 or (total and p > pages):
-            return None
-        return str(request.url.include_query_params(page=p, size=size, q=q, filtro=filtro))
+    next_link, prev_link = _enlaces(request, ventana, lambda r: (r.fecha_inicio, r.id), ORDEN_RESUMEN)
 
     return {
         "items": items,
-        "page": page,
+        "page": ventana.pagina,
         "size": size,
         "total": total,
-        "pages": pages,
-        "has_next": page < pages,
-        "has_prev": page > 1,
-        "next": link_for(page + 1) if page < pages else None,
-        "prev": link_for(page - 1) if page > 1 else None,
+        "pages": _paginas(total, size),
+        "has_next": ventana.hay_siguiente,
+        "has_prev": ventana.hay_anterior,
+        "next": next_link,
+        "prev": prev_link,
     }
 
 # =================== CREAR / ACTUALIZAR CLIENTE+VENTA ===================
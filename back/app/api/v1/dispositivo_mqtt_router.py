@@ -1,9 +1,10 @@
 # app/api/v1/dispositivo_mqtt_router.py
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field, model_validator
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, List
 
 from app.mqtt_client import mqtt_client, topic_state, topic_config
+from app.services.dispositivo_registry import dispositivo_registry
 from fastapi import Depends
 from app.api import deps
 
@@ -42,6 +43,17 @@ class CommandIn(BaseModel):
         return self
 
 
+class BulkCommandIn(BaseModel):
+    """Mismo comando a varios dispositivos de una sede (o a todos los online)."""
+    action: str = Field(..., examples=["open_door", "set_led"])
+    payload: Optional[Dict[str, Any]] = Field(default=None, examples=[{"color": "green"}])
+    devices: Optional[List[str]] = Field(
+        default=None, min_length=1,
+        description="Dispositivos destino. Si se omite: los de la sede con state y online (GET /dispositivos)."
+    )
+    timeout: float = Field(5.0, gt=0, le=60, description="Plazo único (segundos) para todos los ACKs.")
+
+
 class StateIn(BaseModel):
     """Publicación de 'state' del dispositivo (retain recomendado en True)."""
     data: Dict[str, Any] = Field(..., examples=[{"online": True, "firmware": "1.0.0", "rssi": -55}])
@@ -61,19 +73,52 @@ class OkOut(BaseModel):
     ok: bool
 
 
+class BulkResultado(BaseModel):
+    device: str
+    ok: bool
+    error: Optional[str] = None
+
+
+class BulkCommandOut(BaseModel):
+    total: int
+    ok: int
+    resultados: List[BulkResultado]
+
+
+class DispositivoOut(BaseModel):
+    sede: str
+    device: str
+    online: bool
+    visto_en: Optional[float] = Field(None, description="Epoch (s) del último mensaje en vivo")
+    hace_s: Optional[float] = None
+    state: Dict[str, Any] = Field(default_factory=dict)
+
+
 # =======================
 #       Endpoints
 # =======================
 
+@router.get("", response_model=List[DispositivoOut], summary="Estado de los dispositivos")
+def list_devices(sede: Optional[str] = None):
+    """
+    Último state conocido de cada dispositivo (devices/+/+/state), con su
+    última señal de vida y online/offline. Se sirve desde memoria: no
+    consulta al broker ni a la DB.
+    """
+    return dispositivo_registry.listar(sede)
+
+
 # Solo Staff puede enviar comandos manuales (Ahora público)
 @router.post("/{sede}/{device}/cmd", response_model=OkOut, summary="Enviar comando y esperar ACK")
-def send_command(sede: str, device: str, body: CommandIn):
+async def send_command(sede: str, device: str, body: CommandIn):
     """
     Publica un comando en `devices/{sede}/{device}/cmd` y espera el ACK en `.../cmd/ack`.
     - Publica el JSON plano con `action` y, si existen, `cliente_id`/`id_huella` a nivel raíz.
     - También fusiona cualquier `payload` adicional.
     - Si timeout=0, NO espera respuesta (devuelve ok=True si se publicó).
+    La espera del ACK es asyncio (no ocupa un hilo del threadpool).
     """
+    deps.validar_destino_mqtt(sede, device)
     try:
         # Construimos el payload final que se publicará:
         #   - action siempre
@@ -107,11 +152,12 @@ def send_command(sede: str, device: str, body: CommandIn):
             if "ts" not in out_payload:
                  out_payload["ts"] = int(time.time())
 
-            ok = mqtt_client.publish_json(topic, out_payload, qos=1, retain=False)
+            # Vía outbox: con el broker caído queda en el spool y se reenvía al reconectar
+            ok = mqtt_client.enqueue_json(topic, out_payload, qos=1, retain=False)
             return OkOut(ok=ok)
 
         # Modo Request-Response (Wait ACK)
-        ok = mqtt_client.send_command_and_wait_ack(
+        ok = await mqtt_client.send_command(
             sede=sede,
             device=device,
             action=body.action,
@@ -125,11 +171,36 @@ def send_command(sede: str, device: str, body: CommandIn):
         raise HTTPException(status_code=502, detail=f"MQTT error: {e!s}")
 
 
+@router.post("/{sede}/cmd", response_model=BulkCommandOut, summary="Comando a varios dispositivos (ACKs en paralelo)")
+async def send_command_bulk(sede: str, body: BulkCommandIn):
+    """
+    Publica un comando a `devices` (o a los dispositivos de la sede que
+    reportaron state y están online: uno offline solo consumiría el plazo)
+    y espera todos los ACKs concurrentemente con un único plazo.
+    Devuelve el resultado por dispositivo.
+    """
+    deps.validar_destino_mqtt(sede, *(body.devices or ()))
+    devices = body.devices or dispositivo_registry.dispositivos_online(sede)
+    if not devices:
+        raise HTTPException(status_code=404, detail=f"No hay dispositivos online para la sede '{sede}'")
+
+    out_payload: Dict[str, Any] = {"action": body.action}
+    if body.payload:
+        out_payload.update(body.payload)
+
+    resultados = await mqtt_client.send_command_many(
+        sede, devices, body.action, out_payload, timeout=body.timeout
+    )
+    items = [BulkResultado(device=d, **r) for d, r in resultados.items()]
+    return BulkCommandOut(total=len(items), ok=sum(r.ok for r in items), resultados=items)
+
+
 # State updates (from device? no, usually from admin panel to force state)
 @router.post("/{sede}/{device}/state", response_model=OkOut, summary="Publicar state (retain opcional)")
-def publish_state(sede: str, device: str, body: StateIn):
+async def publish_state(sede: str, device: str, body: StateIn):
+    deps.validar_destino_mqtt(sede, device)
     topic = topic_state(sede, device)
-    ok = mqtt_client.publish_json(topic, body.data, qos=1, retain=body.retain)
+    ok = await mqtt_client.publish_json_async(topic, body.data, qos=1, retain=body.retain)
     if not ok:
         raise HTTPException(status_code=502, detail="No se pudo publicar state")
     return OkOut(ok=True)
@@ -137,18 +208,20 @@ def publish_state(sede: str, device: str, body: StateIn):
 
 # Config updates - Critical - Owner Only (Ahora público)
 @router.post("/{sede}/{device}/config", response_model=OkOut, summary="Publicar config (retain recomendado)")
-def publish_config(sede: str, device: str, body: ConfigIn):
+async def publish_config(sede: str, device: str, body: ConfigIn):
+    deps.validar_destino_mqtt(sede, device)
     topic = topic_config(sede, device)
-    ok = mqtt_client.publish_json(topic, body.data, qos=1, retain=body.retain)
+    ok = await mqtt_client.publish_json_async(topic, body.data, qos=1, retain=body.retain)
     if not ok:
         raise HTTPException(status_code=502, detail="No se pudo publicar config")
     return OkOut(ok=True)
 
 
 @router.post("/{sede}/{device}/ping", response_model=OkOut, summary="Ping de comando (abre puerta)")
-def ping_device(sede: str, device: str):
+async def ping_device(sede: str, device: str):
+    deps.validar_destino_mqtt(sede, device)
     try:
-        ok = mqtt_client.send_command_and_wait_ack(
+        ok = await mqtt_client.send_command(
             sede, device, "open_door",
             {"timeout_ms": 1000},
             timeout=3.0
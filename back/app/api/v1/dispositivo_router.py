@@ -11,6 +11,7 @@ from app.db.session import get_db
 from app.services.cliente_service import ClienteService
 
 from app.repositories.cliente_repository import ClienteRepository # Necesario para buscar el ID
+from app.services.acceso_cache import acceso_cache
 from app.api import deps
 
 router = APIRouter()
@@ -58,6 +59,7 @@ async def enviar_comando(device_id: int, request: ComandoRequest, db: Session =
             cliente.id_huella = next_id
             db.commit()
             db.refresh(cliente)
+            acceso_cache.invalidate_cliente(cliente.id)
             
             huella_id_para_sensor = cliente.id_huella
             print(f"ID de huella {huella_id_para_sensor} asignado al cliente {cliente.id}.")
@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 from app.schemas.colores import RGBColorRequest
 from app.mqtt_client import mqtt_client
+from app.api import deps
 import json
 import os
 
@@ -31,6 +32,7 @@ def set_rgb_color(sede: str, device: str, color: RGBColorRequest):
     """
     Guarda el color para un dispositivo específico y lo publica en MQTT.
     """
+    deps.validar_destino_mqtt(sede, device)
     # 1. Cargar configuración existente
     full_config = {}
     if os.path.exists(CONFIG_FILE):
@@ -58,8 +60,9 @@ def set_rgb_color(sede: str, device: str, color: RGBColorRequest):
         **color.dict()
     }
 
-    # Retain=False es lo estándar para comandos cmd
-    mqtt_client.publish_json(
+    # Retain=False es lo estándar para comandos cmd.
+    # Fire-and-forget por la cola de salida: no espera al broker en la petición
+    mqtt_client.enqueue_json(
         topic=topic,
         payload=payload, 
         retain=False
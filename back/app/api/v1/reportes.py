@@ -1,39 +1,75 @@
 # app/api/v1/endpoints/reportes.py
-from fastapi import APIRouter, Depends, Query
+from typing import Any, Callable
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.services.reportes_service import ReportesService
+from app.services.reportes_cache import reportes_cache
 from app.schemas.reportes import (
-    ResumenMembresiasOut, ResumenAsistenciasOut, SerieDiariaOut, SerieMensualOut, SerieAnualOut
+    ResumenMembresiasOut, ResumenAsistenciasOut, SerieDiariaOut, SerieMensualOut, SerieAnualOut,
+    DashboardOut,
 )
 
 router = APIRouter(prefix="/reportes", tags=["reportes"])
 svc = ReportesService()
 
+
+def _cacheado(request: Request, response: Response, nombre: str, args: tuple,
+              calcular: Callable[[], Any]):
+    """
+    Sirve el reporte desde reportes_cache con ETag: si el cliente manda
+    If-None-Match con el mismo ETag responde 304 sin cuerpo.
+    """
+    valor, etag = reportes_cache.obtener(nombre, args, calcular)
+    cabeceras = {"ETag": etag, "Cache-Control": "no-cache"}
+    recibidos = {e.strip().removeprefix("W/") for e in request.headers.get("if-none-match", "").split(",")}
+    if etag in recibidos or "*" in recibidos:
+        return Response(status_code=304, headers=cabeceras)
+    response.headers.update(cabeceras)
+    return valor
+
 @router.get("/membresias/resumen", response_model=ResumenMembresiasOut)
-def resumen_membresias(dias_alerta: int = 5, db: Session = Depends(get_db)):
+def resumen_membresias(request: Request, response: Response, dias_alerta: int = 5, db: Session = Depends(get_db)):
     """
     Devuelve conteos de clientes por estado de su última membresía:
     activos, próximos a vencer (< dias_alerta), y vencidos.
     """
-    data = svc.resumen_membresias(db, dias_alerta=dias_alerta)
-    return ResumenMembresiasOut(**data)
+    return _cacheado(request, response, "resumen_membresias", (dias_alerta,),
+                     lambda: svc.resumen_membresias(db, dias_alerta=dias_alerta))
 
 @router.get("/asistencias/resumen", response_model=ResumenAsistenciasOut)
-def resumen_asistencias(db: Session = Depends(get_db)):
-    return ResumenAsistenciasOut(**svc.resumen_asistencias(db))
+def resumen_asistencias(request: Request, response: Response, db: Session = Depends(get_db)):
+    return _cacheado(request, response, "resumen_asistencias", (),
+                     lambda: svc.resumen_asistencias(db))
 
 @router.get("/asistencias/diarias", response_model=SerieDiariaOut)
-def asistencias_diarias(dias: int = Query(30, ge=1, le=365), db: Session = Depends(get_db)):
-    items = svc.serie_asistencias_diarias(db, dias=dias)
-    return SerieDiariaOut(items=items)
+def asistencias_diarias(request: Request, response: Response, dias: int = Query(30, ge=1, le=365), db: Session = Depends(get_db)):
+    return _cacheado(request, response, "serie_asistencias_diarias", (dias,),
+                     lambda: {"items": svc.serie_asistencias_diarias(db, dias=dias)})
 
 @router.get("/asistencias/mensuales", response_model=SerieMensualOut)
-def asistencias_mensuales(meses: int = Query(12, ge=1, le=120), db: Session = Depends(get_db)):
-    items = svc.serie_asistencias_mensuales(db, meses=meses)
-    return SerieMensualOut(items=items)
+def asistencias_mensuales(request: Request, response: Response, meses: int = Query(12, ge=1, le=120), db: Session = Depends(get_db)):
+    return _cacheado(request, response, "serie_asistencias_mensuales", (meses,),
+                     lambda: {"items": svc.serie_asistencias_mensuales(db, meses=meses)})
 
 @router.get("/asistencias/anuales", response_model=SerieAnualOut)
-def asistencias_anuales(anios: int = Query(5, ge=1, le=50), db: Session = Depends(get_db)):
-    items = svc.serie_asistencias_anuales(db, anios=anios)
-    return SerieAnualOut(items=items)
\ No newline at end of file
+def asistencias_anuales(request: Request, response: Response, anios: int = Query(5, ge=1, le=50), db: Session = Depends(get_db)):
+    return _cacheado(request, response, "serie_asistencias_anuales", (anios,),
+                     lambda: {"items": svc.serie_asistencias_anuales(db, anios=anios)})
+
+@router.get("/dashboard", response_model=DashboardOut)
+def dashboard(
+    request: Request,
+    response: Response,
+    dias: int = Query(30, ge=1, le=365),
+    meses: int = Query(12, ge=1, le=120),
+    anios: int = Query(5, ge=1, le=50),
+    dias_alerta: int = 5,
+    db: Session = Depends(get_db),
+):
+    """
+    Todo el dashboard en una petición: resumen de membresías, resumen de
+    asistencias y series diaria/mensual/anual (una sesión, dos consultas).
+    """
+    return _cacheado(request, response, "dashboard", (dias, meses, anios, dias_alerta),
+                     lambda: svc.dashboard(db, dias=dias, meses=meses, anios=anios, dias_alerta=dias_alerta))
@@ -1,14 +1,17 @@
 # app/api/ws_events.py
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from app.services.event_broadcast import broadcaster
+from app.services.event_broadcast import broadcaster, filtros_desde
 
 router = APIRouter(prefix="/ws", tags=["WebSocket Events"])
 
 @router.websocket("/events")
 async def websocket_events(ws: WebSocket):
-    await broadcaster.connect(ws)
+    # Filtro opcional por query (?sede=&device=&tipo=) o mensaje {"subscribe": ...}
+    await broadcaster.connect(ws, filtros_desde(ws.query_params))
     try:
         while True:
-            await ws.receive_text()  # opcional (mantiene conexión)
+            broadcaster.handle_message(ws, await ws.receive_text())
     except WebSocketDisconnect:
+        pass
+    finally:
         broadcaster.disconnect(ws)
@@ -0,0 +1,64 @@
+"""
+Prueba de carga local de EventBroadcaster (sin servidor ni red). Uso:
+
+    python -m app.bench_broadcast [clientes] [lentos] [eventos]
+
+Conecta `clientes` WebSockets simulados (de ellos `lentos` tardan 200 ms
+por envío), emite `eventos` broadcasts y reporta la latencia de cada
+broadcast y de entrega a los clientes rápidos.
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from app.services.event_broadcast import EventBroadcaster
+
+
+class WebSocketSimulado:
+    def __init__(self, retardo: float = 0.0):
+        self.retardo = retardo
+        self.recibidos = 0
+        self.ultimo = 0.0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, texto: str):
+        if self.retardo:
+            await asyncio.sleep(self.retardo)
+        self.recibidos += 1
+        self.ultimo = time.perf_counter()
+
+
+async def medir(clientes: int, lentos: int, eventos: int) -> None:
+    b = EventBroadcaster()
+    sockets = [WebSocketSimulado(0.2 if i < lentos else 0.0) for i in range(clientes)]
+    for ws in sockets:
+        await b.connect(ws)
+
+    latencias, entregas = [], []
+    for n in range(eventos):
+        t0 = time.perf_counter()
+        await b.broadcast({"topic": "devices/bench/gym/event", "data": {"n": n}})
+        latencias.append(time.perf_counter() - t0)
+        await asyncio.sleep(0.01)  # deja correr a los emisores
+        rapidos = sockets[lentos:]
+        if rapidos:
+            entregas.append(max(ws.ultimo for ws in rapidos) - t0)
+
+    ms = lambda xs: f"p50={statistics.median(xs) * 1000:.3f} ms  max={max(xs) * 1000:.3f} ms"
+    print(f"clientes={clientes} lentos={lentos} eventos={eventos}")
+    print(f"broadcast():            {ms(latencias)}")
+    if entregas:
+        print(f"entrega (clientes rápidos): {ms(entregas)}")
+    print(f"stats: {b.stats()}")
+
+    for ws in sockets:
+        b.disconnect(ws)
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    clientes, lentos, eventos = (args + [500, 25, 200][len(args):])[:3]
+    asyncio.run(medir(clientes, lentos, eventos))
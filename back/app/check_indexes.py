@@ -0,0 +1,128 @@
+"""
+Verifica con EXPLAIN que las consultas calientes usan los índices compuestos
+(migración 5c2d7e9b4f13). Uso:
+
+    python -m app.check_indexes
+
+Termina con código 1 si alguna consulta no hace un acceso por índice.
+Ejecutar contra datos reales: con tablas casi vacías el optimizador de
+MySQL puede preferir un recorrido completo.
+"""
+import logging
+import sys
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import select, func
+
+from app.db.session import engine
+from app.models.asistencia import Asistencia
+from app.models.asistencia_diaria import AsistenciaDiaria
+from app.models.cliente import Cliente
+from app.models.venta_membresia import VentaMembresia
+from app.repositories import keyset
+from app.repositories.asistencia_diaria_repository import agregado_stmt
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Tipos de acceso de EXPLAIN que implican recorrer el índice por rango/clave
+ACCESOS_OK = {"range", "ref", "eq_ref", "const"}
+
+
+def consultas():
+    """(descripción, tabla, índice esperado, accesos aceptados, sentencia)"""
+    inicio = datetime.combine(date.today(), time.min)
+    fin = inicio + timedelta(days=1)
+
+    return [
+        (
+            "AsistenciaRepository: cliente + rango de fechas",
+            "asistencia", "ix_asistencia_cliente_fecha", ACCESOS_OK,
+            select(func.count(Asistencia.id)).where(
+                Asistencia.id_cliente == 1,
+                Asistencia.fecha_hora_entrada >= inicio,
+                Asistencia.fecha_hora_entrada < fin,
+            ),
+        ),
+        (
+            "AsistenciaRepository: sede + rango de fechas",
+            "asistencia", "ix_asistencia_sede_fecha", ACCESOS_OK,
+            select(func.count(Asistencia.id)).where(
+                Asistencia.id_sede == 1,
+                Asistencia.fecha_hora_entrada >= inicio,
+                Asistencia.fecha_hora_entrada < fin,
+            ),
+        ),
+        (
+            "AsistenciaDiariaRepository.reconstruir: agregado de un día",
+            "asistencia", "ix_asistencia_sede_fecha", ACCESOS_OK,
+            agregado_stmt(date.today(), date.today(), [1]),
+        ),
+        (
+            "ReportesService: series sobre el rollup asistencia_diaria",
+            "asistencia_diaria", "PRIMARY", ACCESOS_OK,
+            select(func.sum(AsistenciaDiaria.total)).where(
+                AsistenciaDiaria.fecha >= date.today() - timedelta(days=30),
+                AsistenciaDiaria.fecha <= date.today(),
+            ),
+        ),
+        (
+            "VentaMembresiaRepository.find_active_for_client",
+            "venta_membresia", "ix_venta_membresia_cliente_fin", ACCESOS_OK,
+            select(VentaMembresia.id)
+            .where(
+                VentaMembresia.id_cliente == 1,
+                VentaMembresia.fecha_fin >= date.today(),
+            )
+            .order_by(VentaMembresia.fecha_fin.desc())
+            .limit(1),
+        ),
+        (
+            "ClienteRepository.list_membership_summaries_paginated: última venta",
+            # Join por el puntero cliente.id_venta_actual contra la PK
+            "venta_membresia", "PRIMARY", ACCESOS_OK,
+            select(Cliente.id, VentaMembresia.fecha_inicio)
+            .join(VentaMembresia, VentaMembresia.id == Cliente.id_venta_actual)
+            .limit(20),
+        ),
+        (
+            "ClienteRepository.actualizar_venta_actual: última venta de un cliente",
+            "venta_membresia", "ix_venta_membresia_cliente_inicio", ACCESOS_OK,
+            select(VentaMembresia.id)
+            .where(VentaMembresia.id_cliente == 1)
+            .order_by(VentaMembresia.fecha_inicio.desc(), VentaMembresia.id.desc())
+            .limit(1),
+        ),
+        (
+            "ClienteRepository.find_filtered_paginated: keyset por nombre",
+            "cliente", "ix_cliente_nombre", ACCESOS_OK,
+            keyset.aplicar(
+                select(Cliente.id), Cliente.nombre, Cliente.id, False,
+                keyset.Cursor("M", 1, 2), 20,
+            ),
+        ),
+    ]
+
+
+def explain(conn, stmt):
+    compiled = stmt.compile(dialect=engine.dialect)
+    return conn.exec_driver_sql("EXPLAIN " + compiled.string, compiled.params).mappings().all()
+
+
+def main() -> int:
+    fallos = 0
+    with engine.connect() as conn:
+        for descripcion, tabla, indice, accesos, stmt in consultas():
+            filas = [f for f in explain(conn, stmt) if f["table"] == tabla]
+            ok = any(f["key"] == indice and f["type"] in accesos for f in filas)
+            plan = ", ".join(f"type={f['type']} key={f['key']}" for f in filas) or "sin filas"
+            if ok:
+                logger.info(f"✅ {descripcion}: {plan}")
+            else:
+                fallos += 1
+                logger.error(f"❌ {descripcion}: esperado {indice} ({'/'.join(sorted(accesos))}); plan: {plan}")
+    return 1 if fallos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
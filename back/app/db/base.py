@@ -14,6 +14,8 @@ from app.models.tipo_descuento import TipoDescuento
 from app.models.membresia import Membresia
 from app.models.venta_membresia import VentaMembresia
 from app.models.asistencia import Asistencia
+from app.models.acceso_diario import AccesoDiario
+from app.models.asistencia_diaria import AsistenciaDiaria
 from app.models.factura import Factura
 from app.models.detalle_factura import DetalleFactura
 from app.models.usuario import Usuario
@@ -1,5 +1,7 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from app.core.config import settings
 
 # Motor síncrono
@@ -28,3 +30,46 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# ======================
+#  Motor asíncrono (rutas calientes: control de acceso)
+# ======================
+# Driver async por backend: mysql+pymysql -> mysql+aiomysql. Solo MySQL:
+# los repositorios usan INSERT ... ON DUPLICATE KEY UPDATE.
+ASYNC_DRIVERS = {
+    "mysql": "aiomysql",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Convierte la DATABASE_URL síncrona a su equivalente con driver async."""
+    u = make_url(url)
+    backend = u.get_backend_name()
+    driver = ASYNC_DRIVERS.get(backend)
+    if driver is None or u.get_driver_name() == driver:
+        return url
+    return u.set(drivername=f"{backend}+{driver}").render_as_string(hide_password=False)
+
+
+async_engine = create_async_engine(
+    to_async_url(settings.DATABASE_URL),
+    echo=(settings.ENVIRONMENT == "development"),
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    pool_size=10,
+    max_overflow=20,
+)
+
+# Session maker asíncrono (expire_on_commit=False: no hay lazy load en async)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+# Dependencia async para FastAPI
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -4,6 +4,7 @@ load_dotenv()  # ✅ Cargar .env antes de todo (MQTT, DB, etc.)
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
@@ -16,9 +17,10 @@ import json
 from app.api.v1.api import api_router
 from app.core.config import settings
 from app.db.base import Base
-from app.db.session import engine
-from app.mqtt_client import mqtt_client
-from app.services.event_broadcast import broadcaster
+from app.db.session import engine, async_engine
+from app.mqtt_client import mqtt_client, topic_publicable
+from app.services.event_broadcast import broadcaster, filtros_desde
+from app.services.acceso_metrics import MarcaTiempoMiddleware
 
 
 # ======================
@@ -43,6 +45,9 @@ def get_application() -> FastAPI:
         version="1.0.0"
     )
 
+    # --- Marca de llegada (tiempos por etapa del control de acceso) ---
+    app.add_middleware(MarcaTiempoMiddleware)
+
     # --- GZip Compression (Optimización) ---
     app.add_middleware(GZipMiddleware, minimum_size=1000)
 
@@ -68,26 +73,45 @@ def get_application() -> FastAPI:
         return {"status": "ok"}
 
     @app.get("/health/mqtt", tags=["Health"])
-    def health_mqtt():
-        """Verifica si el cliente MQTT está conectado."""
-        return {"mqtt_connected": mqtt_client._connected.is_set()}
+    async def health_mqtt():
+        """
+        Verifica si el cliente MQTT está conectado y el estado de su cola de salida.
+        async: broadcaster.stats() lee las conexiones en el loop que las modifica.
+        """
+        return {
+            "mqtt_connected": mqtt_client._connected.is_set(),
+            "outbox": mqtt_client.outbox_stats(),
+            "websocket": broadcaster.stats(),
+        }
+
+    @app.get("/health/mqtt/metrics", tags=["Health"], response_class=PlainTextResponse)
+    async def health_mqtt_metrics():
+        """Métricas MQTT (publicaciones, RTT de ACK por dispositivo, reconexiones...) en formato Prometheus."""
+        return PlainTextResponse(mqtt_client.metrics_text(), media_type="text/plain; version=0.0.4")
 
     # --- WebSocket global para eventos ---
     @app.websocket("/ws/events")
     async def websocket_events(ws: WebSocket):
-        """Mantiene una conexión WebSocket viva para notificaciones en tiempo real."""
-        await broadcaster.connect(ws)
+        """
+        Mantiene una conexión WebSocket viva para notificaciones en tiempo real.
+        Filtro opcional: ?sede=&device=&tipo= o un mensaje
+        {"subscribe": {"sede": ..., "device": ..., "tipo": ...}} (o lista).
+        """
+        await broadcaster.connect(ws, filtros_desde(ws.query_params))
         print(f"🔗 Nuevo cliente WebSocket conectado: {ws.client}")
         try:
             while True:
                 try:
                     # Mantiene la conexión viva enviando pings cada 30s
-                    await asyncio.wait_for(ws.receive_text(), timeout=30.0)
+                    texto = await asyncio.wait_for(ws.receive_text(), timeout=30.0)
+                    broadcaster.handle_message(ws, texto)
                 except asyncio.TimeoutError:
-                    await ws.send_text("ping")
+                    # Por la cola de la conexión (un solo emisor por socket)
+                    broadcaster.send(ws, "ping")
         except WebSocketDisconnect:
-            broadcaster.disconnect(ws)
             print("🔌 Cliente WebSocket desconectado")
+        finally:
+            broadcaster.disconnect(ws)
 
     return app
 
@@ -114,6 +138,9 @@ def on_startup():
     if getattr(settings, "ENVIRONMENT", "development") == "development":
         init_models()
 
+    # Loop de la app: los eventos MQTT se reenvían a él (hilo de paho -> loop)
+    mqtt_client.bind_loop(asyncio.get_running_loop())
+
     try:
         print("🚀 Conectando al broker MQTT...")
         mqtt_client.connect()
@@ -126,12 +153,17 @@ def on_startup():
                 with open("data/led_config.json", "r") as f:
                     data = json.load(f)
                     # Iteramos por cada dispositivo configurado (key = "sede/device")
+                    # Se encolan en la outbox: se publican en lote (pipelined)
+                    # al conectar, sin un round trip QoS por dispositivo.
                     for key_device, payload in data.items():
                         if isinstance(payload, dict):
                             topic = f"devices/{key_device}/cmd"
+                            if not topic_publicable(topic):
+                                print(f"⚠️ Luces: clave inválida ignorada [{key_device}]")
+                                continue
                             # Envolvemos como comando 'set_led'
                             cmd_payload = {"action": "set_led", **payload}
-                            mqtt_client.publish_json(topic, cmd_payload, retain=False)
+                            mqtt_client.enqueue_json(topic, cmd_payload, retain=False)
                             print(f"💡 Restaurado via cmd [{topic}]: {cmd_payload}")
             except Exception as e:
                 print(f"⚠️ Error restaurando luces: {e}")
@@ -152,3 +184,9 @@ def on_shutdown():
         logging.getLogger("uvicorn.error").exception(
             f"❌ Error al desconectar MQTT en shutdown: {e}"
         )
+
+
+@app.on_event("shutdown")
+async def on_shutdown_db():
+    """Cierra el pool del motor asíncrono."""
+    await async_engine.dispose()
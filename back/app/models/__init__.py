@@ -1,7 +1,9 @@
 from app.db import base
 
 # Importa todos los modelos para que Alembic los vea
+from .acceso_diario import *
 from .asistencia import *
+from .asistencia_diaria import *
 from .cliente import *
 from .detalle_factura import *
 from .factura import *
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, ForeignKey, Date
+from app.db.base_class import Base
+
+class AccesoDiario(Base):
+    """Contador de asistencias por (cliente, día): límite diario en O(1)."""
+    __tablename__ = 'acceso_diario'
+
+    id_cliente = Column(Integer, ForeignKey('cliente.id', ondelete='CASCADE'), primary_key=True)
+    fecha = Column(Date, primary_key=True)
+    accesos = Column(Integer, nullable=False, default=0, server_default='0')
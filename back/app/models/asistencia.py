@@ -1,9 +1,13 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, String, Text
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, String, Text, Index
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 
 class Asistencia(Base):
     __tablename__ = 'asistencia'
+    __table_args__ = (
+        Index('ix_asistencia_cliente_fecha', 'id_cliente', 'fecha_hora_entrada'),
+        Index('ix_asistencia_sede_fecha', 'id_sede', 'fecha_hora_entrada'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     id_cliente = Column(Integer, ForeignKey('cliente.id'))
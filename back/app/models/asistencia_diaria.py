@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, Date, Boolean
+from app.db.base_class import Base
+
+class AsistenciaDiaria(Base):
+    """
+    Rollup de asistencias por (sede, día, permitido, con_venta) para reportes.
+    con_venta=False: staff (permitido) o sin membresía activa (denegado).
+    id_sede=0 agrupa las asistencias sin sede.
+    """
+    __tablename__ = 'asistencia_diaria'
+
+    # fecha primero: los reportes leen rangos de días sobre la PK (clustered)
+    fecha = Column(Date, primary_key=True)
+    id_sede = Column(Integer, primary_key=True, autoincrement=False)
+    permitido = Column(Boolean, primary_key=True)
+    con_venta = Column(Boolean, primary_key=True)
+    total = Column(Integer, nullable=False, default=0, server_default='0')
@@ -6,11 +6,11 @@ class Cliente(Base):
     __tablename__ = 'cliente'
 
     id = Column(Integer, primary_key=True, index=True)
-    nombre = Column(String(120), nullable=False)
-    apellido = Column(String(120), nullable=False)
+    nombre = Column(String(120), nullable=False, index=True)  # orden keyset del listado
+    apellido = Column(String(120), nullable=False, index=True)  # orden keyset del listado
     documento = Column(String(20), unique=True, nullable=False)
     id_huella = Column(Integer, unique=True, nullable=True, index=True)
-    fecha_nacimiento = Column(Date, nullable=False)
+    fecha_nacimiento = Column(Date, nullable=False, index=True)  # orden keyset del listado
     telefono = Column(String(120), nullable=True)
     correo = Column(String(120), nullable=True, unique=True)
     direccion = Column(String(120), nullable=True)
@@ -18,6 +18,13 @@ class Cliente(Base):
     huella_template = Column(LargeBinary, nullable=True)
     fotografia = Column(String(255), nullable=True)
     observaciones = Column(Text, nullable=True)
+    # Última venta (fecha_inicio, id más recientes); la mantiene ClienteRepository.actualizar_venta_actual
+    id_venta_actual = Column(
+        Integer,
+        ForeignKey('venta_membresia.id', ondelete='SET NULL', use_alter=True, name='fk_cliente_venta_actual'),
+        nullable=True,
+    )
 
-    ventas = relationship('VentaMembresia', back_populates='cliente')
+    ventas = relationship('VentaMembresia', back_populates='cliente', foreign_keys='VentaMembresia.id_cliente')
+    venta_actual = relationship('VentaMembresia', foreign_keys=[id_venta_actual], viewonly=True)
     asistencias = relationship('Asistencia', back_populates='cliente')
\ No newline at end of file
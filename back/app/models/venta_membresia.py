@@ -1,9 +1,13 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Float, String
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Float, String, Index
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 
 class VentaMembresia(Base):
     __tablename__ = 'venta_membresia'
+    __table_args__ = (
+        Index('ix_venta_membresia_cliente_fin', 'id_cliente', 'fecha_fin'),
+        Index('ix_venta_membresia_cliente_inicio', 'id_cliente', 'fecha_inicio', 'fecha_fin'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     id_cliente = Column(Integer, ForeignKey('cliente.id'))
@@ -14,7 +18,7 @@ class VentaMembresia(Base):
     estado = Column(String(120))
     sesiones_restantes = Column(Integer)
 
-    cliente = relationship('Cliente', back_populates='ventas')
+    cliente = relationship('Cliente', back_populates='ventas', foreign_keys=[id_cliente])
     
     membresia = relationship('Membresia', back_populates='ventas')
     asistencias = relationship('Asistencia', back_populates='venta')
\ No newline at end of file
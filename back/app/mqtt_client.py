@@ -1,6 +1,10 @@
 import os, json, time, uuid, threading, asyncio
+from collections import deque
 import paho.mqtt.client as mqtt
 from app.services.event_broadcast import broadcaster
+from app.services.dispositivo_registry import dispositivo_registry
+from app.services.mqtt_spool import MqttSpool
+from app.services.mqtt_metrics import BUCKETS_ACK, mqtt_metrics
 
 # =====================================================
 # 🔧 Configuración del Broker MQTT (una sola IP local)
@@ -11,6 +15,14 @@ MQTT_USER = os.getenv("MQTT_USER", "")
 MQTT_PASS = os.getenv("MQTT_PASS", "")
 MQTT_TLS = os.getenv("MQTT_TLS", "false").lower() in ("1", "true", "yes")
 
+# Cola de salida (eventos de asistencia, etc.)
+MQTT_OUTBOX_MAX = int(os.getenv("MQTT_OUTBOX_MAX", 1000))    # capacidad (drop-oldest al llenarse)
+MQTT_OUTBOX_BATCH = int(os.getenv("MQTT_OUTBOX_BATCH", 50))  # máx. mensajes por lote
+# Spool en disco para lo que no se pudo publicar (broker caído); se reenvía al reconectar
+MQTT_SPOOL_PATH = os.getenv("MQTT_SPOOL_PATH", "data/mqtt_spool.jsonl")
+MQTT_SPOOL_MAX = int(os.getenv("MQTT_SPOOL_MAX", 10000))     # máx. mensajes (drop-oldest)
+MQTT_SPOOL_RETRY_S = float(os.getenv("MQTT_SPOOL_RETRY_S", 1.0))  # pausa tras un reenvío incompleto
+
 # =====================================================
 # 🔹 Helpers para formatear topics
 # =====================================================
@@ -20,6 +32,29 @@ def topic_event(s, d): return f"devices/{s}/{d}/event"
 def topic_state(s, d): return f"devices/{s}/{d}/state"
 def topic_config(s, d): return f"devices/{s}/{d}/config"
 
+# ACKs de todos los dispositivos: una sola suscripción (se enruta por id)
+TOPIC_ACK_WILDCARD = "devices/+/+/cmd/ack"
+# States (retenidos) de todos los dispositivos -> dispositivo_registry
+TOPIC_STATE_WILDCARD = "devices/+/+/state"
+
+
+def topic_publicable(topic: str) -> bool:
+    """Topic válido para publish(): no vacío y sin comodines (+ / #)."""
+    return bool(topic) and "+" not in topic and "#" not in topic and "\0" not in topic
+
+
+def segmento_valido(valor: str) -> bool:
+    """Un nivel de topic (sede, device): no vacío, sin comodines ni '/'."""
+    return topic_publicable(valor) and "/" not in valor
+
+
+def parse_device_topic(topic: str):
+    """'devices/<sede>/<device>/...' -> (sede, device) o None."""
+    partes = topic.split("/", 3)
+    if len(partes) < 3 or partes[0] != "devices":
+        return None
+    return partes[1], partes[2]
+
 # =====================================================
 # 🚀 Cliente MQTT optimizado
 # =====================================================
@@ -29,6 +64,8 @@ class MQTTClient:
     - Conexión estable y automática (loop_start)
     - Publicación JSON con QoS=1
     - Reenvía mensajes /event al WebSocket broadcaster
+    - Cola de salida acotada (enqueue_json) drenada por un hilo propio
+    - Spool en disco si el broker está caído, reenviado en orden al reconectar
     """
     def __init__(self):
         self.client = mqtt.Client(
@@ -49,12 +86,43 @@ class MQTTClient:
         self.client.on_connect = self.on_connect
         self.client.on_disconnect = self.on_disconnect
         self.client.on_message = self.on_message
+        self.client.on_publish = self.on_publish
 
         # --- Estado y control ---
         self._connected = threading.Event()
-        self._subs = set()
+        self._subs = {TOPIC_ACK_WILDCARD, TOPIC_STATE_WILDCARD}  # se (re)suscriben en on_connect
         self._lock = threading.RLock()
         self._pending = {}
+        self._publicando = {}  # mid -> (loop, future) de publish_json_async
+        # mid -> monotonic de confirmaciones sin Future registrado todavía
+        # (on_publish puede llegar antes de que publish_json_async registre)
+        self._confirmados = {}
+        self._loop: asyncio.AbstractEventLoop | None = None  # loop de FastAPI (bind_loop)
+        self._conexiones = 0
+
+        # --- Cola de salida (outbox) ---
+        self._outbox = deque(maxlen=MQTT_OUTBOX_MAX)
+        self._outbox_cv = threading.Condition()
+        self._outbox_stop = threading.Event()
+        self._outbox_thread = None
+        self._spool = MqttSpool(MQTT_SPOOL_PATH, MQTT_SPOOL_MAX)
+        # Serializa las escrituras al spool: _stop_outbox puede agregar
+        # mientras _reenviar_spool (hilo outbox) aún no hizo su reemplazar()
+        self._spool_lock = threading.Lock()
+        self._spool_reintento = 0.0  # monotonic: no reenviar el spool antes (backoff)
+        self._outbox_stats = {
+            "encolados": 0,
+            "publicados": 0,
+            "fallidos": 0,
+            "sin_confirmar": 0,
+            "descartados": 0,
+            "spooleados": 0,
+            "reenviados": 0,
+            "lotes": 0,
+            "latencia_total": 0.0,
+            "latencia_ultima": 0.0,
+            "latencia_max": 0.0,
+        }
 
     # =====================================================
     # 🧩 Callbacks principales
@@ -66,52 +134,100 @@ class MQTTClient:
         if ok:
             print(f"✅ Conectado exitosamente al Broker MQTT en {MQTT_BROKER_IP}:{MQTT_PORT}")
             self._connected.set()
+            mqtt_metrics.contar("mqtt_conexiones_total")
+            if self._conexiones:
+                mqtt_metrics.contar("mqtt_reconexiones_total")
+            self._conexiones += 1
             with self._lock:
                 for t in list(self._subs):
                     self.client.subscribe(t, qos=1)
+            with self._outbox_cv:
+                self._outbox_cv.notify()  # despierta al outbox para reenviar el spool
         else:
             print(f"❌ Falló la conexión al broker ({reason_code})")
 
     def on_disconnect(self, client, userdata, reason_code, properties):
         print("🔌 Desconectado del Broker MQTT")
         self._connected.clear()
+        mqtt_metrics.contar("mqtt_desconexiones_total")
+
+    def on_publish(self, client, userdata, mid, reason_code=None, properties=None):
+        """Confirmación de entrega (QoS): resuelve el Future de publish_json_async."""
+        with self._lock:
+            pend = self._publicando.pop(mid, None)
+            if pend is None:
+                self._confirmados.pop(mid, None)  # reinsertar = más reciente al final
+                self._confirmados[mid] = time.monotonic()
+                if len(self._confirmados) > 1024:
+                    del self._confirmados[next(iter(self._confirmados))]
+        if pend is not None:
+            loop, fut = pend
+            loop.call_soon_threadsafe(_set_result, fut, True)
 
     def on_message(self, client, userdata, msg):
         """Procesa mensajes MQTT entrantes."""
+        mqtt_metrics.contar("mqtt_mensajes_recibidos_total", topic=msg.topic)
         try:
             data = json.loads(msg.payload.decode())
         except Exception:
             return
 
-        # --- ACKs de comandos ---
+        origen = parse_device_topic(msg.topic)
+
+        # --- State de dispositivos (wildcard devices/+/+/state) ---
+        if msg.topic.endswith("/state"):
+            if origen and isinstance(data, dict):
+                dispositivo_registry.actualizar_state(*origen, data, retenido=bool(msg.retain))
+            return
+
+        # --- ACKs de comandos (wildcard devices/+/+/cmd/ack) ---
+        # Solo state y ack los publica el propio dispositivo: /event también
+        # lo publica el backend (notifier) y no es señal de vida de nadie
         if msg.topic.endswith("/cmd/ack"):
-            cmd_id = data.get("id")
-            if cmd_id in self._pending:
-                with self._lock:
-                    self._pending[cmd_id]["ok"] = bool(data.get("ok"))
-                    self._pending[cmd_id]["event"].set()
+            if not isinstance(data, dict):  # JSON válido pero no objeto (lista, número...)
+                return
+            if origen:
+                dispositivo_registry.tocar(*origen)
+            self._resolver_ack(data.get("id"), bool(data.get("ok")), origen)
             return
 
         # --- Eventos del gimnasio ---
         if msg.topic.endswith("/event"):
             print(f"📩 Evento MQTT recibido: {data}")
-            try:
-                asyncio.run(broadcaster.broadcast({
-                    "topic": msg.topic,
-                    "data": data
-                }))
-            except RuntimeError:
-                # Si ya hay un loop corriendo (caso FastAPI), usar create_task
-                asyncio.create_task(broadcaster.broadcast({
-                    "topic": msg.topic,
-                    "data": data
-                }))
+            self._a_loop(self._difundir({
+                "topic": msg.topic,
+                "data": data
+            }))
+
+    async def _difundir(self, data: dict):
+        """broadcaster.broadcast midiendo el fan-out (en el loop de la app)."""
+        t0 = time.perf_counter()
+        await broadcaster.broadcast(data)
+        mqtt_metrics.observar("mqtt_broadcast_seconds", time.perf_counter() - t0)
+
+    def _a_loop(self, coro):
+        """
+        Entrega una corrutina al loop de la app desde el hilo de paho
+        (run_coroutine_threadsafe: sin crear loops, envíos en el loop dueño
+        de los WebSockets).
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            coro.close()
+            print("⚠️ Evento MQTT descartado: loop de la app no disponible")
+            return
+        asyncio.run_coroutine_threadsafe(coro, loop)
 
     # =====================================================
     # 🔌 Conexión y ciclo de vida
     # =====================================================
+    def bind_loop(self, loop: asyncio.AbstractEventLoop):
+        """Registra el event loop de FastAPI (llamar en startup)."""
+        self._loop = loop
+
     def connect(self, retries=10):
         """Intenta conectar al broker con reintentos exponenciales."""
+        self._start_outbox()
         backoff = 1.0
         for attempt in range(retries):
             try:
@@ -127,6 +243,7 @@ class MQTTClient:
 
     def disconnect(self):
         """Desconecta el cliente MQTT y detiene su loop."""
+        self._stop_outbox()
         try:
             self.client.loop_stop()
             self.client.disconnect()
@@ -157,49 +274,401 @@ class MQTTClient:
         try:
             if not self.ensure_connected(timeout=3.0):
                 print("⚠️ Publish abortado: MQTT no conectado")
-                return False
+                return _publicado("sync", False)
             msg = json.dumps(payload)
             info = self.client.publish(topic, msg, qos=qos, retain=retain)
             info.wait_for_publish(timeout=3.0)
             if info.rc == mqtt.MQTT_ERR_SUCCESS:
                 print(f"✉️ MQTT publish: {topic} -> {msg}")
-                return True
+                return _publicado("sync", True)
             print(f"⚠️ Falló publish rc={info.rc}")
-            return False
+            return _publicado("sync", False)
         except Exception as e:
             print(f"🔥 Error publicando MQTT: {e}")
-            return False
+            return _publicado("sync", False)
 
     def publish(self, topic: str, payload: dict) -> bool:
         """Compatibilidad: publish por defecto con QoS=1."""
         return self.publish_json(topic, payload, qos=1, retain=False)
 
+    def publish_json_nowait(self, topic: str, payload: dict, qos: int = 1, retain: bool = False) -> bool:
+        """
+        Publica sin bloquear (apto para corrutinas): no espera conexión ni
+        confirmación QoS; paho entrega el mensaje desde su hilo de red.
+        """
+        if not self._connected.is_set():
+            print("⚠️ Publish abortado: MQTT no conectado")
+            return _publicado("nowait", False)
+        try:
+            msg = json.dumps(payload)
+            info = self.client.publish(topic, msg, qos=qos, retain=retain)
+        except Exception as e:
+            print(f"🔥 Error publicando MQTT: {e}")
+            return _publicado("nowait", False)
+        if info.rc == mqtt.MQTT_ERR_SUCCESS:
+            print(f"✉️ MQTT publish: {topic} -> {msg}")
+            return _publicado("nowait", True)
+        print(f"⚠️ Falló publish rc={info.rc}")
+        return _publicado("nowait", False)
+
+    async def publish_json_async(self, topic: str, payload: dict, qos: int = 1,
+                                 retain: bool = False, timeout: float = 3.0) -> bool:
+        """
+        Como publish_json pero sin bloquear el hilo: la confirmación QoS se
+        espera con un Future resuelto desde on_publish. Varias llamadas
+        concurrentes (asyncio.gather) quedan en vuelo a la vez (pipelining).
+        """
+        if not self._connected.is_set():
+            print("⚠️ Publish abortado: MQTT no conectado")
+            return _publicado("async", False)
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        try:
+            msg = json.dumps(payload)
+            # publish() FUERA de self._lock: paho toma su _out_message_mutex
+            # en publish() y también al llamar on_publish (que toma self._lock);
+            # anidarlos en orden inverso puede bloquear ambos hilos
+            t_envio = time.monotonic()
+            info = self.client.publish(topic, msg, qos=qos, retain=retain)
+            if info.rc != mqtt.MQTT_ERR_SUCCESS:
+                print(f"⚠️ Falló publish rc={info.rc}")
+                return _publicado("async", False)
+            with self._lock:
+                # ¿Llegó la confirmación antes de registrar? (una más vieja
+                # es de un uso anterior del mismo mid)
+                confirmado = self._confirmados.pop(info.mid, None)
+                if confirmado is not None and confirmado >= t_envio:
+                    fut.set_result(True)
+                else:
+                    self._publicando[info.mid] = (loop, fut)
+        except Exception as e:
+            print(f"🔥 Error publicando MQTT: {e}")
+            return _publicado("async", False)
+        try:
+            await asyncio.wait_for(fut, timeout=timeout)
+            print(f"✉️ MQTT publish: {topic} -> {msg}")
+            return _publicado("async", True)
+        except asyncio.TimeoutError:
+            print(f"⏱️ Timeout confirmando publish en {topic}")
+            return _publicado("async", False)
+        finally:
+            with self._lock:
+                self._publicando.pop(info.mid, None)
+
     # =====================================================
-    # 📡 Comandos con ACK
+    # 📤 Cola de salida (outbox)
     # =====================================================
-    def send_command_and_wait_ack(self, sede: str, device: str, action: str,
-                                  payload: dict | None = None, timeout: float = 5.0) -> bool:
+    def enqueue_json(self, topic: str, payload: dict, qos: int = 1, retain: bool = False) -> bool:
         """
-        Publica en devices/<sede>/<device>/cmd y espera ACK en /cmd/ack.
-        Devuelve True si ok==true en el ACK dentro del timeout.
+        Encola un mensaje JSON sin bloquear (no abre conexiones ni espera al broker).
+        Si la cola está llena se descarta el mensaje más antiguo (drop-oldest).
+        Devuelve False si hubo que descartar uno. Lanza ValueError si el topic
+        no es publicable (comodines): nunca llegaría al broker.
         """
-        cmd_id = f"c-{uuid.uuid4().hex[:8]}"
-        t_cmd = topic_cmd(sede, device)
-        t_ack = topic_ack(sede, device)
+        if not topic_publicable(topic):
+            raise ValueError(f"Topic MQTT no publicable: {topic!r}")
+        with self._outbox_cv:
+            lleno = len(self._outbox) == self._outbox.maxlen
+            self._outbox.append((topic, payload, qos, retain, time.monotonic()))
+            self._outbox_stats["encolados"] += 1
+            if lleno:
+                self._outbox_stats["descartados"] += 1
+            self._outbox_cv.notify()
+        return not lleno
+
+    def outbox_stats(self) -> dict:
+        """Métricas de la cola: profundidad, contadores y latencia de publicación."""
+        with self._outbox_cv:
+            st = dict(self._outbox_stats)
+            profundidad = len(self._outbox)
+        publicados = st["publicados"]
+        return {
+            "profundidad": profundidad,
+            "capacidad": self._outbox.maxlen,
+            "encolados": st["encolados"],
+            "publicados": publicados,
+            "fallidos": st["fallidos"],
+            "sin_confirmar": st["sin_confirmar"],
+            "descartados": st["descartados"],
+            "lotes": st["lotes"],
+            "spool": {
+                "pendientes": len(self._spool),
+                "capacidad": self._spool.max_mensajes,
+                "spooleados": st["spooleados"],
+                "reenviados": st["reenviados"],
+            },
+            "latencia_ms": {
+                "ultima": round(st["latencia_ultima"] * 1000, 2),
+                "promedio": round(st["latencia_total"] / publicados * 1000, 2) if publicados else 0.0,
+                "max": round(st["latencia_max"] * 1000, 2),
+            },
+        }
+
+    def metrics_text(self) -> str:
+        """Métricas del cliente (contadores, histogramas y gauges) en texto Prometheus."""
+        with self._lock:
+            pendientes = len(self._pending)
+        outbox = self.outbox_stats()
+        ws = broadcaster.stats()
+        return mqtt_metrics.render({
+            "mqtt_conectado": int(self._connected.is_set()),
+            "mqtt_comandos_pendientes": pendientes,
+            "mqtt_outbox_profundidad": outbox["profundidad"],
+            "mqtt_spool_pendientes": outbox["spool"]["pendientes"],
+            "ws_conexiones": ws["conexiones"],
+            "ws_pendientes": ws["pendientes"],
+        })
+
+    def _start_outbox(self):
+        with self._outbox_cv:
+            if self._outbox_thread and self._outbox_thread.is_alive():
+                return
+            self._outbox_stop.clear()
+            self._outbox_thread = threading.Thread(
+                target=self._outbox_loop, name="mqtt-outbox", daemon=True
+            )
+            self._outbox_thread.start()
+
+    def _stop_outbox(self, timeout: float = 3.0):
+        self._outbox_stop.set()
+        with self._outbox_cv:
+            self._outbox_cv.notify_all()
+        if self._outbox_thread:
+            self._outbox_thread.join(timeout=timeout)
+        # Lo que quedó en memoria sobrevive al apagado
+        self._a_spool(self._sacar_outbox())
+
+    def _outbox_loop(self):
+        """
+        Drena la cola en lotes sobre la conexión persistente. Con el broker
+        caído la cola se vuelca al spool en disco; al reconectar se reenvía
+        primero el spool (más antiguo) y después la cola en memoria.
+        """
+        while not self._outbox_stop.is_set():
+            reenviar = (
+                bool(self._spool) and self._connected.is_set()
+                and time.monotonic() >= self._spool_reintento
+            )
+            with self._outbox_cv:
+                if not self._outbox and not reenviar:
+                    self._outbox_cv.wait(timeout=1.0)
+                    continue
+            if not self._connected.is_set():
+                self._a_spool(self._sacar_outbox())
+                self._connected.wait(timeout=1.0)
+                continue
+            if reenviar:
+                # Reenvío incompleto: pausa antes de reintentar el spool; la
+                # cola en memoria se sigue drenando mientras tanto
+                if not self._reenviar_spool():
+                    self._spool_reintento = time.monotonic() + MQTT_SPOOL_RETRY_S
+                continue
+            lote = self._sacar_outbox(MQTT_OUTBOX_BATCH)
+            rechazados, _ = self._publicar_lote(lote)
+            self._a_spool(rechazados)
+
+    def _sacar_outbox(self, n: int | None = None) -> list:
+        with self._outbox_cv:
+            n = len(self._outbox) if n is None else min(len(self._outbox), n)
+            return [self._outbox.popleft() for _ in range(n)]
+
+    def _a_spool(self, mensajes: list) -> None:
+        """Persiste mensajes no publicados (orden de llegada) en el spool."""
+        if not mensajes:
+            return
+        try:
+            with self._spool_lock:
+                descartados = self._spool.append(_registros_spool(mensajes))
+        except OSError as e:
+            print(f"🔥 Error escribiendo spool MQTT ({len(mensajes)} mensajes perdidos): {e}")
+            with self._outbox_cv:
+                self._outbox_stats["descartados"] += len(mensajes)
+            return
+        with self._outbox_cv:
+            self._outbox_stats["spooleados"] += len(mensajes)
+            self._outbox_stats["descartados"] += descartados
+        print(f"💾 {len(mensajes)} mensajes MQTT al spool ({len(self._spool)} pendientes)")
 
-        # Suscribirse al ACK antes de publicar
-        if not self.ensure_sub(t_ack, qos=1):
-            raise RuntimeError("No se pudo suscribir al topic de ACK")
+    def _reenviar_spool(self) -> bool:
+        """
+        Reenvía el spool en orden; si se corta, deja en disco lo que falta.
+        Retiene _spool_lock de la lectura al reemplazar(): nada se agrega
+        en medio (se perdería al reescribir). Devuelve True si quedó vacío.
+        """
+        with self._spool_lock:
+            ahora, ahora_mono = time.time(), time.monotonic()
+            pendientes = [
+                (m["topic"], m["payload"], m.get("qos", 1), m.get("retain", False),
+                 ahora_mono - (ahora - m.get("ts", ahora)))
+                for m in self._spool.leer()
+            ]
+            reenviados = 0
+            while pendientes and self._connected.is_set() and not self._outbox_stop.is_set():
+                lote = pendientes[:MQTT_OUTBOX_BATCH]
+                rechazados, sin_confirmar = self._publicar_lote(lote)
+                reenviados += len(lote) - len(rechazados)
+                pendientes = rechazados + pendientes[len(lote):]
+                # Rechazos o broker que no confirma: se sigue en la próxima vuelta
+                if rechazados or sin_confirmar:
+                    break
+            try:
+                self._spool.reemplazar(_registros_spool(pendientes))
+            except OSError as e:
+                print(f"🔥 Error actualizando spool MQTT: {e}")
+        with self._outbox_cv:
+            self._outbox_stats["reenviados"] += reenviados
+        if reenviados:
+            print(f"📨 Spool MQTT reenviado: {reenviados} mensajes ({len(pendientes)} pendientes)")
+        return not pendientes
+
+    def _publicar_lote(self, lote) -> tuple:
+        """
+        Publica todo el lote (pipelined) y luego espera las confirmaciones QoS.
+        Devuelve (rechazados, sin_confirmar): los mensajes que paho NO tomó
+        (van al spool, en el orden original) y cuántos tomó pero no
+        confirmó a tiempo. Estos siguen en la cola de paho, que los reenvía
+        al reconectar: llevarlos al spool los duplicaría.
+        Los que paho rechazaría siempre (excepción en publish, p. ej. topic
+        con comodines, o payload demasiado grande) se descartan: en el
+        spool bloquearían el reenvío para siempre.
+        """
+        enviados = []
+        for topic, payload, qos, retain, t0 in lote:
+            try:
+                msg = json.dumps(payload, ensure_ascii=False)
+                enviados.append(self.client.publish(topic, msg, qos=qos, retain=retain))
+            except Exception as e:
+                print(f"🔥 Error publicando MQTT (outbox), mensaje descartado: {e}")
+                enviados.append(None)
 
+        publicados = 0
+        sin_confirmar = 0
+        descartados = 0
+        latencias = []
+        no_publicados = []  # en el orden original del lote
+        # Un solo plazo para todo el lote (no 5 s por mensaje)
+        limite = time.monotonic() + 5.0
+        for info, item in zip(enviados, lote):
+            if info is None or info.rc == mqtt.MQTT_ERR_PAYLOAD_SIZE:
+                descartados += 1
+                continue
+            if _rechazado(info, item[2]):
+                no_publicados.append(item)
+                continue
+            try:
+                info.wait_for_publish(timeout=max(0.0, limite - time.monotonic()))
+            except Exception:
+                pass
+            if info.rc == mqtt.MQTT_ERR_SUCCESS and info.is_published():
+                publicados += 1
+                latencias.append(time.monotonic() - item[4])
+            else:
+                sin_confirmar += 1
+
+        with self._outbox_cv:
+            st = self._outbox_stats
+            st["lotes"] += 1
+            st["publicados"] += publicados
+            st["fallidos"] += len(no_publicados)
+            st["descartados"] += descartados
+            st["sin_confirmar"] += sin_confirmar
+            if latencias:
+                st["latencia_total"] += sum(latencias)
+                st["latencia_ultima"] = latencias[-1]
+                st["latencia_max"] = max(st["latencia_max"], max(latencias))
+        if publicados:
+            mqtt_metrics.contar("mqtt_publicaciones_total", publicados, via="outbox")
+        if no_publicados or descartados:
+            mqtt_metrics.contar(
+                "mqtt_publicaciones_fallidas_total", len(no_publicados) + descartados, via="outbox"
+            )
+        return no_publicados, sin_confirmar
+
+    # =====================================================
+    # 📡 Comandos con ACK
+    # =====================================================
+    def _nuevo_comando(self, sede: str, device: str, action: str, payload: dict | None):
+        """Arma el cuerpo del comando (el ACK llega por TOPIC_ACK_WILDCARD)."""
+        cmd_id = f"c-{uuid.uuid4().hex[:8]}"
         body = {"id": cmd_id, "ts": int(time.time()), "action": action}
         if payload:
             body.update(payload)
+        return cmd_id, body
+
+    def _resolver_ack(self, cmd_id, ok: bool, origen=None):
+        """Llamado desde el hilo de paho al recibir un /cmd/ack."""
+        with self._lock:
+            pend = self._pending.get(cmd_id)
+        # Solo vale el ACK del dispositivo al que se envió el comando
+        if pend is None or (origen is not None and origen != pend["origen"]):
+            return
+        sede, device = pend["origen"]
+        mqtt_metrics.observar("mqtt_ack_seconds", time.perf_counter() - pend["t0"],
+                              buckets=BUCKETS_ACK, sede=sede, device=device)
+        mqtt_metrics.contar("mqtt_acks_total", sede=sede, device=device, ok=str(ok).lower())
+        if "future" in pend:
+            # El future pertenece al event loop: se resuelve en su hilo
+            pend["loop"].call_soon_threadsafe(_set_result, pend["future"], ok)
+        else:
+            pend["ok"] = ok
+            pend["event"].set()
+
+    async def send_command(self, sede: str, device: str, action: str,
+                           payload: dict | None = None, timeout: float = 5.0) -> bool:
+        """
+        Versión asyncio de send_command_and_wait_ack: la espera del ACK es un
+        Future (no ocupa hilos). Devuelve True si ok==true dentro del timeout.
+        """
+        cmd_id, body = self._nuevo_comando(sede, device, action, payload)
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        with self._lock:
+            self._pending[cmd_id] = {"future": fut, "loop": loop, "origen": (sede, device),
+                                     "t0": time.perf_counter()}
+        try:
+            if not self.publish_json_nowait(topic_cmd(sede, device), body, qos=1, retain=False):
+                raise RuntimeError("No se pudo publicar el comando")
+            try:
+                return bool(await asyncio.wait_for(fut, timeout=timeout))
+            except asyncio.TimeoutError:
+                print("⏱️ Timeout esperando ACK")
+                mqtt_metrics.contar("mqtt_ack_timeouts_total", sede=sede, device=device)
+                return False
+        finally:
+            with self._lock:
+                self._pending.pop(cmd_id, None)
+
+    async def send_command_many(self, sede: str, devices: list[str], action: str,
+                                payload: dict | None = None, timeout: float = 5.0) -> dict:
+        """
+        Publica el mismo comando a varios dispositivos y espera todos los ACKs
+        en paralelo (mismo plazo para todos): la latencia total es la del más
+        lento, no la suma. Devuelve {device: {"ok": bool, "error": str|None}}.
+        """
+        async def uno(device: str):
+            try:
+                ok = await self.send_command(sede, device, action, payload, timeout=timeout)
+                return device, {"ok": ok, "error": None if ok else "Sin ACK o ACK con error"}
+            except Exception as e:
+                return device, {"ok": False, "error": str(e)}
+
+        return dict(await asyncio.gather(*(uno(d) for d in dict.fromkeys(devices))))
+
+    def send_command_and_wait_ack(self, sede: str, device: str, action: str,
+                                  payload: dict | None = None, timeout: float = 5.0) -> bool:
+        """
+        Publica en devices/<sede>/<device>/cmd y espera ACK en /cmd/ack.
+        Devuelve True si ok==true en el ACK dentro del timeout.
+        Bloquea el hilo que llama: desde rutas async usar send_command().
+        """
+        cmd_id, body = self._nuevo_comando(sede, device, action, payload)
 
         ev = threading.Event()
         with self._lock:
-            self._pending[cmd_id] = {"event": ev, "ok": None}
+            self._pending[cmd_id] = {"event": ev, "ok": None, "origen": (sede, device),
+                                     "t0": time.perf_counter()}
 
-        if not self.publish_json(t_cmd, body, qos=1, retain=False):
+        if not self.publish_json(topic_cmd(sede, device), body, qos=1, retain=False):
             with self._lock:
                 self._pending.pop(cmd_id, None)
             raise RuntimeError("No se pudo publicar el comando")
@@ -208,6 +677,7 @@ class MQTTClient:
             with self._lock:
                 self._pending.pop(cmd_id, None)
             print("⏱️ Timeout esperando ACK")
+            mqtt_metrics.contar("mqtt_ack_timeouts_total", sede=sede, device=device)
             return False
 
         with self._lock:
@@ -215,6 +685,39 @@ class MQTTClient:
         return bool(ok)
 
 
+def _publicado(via: str, ok: bool) -> bool:
+    """Cuenta una publicación (ok o fallida) por vía y devuelve `ok`."""
+    mqtt_metrics.contar(
+        "mqtt_publicaciones_total" if ok else "mqtt_publicaciones_fallidas_total", via=via
+    )
+    return ok
+
+
+def _rechazado(info, qos: int) -> bool:
+    """
+    True si paho no se quedó con el mensaje. Con QoS > 0 y sin conexión
+    (MQTT_ERR_NO_CONN) paho sí lo guarda y lo envía al reconectar.
+    """
+    if info.rc == mqtt.MQTT_ERR_SUCCESS:
+        return False
+    return not (info.rc == mqtt.MQTT_ERR_NO_CONN and qos > 0)
+
+
+def _registros_spool(mensajes: list) -> list:
+    """(topic, payload, qos, retain, t0 monotónico) -> registros JSON con ts epoch."""
+    ahora, ahora_mono = time.time(), time.monotonic()
+    return [
+        {"topic": topic, "payload": payload, "qos": qos, "retain": retain,
+         "ts": ahora - (ahora_mono - t0)}
+        for topic, payload, qos, retain, t0 in mensajes
+    ]
+
+
+def _set_result(fut: asyncio.Future, ok: bool):
+    if not fut.done():
+        fut.set_result(ok)
+
+
 # =====================================================
 #  Singleton global
 # =====================================================
@@ -0,0 +1,36 @@
+"""
+Reconstruye el rollup de reportes (asistencia_diaria) desde asistencia. Uso:
+
+    python -m app.reconstruir_rollups [desde YYYY-MM-DD] [hasta YYYY-MM-DD]
+
+Sin argumentos rehace la tabla completa. Es idempotente: borra el rango y
+lo vuelve a agregar en una sola transacción.
+"""
+import logging
+import sys
+from datetime import date
+
+from app.db.session import SessionLocal
+from app.repositories.asistencia_diaria_repository import AsistenciaDiariaRepository
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def reconstruir(desde: date | None = None, hasta: date | None = None) -> None:
+    db = SessionLocal()
+    try:
+        filas = AsistenciaDiariaRepository().reconstruir(db, desde, hasta)
+        db.commit()
+        logger.info(f"✅ asistencia_diaria reconstruida ({desde or 'inicio'} .. {hasta or 'fin'}): {filas} filas")
+    except Exception:
+        db.rollback()
+        logger.exception("❌ Error reconstruyendo asistencia_diaria")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    fechas = [date.fromisoformat(a) for a in sys.argv[1:3]]
+    reconstruir(*fechas)
@@ -0,0 +1,92 @@
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Tuple
+
+from sqlalchemy import select, func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.acceso_diario import AccesoDiario
+from app.models.asistencia import Asistencia
+from .base import BaseRepository, AsyncBaseRepository
+
+
+def _incremento_stmt():
+    """
+    INSERT ... ON DUPLICATE KEY UPDATE accesos = accesos + n
+    (parámetros: id_cliente, fecha, accesos). Atómico, sin SELECT previo.
+    """
+    stmt = mysql_insert(AccesoDiario)
+    return stmt.on_duplicate_key_update(accesos=AccesoDiario.accesos + stmt.inserted.accesos)
+
+
+class AccesoDiarioRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(AccesoDiario)
+
+    def incrementar(self, db: Session, cliente_id: int, dia: date, n: int = 1) -> None:
+        """Suma n accesos al día del cliente. No hace commit (misma transacción que la asistencia)."""
+        db.execute(_incremento_stmt(), {"id_cliente": cliente_id, "fecha": dia, "accesos": n})
+
+    def recalcular(self, db: Session, cliente_id: int, dia: date) -> None:
+        """
+        Recalcula el contador desde asistencia (altas/bajas/ediciones manuales).
+        No hace commit.
+        """
+        inicio = datetime.combine(dia, time.min)
+        total = db.query(func.count(Asistencia.id)).filter(
+            Asistencia.id_cliente == cliente_id,
+            Asistencia.fecha_hora_entrada >= inicio,
+            Asistencia.fecha_hora_entrada < inicio + timedelta(days=1),
+        ).scalar() or 0
+        stmt = mysql_insert(AccesoDiario).values(id_cliente=cliente_id, fecha=dia, accesos=total)
+        db.execute(stmt.on_duplicate_key_update(accesos=stmt.inserted.accesos))
+
+
+class AsyncAccesoDiarioRepository(AsyncBaseRepository):
+    def __init__(self):
+        super().__init__(AccesoDiario)
+
+    async def get_por_cliente_dia(
+        self,
+        db: AsyncSession,
+        cliente_ids: List[int],
+        desde: date,
+        hasta: date,
+    ) -> Dict[Tuple[int, date], int]:
+        """Accesos por (cliente, día) en [desde, hasta] en una sola consulta."""
+        result = await db.execute(
+            select(AccesoDiario.id_cliente, AccesoDiario.fecha, AccesoDiario.accesos).where(
+                AccesoDiario.id_cliente.in_(cliente_ids),
+                AccesoDiario.fecha >= desde,
+                AccesoDiario.fecha <= hasta,
+            )
+        )
+        return {(cid, d): n for cid, d, n in result.all()}
+
+    async def incrementar(self, db: AsyncSession, cliente_id: int, dia: date, n: int = 1) -> None:
+        await db.execute(_incremento_stmt(), {"id_cliente": cliente_id, "fecha": dia, "accesos": n})
+
+    async def incrementar_y_leer(self, db: AsyncSession, cliente_id: int, dia: date) -> int:
+        """
+        Suma 1 y devuelve el contador resultante. El upsert deja la fila
+        bloqueada hasta el commit: accesos concurrentes del mismo cliente
+        (en cualquier worker) se serializan y cada uno ve el valor real.
+        No hace commit.
+        """
+        await self.incrementar(db, cliente_id, dia)
+        result = await db.execute(
+            select(AccesoDiario.accesos).where(
+                AccesoDiario.id_cliente == cliente_id,
+                AccesoDiario.fecha == dia,
+            )
+        )
+        return result.scalar_one()
+
+    async def incrementar_varios(self, db: AsyncSession, conteos: Dict[Tuple[int, date], int]) -> None:
+        """Suma {(cliente, día): n} en un único executemany. No hace commit."""
+        if conteos:
+            await db.execute(
+                _incremento_stmt(),
+                [{"id_cliente": cid, "fecha": d, "accesos": n} for (cid, d), n in conteos.items()],
+            )
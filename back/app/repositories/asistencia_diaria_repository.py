@@ -0,0 +1,127 @@
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, or_, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.asistencia import Asistencia
+from app.models.asistencia_diaria import AsistenciaDiaria
+from app.models.sede import Sede
+from .base import BaseRepository, AsyncBaseRepository
+
+# (id_sede, fecha, permitido, con_venta)
+Clave = Tuple[int, date, bool, bool]
+
+
+def clave_rollup(id_sede, fecha_hora_entrada: datetime, motivo_error, id_venta) -> Clave:
+    """Fila del rollup a la que suma una asistencia."""
+    return (id_sede or 0, fecha_hora_entrada.date(), motivo_error is None, id_venta is not None)
+
+
+def _incremento_stmt():
+    """INSERT ... ON DUPLICATE KEY UPDATE total = total + n (atómico, sin SELECT previo)."""
+    stmt = mysql_insert(AsistenciaDiaria)
+    return stmt.on_duplicate_key_update(total=AsistenciaDiaria.total + stmt.inserted.total)
+
+
+def _params(conteos: Counter) -> List[dict]:
+    return [
+        {"id_sede": s, "fecha": f, "permitido": p, "con_venta": v, "total": n}
+        for (s, f, p, v), n in conteos.items()
+    ]
+
+
+def _rango(columna, desde: Optional[date], hasta: Optional[date]) -> list:
+    """Filtros [desde, hasta] (días completos) sobre una columna DATETIME."""
+    filtros = []
+    if desde is not None:
+        filtros.append(columna >= datetime.combine(desde, time.min))
+    if hasta is not None:
+        filtros.append(columna < datetime.combine(hasta + timedelta(days=1), time.min))
+    return filtros
+
+
+def agregado_stmt(desde: Optional[date], hasta: Optional[date], sedes: Optional[List[int]] = None):
+    """
+    SELECT que agrega asistencia por clave del rollup en [desde, hasta].
+    Con `sedes` (todas las de la tabla sede) el filtro
+    "id_sede IS NULL OR id_sede IN (...)" no descarta filas (FK) pero deja
+    recorrer ix_asistencia_sede_fecha por rangos (sede, día).
+    """
+    fecha = func.date(Asistencia.fecha_hora_entrada)
+    sede = func.coalesce(Asistencia.id_sede, 0)
+    permitido = Asistencia.motivo_error.is_(None)
+    con_venta = Asistencia.id_venta.isnot(None)
+    filtros = [
+        Asistencia.fecha_hora_entrada.isnot(None),
+        *_rango(Asistencia.fecha_hora_entrada, desde, hasta),
+    ]
+    if sedes is not None:
+        filtros.append(or_(Asistencia.id_sede.is_(None), Asistencia.id_sede.in_(sedes)))
+    return (
+        select(sede, fecha, permitido, con_venta, func.count())
+        .where(*filtros)
+        .group_by(sede, fecha, permitido, con_venta)
+    )
+
+
+class AsistenciaDiariaRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(AsistenciaDiaria)
+
+    def incrementar(self, db: Session, asistencia: Asistencia) -> None:
+        """Suma la asistencia a su fila del rollup. No hace commit."""
+        clave = clave_rollup(
+            asistencia.id_sede, asistencia.fecha_hora_entrada, asistencia.motivo_error, asistencia.id_venta
+        )
+        db.execute(_incremento_stmt(), _params(Counter([clave])))
+
+    def reconstruir(self, db: Session, desde: Optional[date] = None, hasta: Optional[date] = None) -> int:
+        """
+        Rehace el rollup desde asistencia para [desde, hasta] (sin límites:
+        toda la tabla). Devuelve las filas escritas. No hace commit.
+        """
+        sedes = None
+        if desde is not None or hasta is not None:
+            sedes = list(db.execute(select(Sede.id)).scalars())
+        agregado = agregado_stmt(desde, hasta, sedes)
+        borrar = delete(AsistenciaDiaria)
+        if desde is not None:
+            borrar = borrar.where(AsistenciaDiaria.fecha >= desde)
+        if hasta is not None:
+            borrar = borrar.where(AsistenciaDiaria.fecha <= hasta)
+        db.execute(borrar)
+        result = db.execute(
+            insert(AsistenciaDiaria).from_select(
+                ["id_sede", "fecha", "permitido", "con_venta", "total"], agregado
+            )
+        )
+        return result.rowcount
+
+    def recalcular_dias(self, db: Session, dias: Iterable[date]) -> None:
+        """Rehace los días tocados por altas/bajas/ediciones manuales. No hace commit."""
+        for dia in set(dias):
+            self.reconstruir(db, dia, dia)
+
+
+class AsyncAsistenciaDiariaRepository(AsyncBaseRepository):
+    def __init__(self):
+        super().__init__(AsistenciaDiaria)
+
+    async def incrementar(self, db: AsyncSession, asistencia: Asistencia) -> None:
+        clave = clave_rollup(
+            asistencia.id_sede, asistencia.fecha_hora_entrada, asistencia.motivo_error, asistencia.id_venta
+        )
+        await db.execute(_incremento_stmt(), _params(Counter([clave])))
+
+    async def incrementar_varios(self, db: AsyncSession, filas: List[dict]) -> None:
+        """Suma filas de asistencia (dicts de bulk_insert) en un único executemany. No hace commit."""
+        conteos = Counter(
+            clave_rollup(f["id_sede"], f["fecha_hora_entrada"], f["motivo_error"], f["id_venta"])
+            for f in filas
+        )
+        if conteos:
+            await db.execute(_incremento_stmt(), _params(conteos))
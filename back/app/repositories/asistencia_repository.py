@@ -2,26 +2,17 @@ from datetime import datetime, timedelta
 from typing import List, Optional
 
 from sqlalchemy.orm import Session, joinedload, load_only
-from sqlalchemy import func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, and_, insert, select, tuple_
 
 from app.models.asistencia import Asistencia
 from app.models.cliente import Cliente
 from app.models.venta_membresia import VentaMembresia
-from .base import BaseRepository
+from .base import BaseRepository, AsyncBaseRepository
 class AsistenciaRepository(BaseRepository):
     def __init__(self):
         super().__init__(Asistencia)
 
-    def count_today_for_client(self, db: Session, cliente_id: int):
-        now = datetime.now()
-        start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        end = start + timedelta(days=1)
-        return db.query(func.count(Asistencia.id)).filter(
-            Asistencia.id_cliente == cliente_id,
-            Asistencia.fecha_hora_entrada >= start,
-            Asistencia.fecha_hora_entrada < end
-        ).scalar() or 0
-        
     def get_all_with_relations(
         self,
         db: Session,
@@ -118,4 +109,27 @@ class AsistenciaRepository(BaseRepository):
             q = q.filter(Asistencia.fecha_hora_entrada >= fecha_desde)
         if fecha_hasta is not None:
             q = q.filter(Asistencia.fecha_hora_entrada < fecha_hasta)
-        return q.scalar() or 0
\ No newline at end of file
+        return q.scalar() or 0
+
+
+class AsyncAsistenciaRepository(AsyncBaseRepository):
+    def __init__(self):
+        super().__init__(Asistencia)
+
+    async def bulk_insert(self, db: AsyncSession, rows: List[dict]) -> None:
+        """INSERT masivo (executemany) sin cargar objetos ORM. No hace commit."""
+        if rows:
+            await db.execute(insert(Asistencia), rows)
+
+    async def get_registradas(self, db: AsyncSession, claves: List[tuple]) -> dict:
+        """
+        Asistencias ya guardadas para pares (id_cliente, fecha_hora_entrada)
+        (ix_asistencia_cliente_fecha). Devuelve {(id_cliente, fecha): motivo_error}.
+        """
+        if not claves:
+            return {}
+        result = await db.execute(
+            select(Asistencia.id_cliente, Asistencia.fecha_hora_entrada, Asistencia.motivo_error)
+            .where(tuple_(Asistencia.id_cliente, Asistencia.fecha_hora_entrada).in_(claves))
+        )
+        return {(r.id_cliente, r.fecha_hora_entrada): r.motivo_error for r in result}
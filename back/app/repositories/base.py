@@ -1,4 +1,6 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 class BaseRepository:
     def __init__(self, model):
@@ -30,3 +32,16 @@ class BaseRepository:
             db.delete(obj)
             db.commit()
         return obj
+
+
+class AsyncBaseRepository:
+    """Equivalente asíncrono (solo lectura) de BaseRepository."""
+    def __init__(self, model):
+        self.model = model
+
+    async def get_all(self, db: AsyncSession):
+        result = await db.execute(select(self.model))
+        return result.scalars().all()
+
+    async def get_by_id(self, db: AsyncSession, id_value: int):
+        return await db.get(self.model, id_value)
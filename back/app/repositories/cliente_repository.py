@@ -1,17 +1,109 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date
 from app.models.cliente import Cliente
 from app.schemas.cliente import ClienteCreate, ClienteBase
-from .base import BaseRepository
+from .base import BaseRepository, AsyncBaseRepository
 from typing import Optional, List, Tuple
 from sqlalchemy import asc, select, func, and_, desc, case
-from sqlalchemy import func, or_
+from sqlalchemy import func, or_, update
 from app.models.venta_membresia import VentaMembresia
+from app.models.membresia import Membresia
+from app.models.acceso_diario import AccesoDiario
+from . import keyset
+
+
+def acceso_snapshot_stmt(
+    *,
+    id_huella: Optional[int] = None,
+    documento: Optional[str] = None,
+    cliente_id: Optional[int] = None,
+):
+    """
+    SELECT único del control de acceso (compartido por el repositorio
+    síncrono y el asíncrono).
+    """
+    venta_activa = (
+        select(VentaMembresia.id)
+        .where(
+            VentaMembresia.id_cliente == Cliente.id,
+            VentaMembresia.fecha_fin >= date.today(),
+        )
+        .order_by(VentaMembresia.fecha_fin.desc())
+        .limit(1)
+        .correlate(Cliente)
+        .scalar_subquery()
+    )
+    # Contador diario mantenido (PK id_cliente, fecha): lookup O(1)
+    accesos_hoy = (
+        select(AccesoDiario.accesos)
+        .where(
+            AccesoDiario.id_cliente == Cliente.id,
+            AccesoDiario.fecha == date.today(),
+        )
+        .correlate(Cliente)
+        .scalar_subquery()
+    )
+
+    stmt = (
+        select(
+            Cliente.id,
+            Cliente.nombre,
+            Cliente.apellido,
+            Cliente.documento,
+            Cliente.fotografia,
+            Cliente.id_huella,
+            VentaMembresia.id.label("id_venta"),
+            VentaMembresia.fecha_fin,
+            VentaMembresia.sesiones_restantes,
+            Membresia.nombre_membresia,
+            Membresia.max_accesos_diarios,
+            accesos_hoy.label("accesos_hoy"),
+        )
+        .select_from(Cliente)
+        .outerjoin(VentaMembresia, VentaMembresia.id == venta_activa)
+        .outerjoin(Membresia, Membresia.id == VentaMembresia.id_membresia)
+    )
+    if id_huella is not None:
+        return stmt.where(Cliente.id_huella == id_huella)
+    if documento is not None:
+        return stmt.where(Cliente.documento == documento)
+    return stmt.where(Cliente.id == cliente_id)
+
+
+def venta_actual_stmt():
+    """
+    UPDATE cliente SET id_venta_actual = última venta (fecha_inicio DESC,
+    id DESC; resuelta sobre ix_venta_membresia_cliente_inicio).
+    """
+    ultima = (
+        select(VentaMembresia.id)
+        .where(VentaMembresia.id_cliente == Cliente.id)
+        .order_by(VentaMembresia.fecha_inicio.desc(), VentaMembresia.id.desc())
+        .limit(1)
+        .correlate(Cliente)
+        .scalar_subquery()
+    )
+    return update(Cliente).values(id_venta_actual=ultima)
+
 
 class ClienteRepository(BaseRepository):
     def __init__(self):
         super().__init__(Cliente)
 
+    def actualizar_venta_actual(self, db: Session, *cliente_ids: Optional[int]) -> None:
+        """
+        Recalcula cliente.id_venta_actual tras crear/editar/borrar ventas.
+        Sin ids recalcula todos los clientes. No hace commit.
+        """
+        ids = {cid for cid in cliente_ids if cid is not None}
+        if cliente_ids and not ids:
+            return
+        stmt = venta_actual_stmt()
+        if ids:
+            stmt = stmt.where(Cliente.id.in_(ids))
+        db.execute(stmt.execution_options(synchronize_session=False))
+
     def get_by_documento(self, db: Session, documento: str):
         return db.query(Cliente).filter(Cliente.documento == documento).first()
     
@@ -121,17 +213,25 @@ class ClienteRepository(BaseRepository):
         q: Optional[str],
         sort_attr: str,
         descending: bool,
-        offset: int,
         limit: int,
+        cursor: Optional[keyset.Cursor] = None,
+        offset: int = 0,
     ) -> List[Cliente]:
+        """
+        Keyset sobre (sort_attr, id): con cursor no hay OFFSET y la página N
+        cuesta lo mismo que la primera. `offset` sólo para el acceso por
+        número de página sin cursor (compatibilidad). Devuelve hasta
+        limit + 1 filas (ver keyset.ventana).
+        """
         query = db.query(self.model)
         query = self._apply_filter(query, q)
 
         # Orden seguro por atributo permitido (validado en el service/endpoint)
         column = getattr(self.model, sort_attr)
-        query = query.order_by(column.desc() if descending else column.asc())
-
-        return query.offset(offset).limit(limit).all()
+        query = keyset.aplicar(query, column, self.model.id, descending, cursor, limit)
+        if cursor is None and offset:
+            query = query.offset(offset)
+        return query.all()
     
     def _compute_estado(self, fecha_fin: Optional[date], sesiones_restantes: Optional[int], estado_db: Optional[str]) -> str:
         """
@@ -154,17 +254,8 @@ class ClienteRepository(BaseRepository):
     
     def get_membership_summary_by_cliente_id(self, db: Session, cliente_id: int) -> Optional[dict]:
         """
-        Última venta de membresía para un cliente (por fecha_inicio DESC)
+        Última venta de membresía para un cliente (puntero cliente.id_venta_actual)
         """
-        # subquery: última venta por fecha_inicio
-        subq = (
-            select(VentaMembresia.id, VentaMembresia.id_cliente)
-            .where(VentaMembresia.id_cliente == cliente_id)
-            .order_by(VentaMembresia.fecha_inicio.desc())
-            .limit(1)
-            .subquery()
-        )
-
         stmt = (
             select(
                 Cliente.id.label("id"),
@@ -179,8 +270,7 @@ class ClienteRepository(BaseRepository):
                 VentaMembresia.estado,
             )
             .select_from(Cliente)
-            .join(subq, subq.c.id_cliente == Cliente.id, isouter=True)
-            .join(VentaMembresia, VentaMembresia.id == subq.c.id, isouter=True)
+            .join(VentaMembresia, VentaMembresia.id == Cliente.id_venta_actual, isouter=True)
             .where(Cliente.id == cliente_id)
         )
 
@@ -227,16 +317,6 @@ class ClienteRepository(BaseRepository):
         """
         Lista paginada: para cada cliente, su última venta de membresía (si existe).
         """
-        # subquery: última fecha por cliente
-        latest_per_cliente = (
-            select(
-                VentaMembresia.id_cliente.label("id_cliente"),
-                func.max(VentaMembresia.fecha_inicio).label("max_fecha")
-            )
-            .group_by(VentaMembresia.id_cliente)
-            .subquery()
-        )
-
         stmt = (
             select(
                 Cliente.id.label("id"),
@@ -251,15 +331,7 @@ class ClienteRepository(BaseRepository):
                 VentaMembresia.estado,
             )
             .select_from(Cliente)
-            .join(latest_per_cliente, latest_per_cliente.c.id_cliente == Cliente.id, isouter=True)
-            .join(
-                VentaMembresia,
-                and_(
-                    VentaMembresia.id_cliente == latest_per_cliente.c.id_cliente,
-                    VentaMembresia.fecha_inicio == latest_per_cliente.c.max_fecha,
-                ),
-                isouter=True,
-            )
+            .join(VentaMembresia, VentaMembresia.id == Cliente.id_venta_actual, isouter=True)
         )
 
         if q:
@@ -295,4 +367,54 @@ class ClienteRepository(BaseRepository):
                 "sesiones_restantes": r.get("sesiones_restantes"),
                 "estado": estado,
             })
-        return out
\ No newline at end of file
+        return out
+
+
+class AsyncClienteRepository(AsyncBaseRepository):
+    """Variante asíncrona (AsyncSession) para el camino caliente de acceso."""
+    def __init__(self):
+        super().__init__(Cliente)
+
+    async def get_acceso_snapshot(
+        self,
+        db: AsyncSession,
+        *,
+        id_huella: Optional[int] = None,
+        documento: Optional[str] = None,
+        cliente_id: Optional[int] = None,
+    ):
+        """
+        Un solo round trip con todo lo que necesita el control de acceso:
+        cliente, venta no vencida con fecha_fin más lejana + su membresía y
+        los accesos de hoy leídos del contador acceso_diario (lookup por PK).
+        Si es staff no sale de aquí: lo resuelve staff_cache.
+        Devuelve la fila o None si el cliente no existe.
+        """
+        stmt = acceso_snapshot_stmt(id_huella=id_huella, documento=documento, cliente_id=cliente_id)
+        result = await db.execute(stmt)
+        return result.first()
+
+    async def get_acceso_clientes(
+        self,
+        db: AsyncSession,
+        *,
+        huellas: List[int],
+        documentos: List[str],
+    ):
+        """
+        Resuelve en un solo IN los clientes de un lote de accesos (por
+        id_huella o documento).
+        """
+        stmt = (
+            select(
+                Cliente.id,
+                Cliente.nombre,
+                Cliente.apellido,
+                Cliente.documento,
+                Cliente.fotografia,
+                Cliente.id_huella,
+            )
+            .where(or_(Cliente.id_huella.in_(huellas), Cliente.documento.in_(documentos)))
+        )
+        result = await db.execute(stmt)
+        return result.all()
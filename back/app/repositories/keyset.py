@@ -0,0 +1,142 @@
+"""
+Paginación por cursor (keyset) sobre (columna de orden, id).
+
+En vez de OFFSET (que lee y descarta todas las filas anteriores) cada
+página filtra "después de la última fila vista" y recorre el índice de
+la columna de orden: la página N cuesta lo mismo que la primera.
+
+El cursor es opaco para el cliente: JSON en base64url con el valor de
+orden y el id de la fila frontera, el número de página al que lleva, la
+dirección y el orden con el que se generó.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Any, Callable, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+
+class Cursor:
+    __slots__ = ("valor", "id", "pagina", "atras", "orden")
+
+    def __init__(self, valor: Any, id: int, pagina: int, atras: bool = False, orden: str = ""):
+        self.valor = valor
+        self.id = id
+        self.pagina = pagina
+        self.atras = atras
+        self.orden = orden
+
+
+def _a_json(valor: Any) -> Any:
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return valor
+
+
+def codificar_cursor(cursor: Cursor) -> str:
+    datos = {
+        "v": _a_json(cursor.valor),
+        "i": cursor.id,
+        "p": cursor.pagina,
+        "a": int(cursor.atras),
+        "o": cursor.orden,
+    }
+    crudo = json.dumps(datos, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(crudo).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(token: str, orden: str = "") -> Cursor:
+    """Lanza ValueError si el token está mal formado o es de otro orden."""
+    try:
+        crudo = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        datos = json.loads(crudo)
+        cursor = Cursor(datos["v"], int(datos["i"]), int(datos["p"]), bool(datos["a"]), datos["o"])
+    except (binascii.Error, ValueError, TypeError, KeyError) as e:
+        raise ValueError(f"cursor mal formado: {e}")
+    if cursor.orden != orden:
+        raise ValueError("el cursor pertenece a otro orden")
+    if cursor.pagina < 1:
+        raise ValueError("página del cursor fuera de rango")
+    return cursor
+
+
+def _tipar(columna, valor: Any) -> Any:
+    """Devuelve el valor del cursor (JSON) al tipo Python de la columna."""
+    if valor is None or not isinstance(valor, str):
+        return valor
+    tipo = columna.type.python_type
+    if issubclass(tipo, datetime):
+        return datetime.fromisoformat(valor)
+    if issubclass(tipo, date):
+        return date.fromisoformat(valor)
+    return valor
+
+
+def despues_de(columna, id_col, valor: Any, id_: int, descendente: bool):
+    """
+    Filas estrictamente posteriores a (valor, id_) en el orden
+    (columna, id_col) asc/desc. Sigue la semántica de MySQL: NULL es el
+    menor valor (primero en ASC, último en DESC).
+    """
+    if not descendente:
+        if valor is None:
+            return or_(and_(columna.is_(None), id_col > id_), columna.isnot(None))
+        return or_(and_(columna == valor, id_col > id_), columna > valor)
+    if valor is None:
+        return and_(columna.is_(None), id_col < id_)
+    return or_(and_(columna == valor, id_col < id_), columna < valor, columna.is_(None))
+
+
+def aplicar(query, columna, id_col, descendente: bool, cursor: Optional[Cursor], limit: int):
+    """
+    Añade filtro keyset, orden y LIMIT limit + 1 (la fila extra indica si
+    hay más) a una Query. Hacia atrás se recorre el orden invertido y
+    `ventana` devuelve las filas al orden pedido.
+    """
+    atras = cursor is not None and cursor.atras
+    desc_efectivo = descendente != atras
+    if cursor is not None:
+        valor = _tipar(columna, cursor.valor)
+        query = query.filter(despues_de(columna, id_col, valor, cursor.id, desc_efectivo))
+    if desc_efectivo:
+        query = query.order_by(columna.desc(), id_col.desc())
+    else:
+        query = query.order_by(columna.asc(), id_col.asc())
+    return query.limit(limit + 1)
+
+
+class Ventana:
+    """Una página keyset: filas en orden y si hay páginas a cada lado."""
+
+    __slots__ = ("filas", "pagina", "hay_anterior", "hay_siguiente")
+
+    def __init__(self, filas: List[Any], pagina: int, hay_anterior: bool, hay_siguiente: bool):
+        self.filas = filas
+        self.pagina = pagina
+        self.hay_anterior = hay_anterior
+        self.hay_siguiente = hay_siguiente
+
+    def cursores(self, clave: Callable[[Any], Tuple[Any, int]], orden: str = "") -> Tuple[Optional[str], Optional[str]]:
+        """(siguiente, anterior) como tokens opacos; None si no hay página."""
+        if not self.filas:
+            return None, None
+        siguiente = anterior = None
+        if self.hay_siguiente:
+            valor, id_ = clave(self.filas[-1])
+            siguiente = codificar_cursor(Cursor(valor, id_, self.pagina + 1, False, orden))
+        if self.hay_anterior:
+            valor, id_ = clave(self.filas[0])
+            anterior = codificar_cursor(Cursor(valor, id_, self.pagina - 1, True, orden))
+        return siguiente, anterior
+
+
+def ventana(filas: List[Any], limit: int, cursor: Optional[Cursor], pagina: int) -> Ventana:
+    """Recorta la fila extra de `aplicar` y resuelve has_next/has_prev."""
+    hay_mas = len(filas) > limit
+    filas = list(filas[:limit])
+    if cursor is not None and cursor.atras:
+        filas.reverse()
+        return Ventana(filas, pagina, hay_mas, True)
+    return Ventana(filas, pagina, pagina > 1, hay_mas)
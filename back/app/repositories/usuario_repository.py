@@ -1,6 +1,17 @@
+from typing import Set
+from sqlalchemy import select
 from sqlalchemy.orm import joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.usuario import Usuario
-from .base import BaseRepository
+from .base import BaseRepository, AsyncBaseRepository
+
+
+def _staff_cliente_ids_stmt():
+    return select(Usuario.id_cliente).where(
+        Usuario.activo == True,
+        Usuario.id_cliente.is_not(None),
+    ).distinct()
+
 
 class UsuarioRepository(BaseRepository):
     def __init__(self):
@@ -11,3 +22,16 @@ class UsuarioRepository(BaseRepository):
 
     def get_by_username(self, db, username: str):
         return db.query(Usuario).options(joinedload(Usuario.rol)).filter(Usuario.nombre_usuario == username).first()
+
+    def get_staff_cliente_ids(self, db) -> Set[int]:
+        """Ids de clientes vinculados a un usuario activo (staff)."""
+        return set(db.execute(_staff_cliente_ids_stmt()).scalars().all())
+
+
+class AsyncUsuarioRepository(AsyncBaseRepository):
+    def __init__(self):
+        super().__init__(Usuario)
+
+    async def get_staff_cliente_ids(self, db: AsyncSession) -> Set[int]:
+        result = await db.execute(_staff_cliente_ids_stmt())
+        return set(result.scalars().all())
@@ -1,7 +1,11 @@
+from sqlalchemy import select, update, bindparam
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date
+from typing import Dict, List
 from app.models.venta_membresia import VentaMembresia
-from .base import BaseRepository
+from app.models.membresia import Membresia
+from .base import BaseRepository, AsyncBaseRepository
 
 class VentaMembresiaRepository(BaseRepository):
     def __init__(self):
@@ -14,4 +18,73 @@ class VentaMembresiaRepository(BaseRepository):
         return db.query(VentaMembresia).filter(
             VentaMembresia.id_cliente == cliente_id,
             VentaMembresia.fecha_fin >= date.today()
-        ).order_by(VentaMembresia.fecha_fin.desc()).first()
\ No newline at end of file
+        ).order_by(VentaMembresia.fecha_fin.desc()).first()
+
+
+class AsyncVentaMembresiaRepository(AsyncBaseRepository):
+    def __init__(self):
+        super().__init__(VentaMembresia)
+
+    async def descontar_sesion(self, db: AsyncSession, venta_id: int) -> bool:
+        """
+        Descuenta una sesión con un UPDATE condicional atómico:
+        SET sesiones_restantes = sesiones_restantes - 1
+        WHERE id = ? AND sesiones_restantes > 0
+        La fila afectada ES la decisión (sin SELECT ... FOR UPDATE):
+        devuelve False si ya no quedaban sesiones. No hace commit.
+        """
+        result = await db.execute(
+            update(VentaMembresia)
+            .where(
+                VentaMembresia.id == venta_id,
+                VentaMembresia.sesiones_restantes > 0,
+            )
+            .values(sesiones_restantes=VentaMembresia.sesiones_restantes - 1)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+    async def find_active_for_clients(self, db: AsyncSession, cliente_ids: List[int], desde: date):
+        """
+        Precarga (una consulta) las ventas no vencidas a `desde` de varios
+        clientes, con los límites de su membresía. Orden: fecha_fin DESC.
+        """
+        result = await db.execute(
+            select(
+                VentaMembresia.id.label("id_venta"),
+                VentaMembresia.id_cliente,
+                VentaMembresia.fecha_fin,
+                VentaMembresia.sesiones_restantes,
+                Membresia.nombre_membresia,
+                Membresia.max_accesos_diarios,
+            )
+            .join(Membresia, Membresia.id == VentaMembresia.id_membresia)
+            .where(
+                VentaMembresia.id_cliente.in_(cliente_ids),
+                VentaMembresia.fecha_fin >= desde,
+            )
+            .order_by(VentaMembresia.fecha_fin.desc())
+        )
+        return result.all()
+
+    async def descontar_sesiones(self, db: AsyncSession, descuentos: Dict[int, int]) -> List[int]:
+        """
+        Descuenta N sesiones por venta ({id_venta: n}) con un UPDATE condicional
+        por venta (WHERE sesiones_restantes >= n). Devuelve los id_venta que ya
+        no tenían sesiones suficientes (conflicto con otro acceso concurrente).
+        """
+        if not descuentos:
+            return []
+        t = VentaMembresia.__table__
+        stmt = (
+            update(t)
+            .where(t.c.id == bindparam("b_id"), t.c.sesiones_restantes >= bindparam("b_n"))
+            .values(sesiones_restantes=t.c.sesiones_restantes - bindparam("b_n"))
+        )
+        sin_sesiones = []
+        # Una sentencia por venta: rowcount de executemany no es fiable por fila
+        for vid, n in descuentos.items():
+            result = await db.execute(stmt, {"b_id": vid, "b_n": n})
+            if result.rowcount != 1:
+                sin_sesiones.append(vid)
+        return sin_sesiones
@@ -8,9 +8,9 @@ class Page(BaseModel, Generic[T]):
     items: List[T]
     page: int
     size: int
-    total: int
-    pages: int
+    total: Optional[int] = None  # None si no se pidió el COUNT (include_total)
+    pages: Optional[int] = None
     has_next: bool
     has_prev: bool
-    next: Optional[str] = None
+    next: Optional[str] = None  # URL con el cursor opaco de la página siguiente
     prev: Optional[str] = None
@@ -33,4 +33,11 @@ class SerieMensualOut(BaseModel):
     items: List[PuntoMes]
 
 class SerieAnualOut(BaseModel):
-    items: List[PuntoAnio]
\ No newline at end of file
+    items: List[PuntoAnio]
+
+class DashboardOut(BaseModel):
+    membresias: ResumenMembresiasOut
+    asistencias: ResumenAsistenciasOut
+    diarias: List[PuntoDia]
+    mensuales: List[PuntoMes]
+    anuales: List[PuntoAnio]
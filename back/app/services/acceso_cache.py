@@ -0,0 +1,186 @@
+# app/services/acceso_cache.py
+import threading
+import time
+from datetime import date
+from typing import Dict, Iterable, Optional
+
+from app.core.config import settings
+
+
+class ClienteCacheado:
+    """Copia plana del Cliente (solo lo que usa el control de acceso)."""
+    __slots__ = ("id", "nombre", "apellido", "documento", "fotografia", "id_huella")
+
+    def __init__(self, row):
+        self.id = row.id
+        self.nombre = row.nombre
+        self.apellido = row.apellido
+        self.documento = row.documento
+        self.fotografia = row.fotografia
+        self.id_huella = row.id_huella
+
+
+class VentaCacheada:
+    """Copia plana de la venta activa + límites de su membresía."""
+    __slots__ = ("id", "fecha_fin", "sesiones_restantes", "nombre_membresia", "max_accesos_diarios")
+
+    def __init__(self, row):
+        self.id = row.id_venta
+        self.fecha_fin = row.fecha_fin
+        self.sesiones_restantes = row.sesiones_restantes
+        self.nombre_membresia = row.nombre_membresia
+        self.max_accesos_diarios = row.max_accesos_diarios
+
+
+class AccesoEntry:
+    """
+    Todo lo que verificar_acceso necesita para decidir sin ir a la DB:
+    cliente, si es staff, venta activa (con límites) y accesos de hoy.
+    """
+    __slots__ = ("cliente", "es_staff", "venta", "accesos_hoy", "dia", "cargado_en")
+
+    def __init__(
+        self,
+        cliente: ClienteCacheado,
+        es_staff: bool,
+        venta: Optional[VentaCacheada],
+        accesos_hoy: int,
+    ):
+        self.cliente = cliente
+        self.es_staff = es_staff
+        self.venta = venta
+        self.accesos_hoy = accesos_hoy
+        self.dia = date.today()
+        self.cargado_en = time.monotonic()
+
+    @classmethod
+    def desde_fila(cls, row, es_staff: bool) -> "AccesoEntry":
+        """Construye la entrada desde AsyncClienteRepository.get_acceso_snapshot."""
+        venta = VentaCacheada(row) if (row.id_venta is not None and not es_staff) else None
+        return cls(ClienteCacheado(row), es_staff, venta, int(row.accesos_hoy or 0))
+
+
+class AccesoCache:
+    """
+    Cache en memoria (por proceso) de decisiones de acceso.
+    - Indexada por id_huella y por documento (y por id de cliente para invalidar).
+    - Una entrada caduca al cambiar el día o tras `ttl` segundos (protege
+      contra escrituras hechas por otros procesos/workers).
+    - Los servicios que escriben cliente, venta_membresia, usuario o asistencia
+      llaman a invalidate_cliente() / clear().
+    - Cada invalidación sube la generación: una entrada cargada antes de
+      una escritura no se guarda después de ella (ver put).
+    - accesos_hoy es solo orientativo (por proceso): el límite diario se
+      verifica contra acceso_diario en la DB.
+    """
+    def __init__(self, ttl: float = 30.0):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._por_cliente: Dict[int, AccesoEntry] = {}
+        self._por_huella: Dict[int, AccesoEntry] = {}
+        self._por_documento: Dict[str, AccesoEntry] = {}
+        self._generacion = 0
+
+    @property
+    def generacion(self) -> int:
+        """Leer ANTES de consultar la DB y pasarla a put()."""
+        return self._generacion
+
+    def _vigente(self, entry: AccesoEntry) -> bool:
+        return entry.dia == date.today() and (time.monotonic() - entry.cargado_en) < self.ttl
+
+    def get(self, *, id_huella: Optional[int] = None, documento: Optional[str] = None) -> Optional[AccesoEntry]:
+        with self._lock:
+            if id_huella is not None:
+                entry = self._por_huella.get(id_huella)
+            else:
+                entry = self._por_documento.get(documento)
+            if entry is None:
+                return None
+            if not self._vigente(entry):
+                self._remove(entry.cliente.id)
+                return None
+            return entry
+
+    def put(self, entry: AccesoEntry, generacion: int) -> bool:
+        """
+        Guarda la entrada si no hubo invalidaciones desde `generacion`
+        (si las hubo, el snapshot puede ser anterior a la escritura).
+        """
+        with self._lock:
+            if generacion != self._generacion:
+                return False
+            self._remove(entry.cliente.id)
+            self._por_cliente[entry.cliente.id] = entry
+            if entry.cliente.id_huella is not None:
+                self._por_huella[entry.cliente.id_huella] = entry
+            self._por_documento[entry.cliente.documento] = entry
+            return True
+
+    def registrar_acceso(self, cliente_id: int, *, descontar_sesion: bool = False) -> None:
+        """Refleja en la entrada un acceso ya confirmado (commit) en la DB."""
+        with self._lock:
+            entry = self._por_cliente.get(cliente_id)
+            if entry is None:
+                return
+            entry.accesos_hoy += 1
+            if descontar_sesion and entry.venta and entry.venta.sesiones_restantes is not None:
+                entry.venta.sesiones_restantes -= 1
+
+    def _remove(self, cliente_id: int) -> None:
+        entry = self._por_cliente.pop(cliente_id, None)
+        if entry is None:
+            return
+        if self._por_huella.get(entry.cliente.id_huella) is entry:
+            del self._por_huella[entry.cliente.id_huella]
+        if self._por_documento.get(entry.cliente.documento) is entry:
+            del self._por_documento[entry.cliente.documento]
+
+    def invalidate_cliente(self, cliente_id: Optional[int]) -> None:
+        if cliente_id is None:
+            return
+        with self._lock:
+            self._remove(cliente_id)
+            self._generacion += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._por_cliente.clear()
+            self._por_huella.clear()
+            self._por_documento.clear()
+            self._generacion += 1
+
+
+class StaffCache:
+    """
+    Ids de clientes con un usuario activo (staff). Son pocos: se cargan una
+    vez (perezosamente) y UsuarioService los recarga cuando cambia
+    id_cliente o activo de un usuario (`ttl` cubre cambios hechos en otros
+    procesos/workers).
+    """
+    def __init__(self, ttl: float = 30.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._ids: Optional[frozenset] = None
+        self._cargado_en = 0.0
+
+    @property
+    def cargado(self) -> bool:
+        return self._ids is not None and (time.monotonic() - self._cargado_en) < self.ttl
+
+    def reemplazar(self, ids: Iterable[int]) -> None:
+        with self._lock:
+            self._ids = frozenset(ids)
+            self._cargado_en = time.monotonic()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._ids = None
+
+    def contiene(self, cliente_id: int) -> bool:
+        return cliente_id in (self._ids or ())
+
+
+# Singletons globales
+acceso_cache = AccesoCache(ttl=settings.ACCESO_CACHE_TTL)
+staff_cache = StaffCache(ttl=settings.ACCESO_CACHE_TTL)
@@ -0,0 +1,116 @@
+# app/services/acceso_metrics.py
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Tuple
+
+# Límites (segundos) de los buckets del histograma de etapas
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class _Etapa:
+    __slots__ = ("crono", "nombre", "t0")
+
+    def __init__(self, crono: "Cronometro", nombre: str):
+        self.crono = crono
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.crono.sumar(self.nombre, time.perf_counter() - self.t0)
+        return False
+
+
+class Cronometro:
+    """
+    Tiempos por etapa de UNA verificación de acceso (en segundos).
+    Uso: `with crono.etapa("snapshot"): ...`
+    """
+    __slots__ = ("spans",)
+
+    def __init__(self):
+        self.spans: Dict[str, float] = {}
+
+    def etapa(self, nombre: str) -> _Etapa:
+        return _Etapa(self, nombre)
+
+    def sumar(self, nombre: str, segundos: float) -> None:
+        self.spans[nombre] = self.spans.get(nombre, 0.0) + segundos
+
+    def server_timing(self) -> str:
+        """Valor del header Server-Timing (duraciones en ms)."""
+        return ", ".join(f"{n};dur={s * 1000:.2f}" for n, s in self.spans.items())
+
+
+class Histograma:
+    __slots__ = ("buckets", "cubetas", "suma", "total")
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.cubetas = [0] * (len(buckets) + 1)  # última: +Inf
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, segundos: float) -> None:
+        self.cubetas[bisect_left(self.buckets, segundos)] += 1
+        self.suma += segundos
+        self.total += 1
+
+
+class AccesoMetrics:
+    """
+    Histogramas por (etapa, tipo_acceso, id_sede) del pipeline de acceso,
+    exportados en formato de texto de Prometheus.
+    """
+    NOMBRE = "acceso_etapa_seconds"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, str, int], Histograma] = {}
+
+    def observar(self, crono: Cronometro, *, tipo_acceso: str, id_sede: int) -> None:
+        with self._lock:
+            for etapa, segundos in crono.spans.items():
+                clave = (etapa, tipo_acceso, id_sede)
+                hist = self._series.get(clave)
+                if hist is None:
+                    hist = self._series[clave] = Histograma()
+                hist.observar(segundos)
+
+    def render(self) -> str:
+        lineas = [
+            f"# HELP {self.NOMBRE} Duración por etapa de la verificación de acceso.",
+            f"# TYPE {self.NOMBRE} histogram",
+        ]
+        with self._lock:
+            for (etapa, tipo_acceso, id_sede), hist in sorted(self._series.items()):
+                etiquetas = f'etapa="{etapa}",tipo_acceso="{tipo_acceso}",id_sede="{id_sede}"'
+                acumulado = 0
+                for limite, n in zip(hist.buckets + (float("inf"),), hist.cubetas):
+                    acumulado += n
+                    le = "+Inf" if limite == float("inf") else repr(limite)
+                    lineas.append(f'{self.NOMBRE}_bucket{{{etiquetas},le="{le}"}} {acumulado}')
+                lineas.append(f"{self.NOMBRE}_sum{{{etiquetas}}} {hist.suma:.6f}")
+                lineas.append(f"{self.NOMBRE}_count{{{etiquetas}}} {hist.total}")
+        return "\n".join(lineas) + "\n"
+
+
+class MarcaTiempoMiddleware:
+    """
+    Middleware ASGI mínimo: marca la llegada de la petición en
+    request.state.t_inicio (permite medir parseo/validación HTTP).
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            scope.setdefault("state", {})["t_inicio"] = time.perf_counter()
+        await self.app(scope, receive, send)
+
+
+# Singleton global
+acceso_metrics = AccesoMetrics()
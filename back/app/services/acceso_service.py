@@ -1,187 +1,435 @@
 # app/services/acceso_service.py
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from collections import defaultdict
 from datetime import datetime, date
 from fastapi import HTTPException
-from typing import Literal
-from threading import Thread
 
 from app.models.asistencia import Asistencia
-from app.models.usuario import Usuario
-from app.repositories.cliente_repository import ClienteRepository
-from app.repositories.venta_membresia_repository import VentaMembresiaRepository
-from app.repositories.asistencia_repository import AsistenciaRepository
+from app.repositories.cliente_repository import AsyncClienteRepository
+from app.repositories.venta_membresia_repository import AsyncVentaMembresiaRepository
+from app.repositories.asistencia_repository import AsyncAsistenciaRepository
+from app.repositories.acceso_diario_repository import AsyncAccesoDiarioRepository
+from app.repositories.asistencia_diaria_repository import AsyncAsistenciaDiariaRepository
+from app.repositories.usuario_repository import AsyncUsuarioRepository
 from app.utils.notifier import notificar_asistencia
+from app.services.acceso_metrics import Cronometro
+from app.services.acceso_cache import (
+    acceso_cache, staff_cache, AccesoEntry, ClienteCacheado, VentaCacheada,
+)
+from app.services.reportes_cache import reportes_cache
 
 
 class AccesoService:
     def __init__(self):
-        self.cliente_repo = ClienteRepository()
-        self.venta_repo = VentaMembresiaRepository()
-        self.asistencia_repo = AsistenciaRepository()
+        # Repositorios async (rutas /acceso/verificar-acceso y /batch)
+        self.cliente_repo_async = AsyncClienteRepository()
+        self.venta_repo_async = AsyncVentaMembresiaRepository()
+        self.asistencia_repo_async = AsyncAsistenciaRepository()
+        self.acceso_diario_repo_async = AsyncAccesoDiarioRepository()
+        self.asistencia_diaria_repo_async = AsyncAsistenciaDiariaRepository()
+        self.usuario_repo_async = AsyncUsuarioRepository()
 
     # -----------------------------------------------------
-    # 🔸 Método interno: registra evento y dispara notificación
+    # 🔸 Método interno: arma la asistencia (sin tocar la DB)
     # -----------------------------------------------------
-    def _registrar_evento(
-        self,
-        db: Session,
-        cliente,
-        permitido: bool,
-        mensaje: str,
-        tipo_acceso: str,
-        id_venta: int | None = None,
-        id_sede: int = 1,
-        extra_data: dict | None = None,
-    ) -> Asistencia:
-        nueva_asistencia = Asistencia(
+    def _nueva_asistencia(self, cliente, plan: dict, tipo_acceso: str) -> Asistencia:
+        return Asistencia(
             id_cliente=cliente.id,
-            id_venta=id_venta,
-            id_sede=id_sede,
+            id_venta=plan["id_venta"],
+            id_sede=plan["id_sede"],
             fecha_hora_entrada=datetime.now(),
             tipo_acceso=tipo_acceso,
-            motivo_error=None if permitido else mensaje,
+            motivo_error=None if plan["permitido"] else plan["evento"],
         )
-        db.add(nueva_asistencia)
-        db.flush()  # Asigna el ID sin hacer commit
 
+    # -----------------------------------------------------
+    # 🔸 Método interno: payload de la notificación del evento
+    # -----------------------------------------------------
+    def _payload_evento(self, cliente, asistencia: Asistencia, plan: dict, tipo_acceso: str) -> dict:
         # 🔔 Payload enriquecido
         payload = {
-            "permitido": permitido,
-            "mensaje": mensaje,
-            "id_asistencia": nueva_asistencia.id,
+            "permitido": plan["permitido"],
+            "mensaje": plan["evento"],
+            "id_asistencia": asistencia.id,
             "nombre": f"{cliente.nombre} {cliente.apellido}".strip(),
             "documento": cliente.documento,
             "foto": cliente.fotografia,
-            "hora": nueva_asistencia.fecha_hora_entrada.strftime("%H:%M:%S"),
+            "hora": asistencia.fecha_hora_entrada.strftime("%H:%M:%S"),
             "tipo_acceso": tipo_acceso,
         }
-        if extra_data:
-            payload.update(extra_data)
-
-        # 🔸 Lanzar notificación en hilo aparte (no bloqueante)
-        Thread(target=lambda: notificar_asistencia(payload)).start()
-
-        return nueva_asistencia
+        if plan["extra"]:
+            payload.update(plan["extra"])
+        return payload
 
     # -----------------------------------------------------
-    # 🔹 Lógica principal
+    # 🔸 Decisión pura (sin I/O): qué registrar y qué responder
     # -----------------------------------------------------
-    def verificar_acceso(
-        self,
-        db: Session,
-        cliente_id: int,
-        *,
-        tipo_acceso: Literal["huella", "documento"] = "huella",
-        id_sede: int = 1,
-    ) -> dict:
-        # 1️⃣ Buscar cliente
-        cliente = self.cliente_repo.get_by_id(db, id_value=cliente_id)
-        if not cliente:
-            raise HTTPException(status_code=404, detail="Cliente no encontrado")
-
-        # 1.5️⃣ Verificar si es Usuario del Sistema (acceso ilimitado)
-        usuario_sistema = db.query(Usuario).filter(Usuario.id_cliente == cliente.id, Usuario.activo == True).first()
-        if usuario_sistema:
-             self._registrar_evento(
-                db,
-                cliente,
-                True,
-                f"Acceso ADMINISTRATIVO concedido",
-                tipo_acceso,
-                id_sede=id_sede,
-                extra_data={
-                    "tipo_membresia": "STAFF",
-                    "es_admin": True
-                }
-            )
-             db.commit()
-             return {
+    def _evaluar(self, entry: AccesoEntry, *, id_sede: int, hoy: date | None = None) -> dict:
+        """
+        Devuelve el "plan" del acceso (evaluado al día `hoy`, por defecto hoy):
+        - permitido / evento (mensaje del evento o motivo_error)
+        - id_venta / id_sede de la asistencia a insertar
+        - extra: datos adicionales para la notificación
+        - descontar: si hay que descontar una sesión de tiquetera
+        - respuesta: dict que devuelve el endpoint
+        - devolver_id: si la respuesta lleva el id real de la asistencia
+        """
+        cliente = entry.cliente
+        hoy = hoy or date.today()
+
+        # 1.5️⃣ Usuario del Sistema (acceso ilimitado)
+        if entry.es_staff:
+            return {
                 "permitido": True,
-                "mensaje": f"¡Hola Acceso Staff",
-                "tipo_membresia": "ADMINISTRATIVO",
-                "tiquetera": False,
-                "sesiones_restantes": None,
-                "dias_restantes": 9999,
-                "asistencia_id": 0, # O el id real si lo devolvemos
+                "evento": "Acceso ADMINISTRATIVO concedido",
+                "id_venta": None,
+                "id_sede": id_sede,
+                "extra": {"tipo_membresia": "STAFF", "es_admin": True},
+                "descontar": False,
+                "devolver_id": False,
+                "respuesta": {
+                    "permitido": True,
+                    "mensaje": f"¡Hola Acceso Staff",
+                    "tipo_membresia": "ADMINISTRATIVO",
+                    "tiquetera": False,
+                    "sesiones_restantes": None,
+                    "dias_restantes": 9999,
+                    "asistencia_id": 0, # O el id real si lo devolvemos
+                },
             }
 
-        # 2️⃣ Buscar membresía activa
-        venta = self.venta_repo.find_active_for_client(db, cliente.id)
+        # 2️⃣ Membresía activa
+        venta = entry.venta
         if not venta:
             msg = f"no tiene una membresía activa."
-            self._registrar_evento(db, cliente, False, msg, tipo_acceso)
-            db.commit()
-            return {"permitido": False, "mensaje": f"Acceso denegado. {msg}"}
+            return {
+                "permitido": False,
+                "evento": msg,
+                "id_venta": None,
+                "id_sede": id_sede,
+                "extra": None,
+                "descontar": False,
+                "devolver_id": False,
+                "respuesta": {"permitido": False, "mensaje": f"Acceso denegado. {msg}"},
+            }
 
-        m = venta.membresia
-        es_tiquetera = "tiquetera" in m.nombre_membresia.lower()
+        es_tiquetera = "tiquetera" in venta.nombre_membresia.lower()
         dias_restantes = (
-            (venta.fecha_fin.date() - date.today()).days if venta.fecha_fin else None
+            (venta.fecha_fin.date() - hoy).days if venta.fecha_fin else None
         )
+        extra = {
+            "tipo_membresia": venta.nombre_membresia,
+            "sesiones_restantes": venta.sesiones_restantes,
+            "dias_restantes": dias_restantes,
+        }
 
         # 3️⃣ Validaciones
         motivos_error = []
-        if venta.fecha_fin and venta.fecha_fin.date() < date.today():
+        if venta.fecha_fin and venta.fecha_fin.date() < hoy:
             motivos_error.append("La membresía ha expirado.")
-        if m.max_accesos_diarios and (
-            self.asistencia_repo.count_today_for_client(db, cliente.id)
-            >= m.max_accesos_diarios
-        ):
+        if venta.max_accesos_diarios and entry.accesos_hoy >= venta.max_accesos_diarios:
             motivos_error.append("Ha excedido los accesos diarios permitidos.")
         if es_tiquetera and (
             not venta.sesiones_restantes or venta.sesiones_restantes <= 0
         ):
             motivos_error.append("No tiene sesiones disponibles.")
 
-        # 4️⃣ Si hay errores → registrar intento fallido
+        # 4️⃣ Si hay errores → intento fallido
         if motivos_error:
             msg = " ".join(motivos_error)
-            self._registrar_evento(
-                db,
-                cliente,
-                False,
-                f"Acceso denegado. {msg}",
-                tipo_acceso,
-                venta.id,
-                id_sede,
-                extra_data={
-                    "tipo_membresia": m.nombre_membresia,
-                    "sesiones_restantes": venta.sesiones_restantes,
-                    "dias_restantes": dias_restantes,
-                },
-            )
-            db.commit()
-            return {"permitido": False, "mensaje": msg}
+            return {
+                "permitido": False,
+                "evento": f"Acceso denegado. {msg}",
+                "id_venta": venta.id,
+                "id_sede": id_sede,
+                "extra": extra,
+                "descontar": False,
+                "devolver_id": False,
+                "respuesta": {"permitido": False, "mensaje": msg},
+            }
 
-        # 5️⃣ Registrar acceso exitoso
-        nueva_asistencia = self._registrar_evento(
-            db,
-            cliente,
-            True,
-            f"Acceso permitido para {cliente.nombre}",
-            tipo_acceso,
-            venta.id,
-            id_sede,
-            extra_data={
-                "tipo_membresia": m.nombre_membresia,
-                "sesiones_restantes": venta.sesiones_restantes,
+        # 5️⃣ Acceso exitoso (6️⃣ descuenta sesión solo si tiquetera)
+        descontar = es_tiquetera and venta.sesiones_restantes is not None
+        return {
+            "permitido": True,
+            "evento": f"Acceso permitido para {cliente.nombre}",
+            "id_venta": venta.id,
+            "id_sede": id_sede,
+            "extra": extra,
+            "descontar": descontar,
+            "devolver_id": True,
+            "respuesta": {
+                "permitido": True,
+                "mensaje": f"¡Bienvenido, {cliente.nombre}!",
+                "tipo_membresia": venta.nombre_membresia,
+                "tiquetera": es_tiquetera,
+                "sesiones_restantes": (
+                    (venta.sesiones_restantes - 1 if descontar else venta.sesiones_restantes)
+                    if es_tiquetera else None
+                ),
                 "dias_restantes": dias_restantes,
+                "asistencia_id": None,
             },
+        }
+
+    def _sin_sesiones(self, plan: dict) -> dict:
+        """
+        Convierte un plan exitoso de tiquetera en denegado: el UPDATE
+        condicional no afectó filas (otro acceso concurrente gastó la última).
+        """
+        msg = "No tiene sesiones disponibles."
+        return {
+            **plan,
+            "permitido": False,
+            "evento": f"Acceso denegado. {msg}",
+            "extra": {**plan["extra"], "sesiones_restantes": 0},
+            "descontar": False,
+            "devolver_id": False,
+            "respuesta": {"permitido": False, "mensaje": msg},
+        }
+
+    def _respuesta(self, plan: dict, asistencia_id: int) -> dict:
+        respuesta = plan["respuesta"]
+        if plan["devolver_id"]:
+            respuesta["asistencia_id"] = asistencia_id
+        return respuesta
+
+    # -----------------------------------------------------
+    # 🔸 Carga (cache miss): una sola consulta a la DB
+    # -----------------------------------------------------
+    # Staff: set en memoria (una consulta la primera vez o tras cambios en usuarios)
+    async def _es_staff_async(self, db: AsyncSession, cliente_id: int) -> bool:
+        if not staff_cache.cargado:
+            staff_cache.reemplazar(await self.usuario_repo_async.get_staff_cliente_ids(db))
+        return staff_cache.contiene(cliente_id)
+
+    async def _cargar_entrada_async(self, db: AsyncSession, **filtro) -> AccesoEntry | None:
+        generacion = acceso_cache.generacion  # antes del SELECT (ver AccesoCache.put)
+        row = await self.cliente_repo_async.get_acceso_snapshot(db, **filtro)
+        if row is None:
+            return None
+        entry = AccesoEntry.desde_fila(row, await self._es_staff_async(db, row.id))
+        acceso_cache.put(entry, generacion)
+        return entry
+
+    # -----------------------------------------------------
+    # 🔹 Lógica principal (asíncrona, sin threadpool)
+    # -----------------------------------------------------
+    async def verificar_acceso_credencial_async(
+        self,
+        db: AsyncSession,
+        *,
+        id_huella: int | None = None,
+        documento: str | None = None,
+        id_sede: int = 1,
+        crono: Cronometro | None = None,
+    ) -> dict:
+        """
+        Verifica acceso por id_huella O documento.
+        - Hit de cache: decide sin ningún SELECT.
+        - Miss: una sola consulta (AsyncClienteRepository.get_acceso_snapshot).
+        `crono` (opcional) acumula los tiempos por etapa.
+        """
+        crono = crono or Cronometro()
+        tipo_acceso = "huella" if id_huella is not None else "documento"
+        with crono.etapa("cache"):
+            entry = acceso_cache.get(id_huella=id_huella, documento=documento)
+        if entry is None:
+            with crono.etapa("snapshot"):
+                entry = await self._cargar_entrada_async(db, id_huella=id_huella, documento=documento)
+            if entry is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Acceso denegado: {tipo_acceso} no registrado en el sistema.",
+                )
+        return await self._decidir_async(
+            db, entry, tipo_acceso=tipo_acceso, id_sede=id_sede, crono=crono
         )
 
-        # 6️⃣ Actualizar sesiones (solo si tiquetera)
-        if es_tiquetera and venta.sesiones_restantes is not None:
-            venta.sesiones_restantes -= 1
+    async def _decidir_async(
+        self,
+        db: AsyncSession,
+        entry: AccesoEntry,
+        *,
+        tipo_acceso: str,
+        id_sede: int,
+        crono: Cronometro,
+    ) -> dict:
+        try:
+            # 🔒 Límite diario contra la DB, no contra el contador cacheado
+            # (por proceso): el upsert cuenta este acceso y bloquea la fila
+            contado = False
+            if entry.venta and entry.venta.max_accesos_diarios:
+                with crono.etapa("limite"):
+                    entry.accesos_hoy = await self.acceso_diario_repo_async.incrementar_y_leer(
+                        db, entry.cliente.id, date.today()
+                    ) - 1
+                contado = True
+            with crono.etapa("evaluar"):
+                plan = self._evaluar(entry, id_sede=id_sede)
+            conflicto = False
+            if plan["descontar"]:
+                with crono.etapa("sesion"):
+                    conflicto = not await self.venta_repo_async.descontar_sesion(db, plan["id_venta"])
+            if conflicto:
+                plan = self._sin_sesiones(plan)
+            with crono.etapa("flush"):
+                nueva_asistencia = self._nueva_asistencia(entry.cliente, plan, tipo_acceso)
+                db.add(nueva_asistencia)
+                await db.flush()  # Asigna el ID sin hacer commit
+                if not contado:
+                    await self.acceso_diario_repo_async.incrementar(
+                        db, entry.cliente.id, nueva_asistencia.fecha_hora_entrada.date()
+                    )
+                await self.asistencia_diaria_repo_async.incrementar(db, nueva_asistencia)
+            payload = self._payload_evento(entry.cliente, nueva_asistencia, plan, tipo_acceso)
+            with crono.etapa("commit"):
+                await db.commit()
+        except Exception:
+            acceso_cache.invalidate_cliente(entry.cliente.id)
+            raise
+        if conflicto:
+            acceso_cache.invalidate_cliente(entry.cliente.id)
+        else:
+            acceso_cache.registrar_acceso(entry.cliente.id, descontar_sesion=plan["descontar"])
+        reportes_cache.invalidate()
+        with crono.etapa("notificar"):
+            notificar_asistencia(payload)
+        return self._respuesta(plan, nueva_asistencia.id)
 
-        # ✅ Un solo commit al final
-        db.commit()
+    # -----------------------------------------------------
+    # 🔹 Lote: escaneos almacenados offline por un dispositivo
+    # -----------------------------------------------------
+    async def verificar_acceso_batch_async(self, db: AsyncSession, registros: list) -> list[dict]:
+        """
+        Reproduce un lote de escaneos (id_huella|documento, timestamp, id_sede).
+        - Clientes en un solo IN, ventas activas y contadores diarios precargados.
+        - Límite diario y sesiones de tiquetera se calculan en memoria, en orden
+          cronológico (cada escaneo se evalúa al día de su timestamp).
+        - Un INSERT masivo en asistencia, un UPDATE condicional por venta
+          de tiquetera y un único commit. No emite notificaciones (son eventos históricos).
+        - Idempotente ante reintentos: los escaneos cuyo (id_cliente, timestamp)
+          ya está en asistencia (o se repite en el lote) no se insertan, no
+          descuentan sesiones ni suman al rollup; vuelven con duplicado=True.
+        Devuelve una decisión por registro, en el orden recibido.
+        """
+        if not registros:
+            return []
 
-        return {
-            "permitido": True,
-            "mensaje": f"¡Bienvenido, {cliente.nombre}!",
-            "tipo_membresia": m.nombre_membresia,
-            "tiquetera": es_tiquetera,
-            "sesiones_restantes": venta.sesiones_restantes if es_tiquetera else None,
-            "dias_restantes": dias_restantes,
-            "asistencia_id": nueva_asistencia.id,
-        }
+        # 1️⃣ Clientes del lote (un IN por huella/documento)
+        filas = await self.cliente_repo_async.get_acceso_clientes(
+            db,
+            huellas=list({r.id_huella for r in registros if r.id_huella is not None}),
+            documentos=list({r.documento for r in registros if r.documento is not None}),
+        )
+        por_huella, por_documento = {}, {}
+        if filas and not staff_cache.cargado:
+            staff_cache.reemplazar(await self.usuario_repo_async.get_staff_cliente_ids(db))
+        for f in filas:
+            encontrado = (ClienteCacheado(f), staff_cache.contiene(f.id))
+            if f.id_huella is not None:
+                por_huella[f.id_huella] = encontrado
+            por_documento[f.documento] = encontrado
+        cliente_ids = [c.id for c, _ in por_documento.values()]
+
+        def _cliente_de(r):
+            if r.id_huella is not None:
+                return por_huella.get(r.id_huella)
+            return por_documento.get(r.documento)
+
+        # 1.5️⃣ Escaneos ya guardados (reintento del mismo lote)
+        registradas = await self.asistencia_repo_async.get_registradas(
+            db,
+            list({(e[0].id, r.timestamp) for r in registros if (e := _cliente_de(r))}),
+        )
+
+        # 2️⃣ Ventas activas y accesos por día, precargados en bloque
+        orden = sorted(range(len(registros)), key=lambda i: registros[i].timestamp)
+        desde = registros[orden[0]].timestamp.date()
+        hasta = registros[orden[-1]].timestamp.date()
+        ventas_por_cliente = defaultdict(list)  # fecha_fin DESC
+        accesos = {}
+        if cliente_ids:
+            for row in await self.venta_repo_async.find_active_for_clients(db, cliente_ids, desde):
+                ventas_por_cliente[row.id_cliente].append(VentaCacheada(row))
+            accesos = await self.acceso_diario_repo_async.get_por_cliente_dia(db, cliente_ids, desde, hasta)
+
+        # 3️⃣ Decisiones en memoria, en orden cronológico
+        resultados: list[dict | None] = [None] * len(registros)
+        filas_asistencia = []
+        descuentos = defaultdict(int)
+        nuevos_accesos = defaultdict(int)
+        for i in orden:
+            r = registros[i]
+            dia = r.timestamp.date()
+            tipo_acceso = "huella" if r.id_huella is not None else "documento"
+            encontrado = _cliente_de(r)
+            if not encontrado:
+                resultados[i] = {
+                    "indice": i,
+                    "permitido": False,
+                    "mensaje": f"Acceso denegado: {tipo_acceso} no registrado en el sistema.",
+                }
+                continue
+
+            cliente, es_staff = encontrado
+            clave = (cliente.id, r.timestamp)
+            if clave in registradas:
+                motivo = registradas[clave]
+                resultados[i] = {
+                    "indice": i,
+                    "permitido": motivo is None,
+                    "mensaje": motivo or "Escaneo ya registrado.",
+                    "duplicado": True,
+                }
+                continue
+
+            venta = None
+            if not es_staff:
+                venta = next(
+                    (v for v in ventas_por_cliente[cliente.id] if v.fecha_fin.date() >= dia), None
+                )
+            entry = AccesoEntry(cliente, es_staff, venta, accesos.get((cliente.id, dia), 0))
+            plan = self._evaluar(entry, id_sede=r.id_sede, hoy=dia)
+
+            filas_asistencia.append({
+                "id_cliente": cliente.id,
+                "id_venta": plan["id_venta"],
+                "id_sede": plan["id_sede"],
+                "fecha_hora_entrada": r.timestamp,
+                "tipo_acceso": tipo_acceso,
+                "motivo_error": None if plan["permitido"] else plan["evento"],
+            })
+            registradas[clave] = filas_asistencia[-1]["motivo_error"]
+            accesos[(cliente.id, dia)] = entry.accesos_hoy + 1
+            nuevos_accesos[(cliente.id, dia)] += 1
+            if plan["descontar"]:
+                venta.sesiones_restantes -= 1
+                descuentos[venta.id] += 1
+
+            resultados[i] = {
+                "indice": i,
+                "permitido": plan["respuesta"]["permitido"],
+                "mensaje": plan["respuesta"]["mensaje"],
+            }
+
+        # 4️⃣ Escritura masiva + un solo commit
+        try:
+            # 🔒 Descuentos condicionales primero: si otro acceso gastó sesiones
+            # mientras tanto, el lote completo se rechaza y el dispositivo reintenta
+            if await self.venta_repo_async.descontar_sesiones(db, descuentos):
+                await db.rollback()
+                raise HTTPException(
+                    status_code=409,
+                    detail="Sesiones de tiquetera modificadas por otro acceso; reintente el lote.",
+                )
+            await self.asistencia_repo_async.bulk_insert(db, filas_asistencia)
+            await self.acceso_diario_repo_async.incrementar_varios(db, nuevos_accesos)
+            await self.asistencia_diaria_repo_async.incrementar_varios(db, filas_asistencia)
+            await db.commit()
+            reportes_cache.invalidate()
+        finally:
+            for cid in cliente_ids:
+                acceso_cache.invalidate_cliente(cid)
+
+        return resultados
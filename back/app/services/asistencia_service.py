@@ -1,14 +1,65 @@
 # app/services/asistencia_service.py
+from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from app.repositories.asistencia_repository import AsistenciaRepository
+from app.repositories.acceso_diario_repository import AccesoDiarioRepository
+from app.repositories.asistencia_diaria_repository import AsistenciaDiariaRepository
+from app.services.acceso_cache import acceso_cache
+from app.services.reportes_cache import reportes_cache
 from .base_service import BaseService
 
 class AsistenciaService(BaseService):
     def __init__(self):
         super().__init__(AsistenciaRepository())
+        self.acceso_diario_repo = AccesoDiarioRepository()
+        self.asistencia_diaria_repo = AsistenciaDiariaRepository()
 
     def get_all(self, db: Session):
         return self.repository.get_all_with_relations(db)
 
     def get_by_id(self, db: Session, asistencia_id: int):
         return self.repository.get_by_id_with_relations(db, asistencia_id)
+
+    # Escrituras manuales: se recalculan el contador diario (acceso_diario)
+    # y el rollup de reportes (asistencia_diaria) de los días tocados
+    def _recalcular_contadores(self, db: Session, *claves):
+        pendientes = {(cid, fh.date()) for cid, fh in claves if cid is not None and fh is not None}
+        for cliente_id, dia in pendientes:
+            self.acceso_diario_repo.recalcular(db, cliente_id, dia)
+        dias = {fh.date() for _, fh in claves if fh is not None}
+        self.asistencia_diaria_repo.recalcular_dias(db, dias)
+        if pendientes or dias:
+            db.commit()
+        reportes_cache.invalidate()
+
+    # ... y el contador diario en cache deja de ser fiable
+    def create(self, db: Session, obj_in):
+        asistencia = super().create(db, obj_in)
+        self._recalcular_contadores(db, (asistencia.id_cliente, asistencia.fecha_hora_entrada))
+        acceso_cache.invalidate_cliente(asistencia.id_cliente)
+        return asistencia
+
+    def update(self, db: Session, id_value: int, obj_in):
+        db_obj = self.repository.get_by_id(db, id_value)
+        if not db_obj:
+            raise HTTPException(status_code=404, detail="Recurso no encontrado")
+        cliente_anterior = db_obj.id_cliente
+        fecha_anterior = db_obj.fecha_hora_entrada
+        asistencia = self.repository.update(db, db_obj, obj_in)
+        self._recalcular_contadores(
+            db,
+            (cliente_anterior, fecha_anterior),
+            (asistencia.id_cliente, asistencia.fecha_hora_entrada),
+        )
+        acceso_cache.invalidate_cliente(cliente_anterior)
+        acceso_cache.invalidate_cliente(asistencia.id_cliente)
+        return asistencia
+
+    def delete(self, db: Session, id_value: int):
+        db_obj = self.repository.get_by_id(db, id_value)
+        cliente_id = db_obj.id_cliente if db_obj else None
+        fecha = db_obj.fecha_hora_entrada if db_obj else None
+        asistencia = super().delete(db, id_value)
+        self._recalcular_contadores(db, (cliente_id, fecha))
+        acceso_cache.invalidate_cliente(cliente_id)
+        return asistencia
@@ -12,6 +12,8 @@ from app.models.cliente import Cliente
 from app.models.venta_membresia import VentaMembresia
 from app.models.membresia import Membresia
 from app.repositories.cliente_repository import ClienteRepository
+from app.services.acceso_cache import acceso_cache
+from app.services.reportes_cache import reportes_cache
 from app.schemas.cliente_membresia import (
     CrearClienteYVentaRequest, CrearClienteYVentaResponse,
     ClienteOut, VentaMembresiaOut,
@@ -42,13 +44,11 @@ def _plus_one_month(d: date_cls) -> date_cls:
     return date_cls(y, m + 1, min(d.day, 28))
 
 
-def _get_latest_venta(db: Session, cliente_id: int) -> Optional[VentaMembresia]:
-    return (
-        db.query(VentaMembresia)
-        .filter(VentaMembresia.id_cliente == cliente_id)
-        .order_by(VentaMembresia.fecha_inicio.desc())
-        .first()
-    )
+def _get_latest_venta(db: Session, cliente: Cliente) -> Optional[VentaMembresia]:
+    # Puntero mantenido (ClienteRepository.actualizar_venta_actual)
+    if cliente.id_venta_actual is None:
+        return None
+    return db.get(VentaMembresia, cliente.id_venta_actual)
 
 
 def _venta_payload_has_data(v) -> bool:
@@ -120,10 +120,13 @@ def crear_cliente_y_venta(db: Session, payload: CrearClienteYVentaRequest) -> Cr
         )
         db.add(venta)
         db.flush()  # asigna venta.id
+        repo_cliente.actualizar_venta_actual(db, cliente.id)
 
         db.commit()
         db.refresh(cliente)
         db.refresh(venta)
+        acceso_cache.invalidate_cliente(cliente.id)
+        reportes_cache.invalidate()
 
     except IntegrityError as e:
         db.rollback()
@@ -200,7 +203,7 @@ def update_cliente_y_venta(
             if not venta_obj or venta_obj.id_cliente != cliente.id:
                 raise HTTPException(status_code=404, detail="Venta de membresía no encontrada para este cliente.")
         else:
-            venta_obj = _get_latest_venta(db, cliente.id)
+            venta_obj = _get_latest_venta(db, cliente)
 
         if not venta_obj and _venta_payload_has_data(v_in):
             # crear nueva (requiere id_membresia)
@@ -232,7 +235,12 @@ def update_cliente_y_venta(
             if v_in.estado is not None:
                 venta_obj.estado = v_in.estado
 
+        if venta_obj:
+            db.flush()
+            repo_cliente.actualizar_venta_actual(db, cliente.id)
         db.commit()
+        acceso_cache.invalidate_cliente(cliente.id)
+        reportes_cache.invalidate()
         db.refresh(cliente)
         if venta_obj:
             db.refresh(venta_obj)
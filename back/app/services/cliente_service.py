@@ -1,10 +1,13 @@
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from app.repositories.cliente_repository import ClienteRepository
+from app.repositories import keyset
 from .base_service import BaseService
 from .fingerprint import Fingerprint  # <-- IMPORTANTE: Importa la clase del archivo local
 from typing import Optional, Tuple, List
 from app.schemas.membresia_resumen import ResumenMembresia
+from app.services.acceso_cache import acceso_cache
+from app.services.reportes_cache import reportes_cache
 
 class ClienteService(BaseService):
     def __init__(self):
@@ -23,7 +26,9 @@ class ClienteService(BaseService):
             obj_in.id_huella = next_huella_id
         
         # 3. Crear el cliente
-        return super().create(db, obj_in)
+        cliente = super().create(db, obj_in)
+        acceso_cache.invalidate_cliente(cliente.id)
+        return cliente
     
     def update(self, db: Session, id_value: int, obj_in):
         db_obj = self.repository.get_by_id(db, id_value)
@@ -45,13 +50,18 @@ class ClienteService(BaseService):
         elif obj_in.huella_template and db_obj.huella_template:
             obj_in.id_huella = db_obj.id_huella
 
-        return self.repository.update(db, db_obj, obj_in)
+        cliente = self.repository.update(db, db_obj, obj_in)
+        acceso_cache.invalidate_cliente(cliente.id)
+        return cliente
 
     def delete(self, db: Session, id_value: int):
         # No se necesita lógica adicional aquí.
         # Al eliminar el cliente, la fila desaparece y el id_huella queda
         # automáticamente libre para que find_next_available_huella_id lo encuentre.
-        return super().delete(db, id_value)
+        cliente = super().delete(db, id_value)
+        acceso_cache.invalidate_cliente(id_value)
+        reportes_cache.invalidate()  # sus ventas dejan de contar en los reportes
+        return cliente
     
     def update_huella(self, db: Session, cliente_id: int, nueva_huella: bytes):
         """
@@ -61,6 +71,7 @@ class ClienteService(BaseService):
         cliente_actualizado = self.repository.update_huella(db, cliente_id, nueva_huella)
         if not cliente_actualizado:
             raise HTTPException(status_code=404, detail="Cliente no encontrado al intentar actualizar la huella.")
+        acceso_cache.invalidate_cliente(cliente_id)
         return cliente_actualizado
     
     def get_all_with_huella(self, db: Session):
@@ -77,25 +88,39 @@ class ClienteService(BaseService):
         q: Optional[str],
         sort_attr: str,
         descending: bool,
-    ) -> Tuple[int, list, int, int]:
+        cursor: Optional[str] = None,
+        include_total: Optional[bool] = None,
+    ) -> Tuple[Optional[int], keyset.Ventana]:
         """
-        Retorna (total, items, pages, page_ajustada)
+        Retorna (total, ventana). Con `cursor` se pagina por keyset y se
+        ignora `page`. El COUNT sólo se hace si include_total lo pide; por
+        defecto, únicamente en la primera petición (sin cursor).
         """
-        total = self.repository.count_filtered(db, q=q)
-        pages = (total + size - 1) // size if total else 1
-        if page > pages and total > 0:
-            page = pages
+        orden = f"{sort_attr}:{'desc' if descending else 'asc'}"
+        cur = None
+        if cursor:
+            try:
+                cur = keyset.decodificar_cursor(cursor, orden)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"Cursor inválido: {e}")
+            page = cur.pagina
 
-        offset = (page - 1) * size
-        items = self.repository.find_filtered_paginated(
+        if include_total is None:
+            include_total = cur is None
+        total = self.repository.count_filtered(db, q=q) if include_total else None
+        if cur is None and total:
+            page = min(page, (total + size - 1) // size)
+
+        filas = self.repository.find_filtered_paginated(
             db,
             q=q,
             sort_attr=sort_attr,
             descending=descending,
-            offset=offset,
             limit=size,
+            cursor=cur,
+            offset=(page - 1) * size,
         )
-        return total, items, pages, page
+        return total, keyset.ventana(filas, size, cur, page)
     
     def get_membership_summary(self, db: Session, cliente_id: int) -> Optional[ResumenMembresia]:
         data = self.repository.get_membership_summary_by_cliente_id(db, cliente_id)
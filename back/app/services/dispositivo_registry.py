@@ -0,0 +1,97 @@
+# app/services/dispositivo_registry.py
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Segundos sin mensajes tras los cuales un dispositivo se considera offline
+DEVICE_OFFLINE_S = float(os.getenv("DEVICE_OFFLINE_S", 120))
+
+
+class EstadoDispositivo:
+    """Último state conocido de un dispositivo y cuándo se le vio por última vez."""
+    __slots__ = ("sede", "device", "state", "state_en", "visto_en")
+
+    def __init__(self, sede: str, device: str):
+        self.sede = sede
+        self.device = device
+        self.state: dict = {}
+        self.state_en: Optional[float] = None  # epoch del último state
+        self.visto_en: Optional[float] = None  # epoch del último mensaje en vivo
+
+
+class DispositivoRegistry:
+    """
+    Registro en memoria alimentado por MQTT con lo que publican los propios
+    dispositivos (devices/+/+/state y devices/+/+/cmd/ack). Se escribe
+    desde el hilo de paho y se lee desde la API sin tocar broker ni DB.
+    """
+    def __init__(self, offline_s: float = DEVICE_OFFLINE_S):
+        self.offline_s = offline_s
+        self._lock = threading.Lock()
+        self._dispositivos: Dict[Tuple[str, str], EstadoDispositivo] = {}
+
+    def _obtener(self, sede: str, device: str) -> EstadoDispositivo:
+        clave = (sede, device)
+        estado = self._dispositivos.get(clave)
+        if estado is None:
+            estado = self._dispositivos[clave] = EstadoDispositivo(sede, device)
+        return estado
+
+    def actualizar_state(self, sede: str, device: str, data: dict, *, retenido: bool = False) -> None:
+        """
+        Guarda el state. Un mensaje retenido (reentregado al suscribirse) no
+        cuenta como señal de vida: puede ser antiguo.
+        """
+        ahora = time.time()
+        with self._lock:
+            estado = self._obtener(sede, device)
+            estado.state = data
+            estado.state_en = ahora
+            if not retenido:
+                estado.visto_en = ahora
+
+    def tocar(self, sede: str, device: str) -> None:
+        """Un mensaje en vivo del dispositivo (ack de comando) lo marca como visto."""
+        with self._lock:
+            self._obtener(sede, device).visto_en = time.time()
+
+    def _online(self, estado: EstadoDispositivo, ahora: float) -> bool:
+        if estado.state.get("online") is False:  # p. ej. LWT retenido
+            return False
+        return estado.visto_en is not None and (ahora - estado.visto_en) < self.offline_s
+
+    def listar(self, sede: Optional[str] = None) -> List[dict]:
+        ahora = time.time()
+        with self._lock:
+            estados = [
+                e for e in self._dispositivos.values()
+                if sede is None or e.sede == sede
+            ]
+            return [
+                {
+                    "sede": e.sede,
+                    "device": e.device,
+                    "online": self._online(e, ahora),
+                    "visto_en": e.visto_en,
+                    "hace_s": round(ahora - e.visto_en, 1) if e.visto_en is not None else None,
+                    "state": dict(e.state),
+                }
+                for e in sorted(estados, key=lambda e: (e.sede, e.device))
+            ]
+
+    def dispositivos_online(self, sede: str) -> List[str]:
+        """
+        Dispositivos de una sede que reportaron state y están dentro de la
+        ventana online (destino por defecto de los comandos masivos).
+        """
+        ahora = time.time()
+        with self._lock:
+            return sorted(
+                e.device for e in self._dispositivos.values()
+                if e.sede == sede and e.state_en is not None and self._online(e, ahora)
+            )
+
+
+# Singleton global
+dispositivo_registry = DispositivoRegistry()
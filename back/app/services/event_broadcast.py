@@ -1,26 +1,162 @@
-from typing import List
+from collections import deque
+from itertools import product
+from typing import Dict, Iterable, Set
 from fastapi import WebSocket
+import asyncio
 import json
+import os
+
+# Mensajes pendientes por conexión (drop-oldest si el cliente no da abasto)
+WS_COLA_MAX = int(os.getenv("WS_COLA_MAX", 100))
+
+# Filtro por defecto: todos los topics devices/<sede>/<device>/<tipo>
+TODOS = "devices/+/+/+"
+
+
+def filtro_topic(sede: str | None = None, device: str | None = None, tipo: str | None = None) -> str:
+    """Filtro con la estructura de topic_event(s, d): devices/<sede>/<device>/<tipo> ('+' = cualquiera)."""
+    return f"devices/{sede or '+'}/{device or '+'}/{tipo or '+'}"
+
+
+def filtros_desde(spec) -> Set[str]:
+    """
+    Normaliza una suscripción: dict {"sede", "device", "tipo"}, lista de
+    dicts, o un mapping tipo query params. Vacía -> {TODOS}.
+    """
+    items = spec if isinstance(spec, list) else [spec]
+    filtros = {
+        filtro_topic(i.get("sede"), i.get("device"), i.get("tipo"))
+        for i in items if hasattr(i, "get")
+    }
+    return filtros or {TODOS}
+
+
+class ConexionWS:
+    """Una conexión WebSocket con su cola de salida acotada y su tarea emisora."""
+    __slots__ = ("ws", "cola", "hay_datos", "tarea", "descartados", "filtros")
+
+    def __init__(self, ws: WebSocket, maxlen: int):
+        self.ws = ws
+        self.cola = deque(maxlen=maxlen)
+        self.hay_datos = asyncio.Event()
+        self.tarea: asyncio.Task | None = None
+        self.descartados = 0
+        self.filtros: Set[str] = set()
+
+    def encolar(self, mensaje: str) -> None:
+        """No bloquea: si la cola está llena se pierde el mensaje más antiguo."""
+        if len(self.cola) == self.cola.maxlen:
+            self.descartados += 1
+        self.cola.append(mensaje)
+        self.hay_datos.set()
+
+    async def emitir(self) -> None:
+        """Drena la cola sobre el socket (un cliente lento solo se frena a sí mismo)."""
+        while True:
+            await self.hay_datos.wait()
+            while self.cola:
+                await self.ws.send_text(self.cola.popleft())
+            self.hay_datos.clear()
+
 
 class EventBroadcaster:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    def __init__(self, maxlen: int = WS_COLA_MAX):
+        self.maxlen = maxlen
+        self.active_connections: Dict[WebSocket, ConexionWS] = {}
+        # Índice filtro -> conexiones interesadas (fan-out sin recorrer todas)
+        self._indice: Dict[str, Set[ConexionWS]] = {}
 
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, websocket: WebSocket, filtros: Iterable[str] | None = None):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        conexion = ConexionWS(websocket, self.maxlen)
+        conexion.tarea = asyncio.create_task(self._emisor(conexion))
+        self.active_connections[websocket] = conexion
+        self._indexar(conexion, set(filtros or {TODOS}))
         print(f"✅ Cliente conectado ({len(self.active_connections)} total)")
 
+    def subscribe(self, websocket: WebSocket, filtros: Iterable[str]) -> None:
+        """Reemplaza la suscripción de una conexión."""
+        conexion = self.active_connections.get(websocket)
+        if conexion is not None:
+            self._indexar(conexion, set(filtros))
+
+    def handle_message(self, websocket: WebSocket, texto: str) -> None:
+        """Mensaje del cliente: {"subscribe": {...} | [{...}, ...]} cambia sus filtros."""
+        try:
+            data = json.loads(texto)
+        except ValueError:
+            return
+        if isinstance(data, dict) and "subscribe" in data:
+            self.subscribe(websocket, filtros_desde(data["subscribe"]))
+
+    def _indexar(self, conexion: ConexionWS, filtros: Set[str]) -> None:
+        self._desindexar(conexion)
+        conexion.filtros = filtros
+        for f in filtros:
+            self._indice.setdefault(f, set()).add(conexion)
+
+    def _desindexar(self, conexion: ConexionWS) -> None:
+        for f in conexion.filtros:
+            conjunto = self._indice.get(f)
+            if conjunto is not None:
+                conjunto.discard(conexion)
+                if not conjunto:
+                    del self._indice[f]
+        conexion.filtros = set()
+
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        conexion = self.active_connections.pop(websocket, None)
+        if conexion is None:
+            return
+        self._desindexar(conexion)
+        if conexion.tarea is not None and conexion.tarea is not asyncio.current_task():
+            conexion.tarea.cancel()
         print(f"❌ Cliente desconectado ({len(self.active_connections)} restantes)")
 
+    async def _emisor(self, conexion: ConexionWS):
+        try:
+            await conexion.emitir()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Socket caído: se retira sin afectar al resto
+            self.disconnect(conexion.ws)
+
+    def send(self, websocket: WebSocket, texto: str) -> None:
+        """Encola un mensaje para una sola conexión (p. ej. ping)."""
+        conexion = self.active_connections.get(websocket)
+        if conexion is not None:
+            conexion.encolar(texto)
+
+    def _destinos(self, topic: str | None):
+        """Conexiones cuyo filtro coincide con devices/<sede>/<device>/<tipo>."""
+        partes = topic.split("/", 3) if topic else []
+        if len(partes) < 4 or partes[0] != "devices":
+            return self.active_connections.values()  # sin topic de dispositivo: a todos
+        _, sede, device, tipo = partes
+        destinos = set()
+        for s, d, t in product((sede, "+"), (device, "+"), (tipo, "+")):
+            destinos.update(self._indice.get(f"devices/{s}/{d}/{t}", ()))
+        return destinos
+
     async def broadcast(self, data: dict):
+        """Serializa una vez y encola solo en las conexiones suscritas al topic."""
+        destinos = self._destinos(data.get("topic"))
+        if not destinos:
+            return
         message = json.dumps(data)
-        for ws in list(self.active_connections):
-            try:
-                await ws.send_text(message)
-            except Exception:
-                self.disconnect(ws)
+        for conexion in destinos:
+            conexion.encolar(message)
+
+    def stats(self) -> dict:
+        """Llamar desde el loop de la app (connect/disconnect modifican el dict)."""
+        conexiones = list(self.active_connections.values())
+        return {
+            "conexiones": len(conexiones),
+            "filtros": len(self._indice),
+            "pendientes": sum(len(c.cola) for c in conexiones),
+            "descartados": sum(c.descartados for c in conexiones),
+        }
+
 
 broadcaster = EventBroadcaster()
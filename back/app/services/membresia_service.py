@@ -1,6 +1,19 @@
+from sqlalchemy.orm import Session
 from app.repositories.membresia_repository import MembresiaRepository
+from app.services.acceso_cache import acceso_cache
 from .base_service import BaseService
 
 class MembresiaService(BaseService):
     def __init__(self):
         super().__init__(MembresiaRepository())
+
+    # Los límites (max_accesos_diarios, nombre) viajan en la cache de acceso
+    def update(self, db: Session, id_value: int, obj_in):
+        membresia = super().update(db, id_value, obj_in)
+        acceso_cache.clear()
+        return membresia
+
+    def delete(self, db: Session, id_value: int):
+        membresia = super().delete(db, id_value)
+        acceso_cache.clear()
+        return membresia
@@ -0,0 +1,92 @@
+# app/services/mqtt_metrics.py
+import threading
+from typing import Dict, Tuple
+
+from app.services.acceso_metrics import BUCKETS, Histograma
+
+# Round-trip de ACKs: los dispositivos lentos tardan segundos, no milisegundos
+BUCKETS_ACK = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# nombre -> (tipo, ayuda)
+METRICAS = {
+    "mqtt_publicaciones_total": ("counter", "Mensajes publicados (confirmados por paho) por vía."),
+    "mqtt_publicaciones_fallidas_total": ("counter", "Publicaciones fallidas o abortadas por vía."),
+    "mqtt_ack_seconds": ("histogram", "Round-trip comando -> ACK por dispositivo."),
+    "mqtt_acks_total": ("counter", "ACKs recibidos por dispositivo y resultado."),
+    "mqtt_ack_timeouts_total": ("counter", "Comandos sin ACK dentro del plazo por dispositivo."),
+    "mqtt_mensajes_recibidos_total": ("counter", "Mensajes entrantes por topic."),
+    "mqtt_conexiones_total": ("counter", "Conexiones exitosas al broker."),
+    "mqtt_reconexiones_total": ("counter", "Conexiones al broker tras la primera."),
+    "mqtt_desconexiones_total": ("counter", "Desconexiones del broker."),
+    "mqtt_broadcast_seconds": ("histogram", "Fan-out de un evento MQTT a los WebSockets."),
+    "mqtt_conectado": ("gauge", "1 si el cliente está conectado al broker."),
+    "mqtt_comandos_pendientes": ("gauge", "Comandos esperando ACK."),
+    "mqtt_outbox_profundidad": ("gauge", "Mensajes en la cola de salida en memoria."),
+    "mqtt_spool_pendientes": ("gauge", "Mensajes en el spool en disco."),
+    "ws_conexiones": ("gauge", "Conexiones WebSocket activas."),
+    "ws_pendientes": ("gauge", "Mensajes en las colas de los WebSockets."),
+}
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _etiquetas(clave: Tuple[Tuple[str, str], ...]) -> str:
+    if not clave:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in clave) + "}"
+
+
+class MqttMetrics:
+    """
+    Contadores e histogramas del cliente MQTT (se escriben desde el hilo de
+    paho, el outbox y el loop), exportados en formato de texto de Prometheus.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores: Dict[Tuple[str, tuple], float] = {}
+        self._histogramas: Dict[Tuple[str, tuple], Histograma] = {}
+
+    def contar(self, nombre: str, n: float = 1, **etiquetas) -> None:
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + n
+
+    def observar(self, nombre: str, segundos: float, *,
+                 buckets: Tuple[float, ...] = BUCKETS, **etiquetas) -> None:
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            hist = self._histogramas.get(clave)
+            if hist is None:
+                hist = self._histogramas[clave] = Histograma(buckets)
+            hist.observar(segundos)
+
+    def render(self, gauges: Dict[str, float] | None = None) -> str:
+        lineas: Dict[str, list] = {}
+        with self._lock:
+            for (nombre, clave), valor in sorted(self._contadores.items()):
+                lineas.setdefault(nombre, []).append(f"{nombre}{_etiquetas(clave)} {valor:g}")
+            for (nombre, clave), hist in sorted(self._histogramas.items()):
+                salida = lineas.setdefault(nombre, [])
+                acumulado = 0
+                for limite, n in zip(hist.buckets + (float("inf"),), hist.cubetas):
+                    acumulado += n
+                    le = "+Inf" if limite == float("inf") else repr(limite)
+                    salida.append(f"{nombre}_bucket{_etiquetas(clave + (('le', le),))} {acumulado}")
+                salida.append(f"{nombre}_sum{_etiquetas(clave)} {hist.suma:.6f}")
+                salida.append(f"{nombre}_count{_etiquetas(clave)} {hist.total}")
+        for nombre, valor in (gauges or {}).items():
+            lineas.setdefault(nombre, []).append(f"{nombre} {valor:g}")
+
+        texto = []
+        for nombre, muestras in lineas.items():
+            tipo, ayuda = METRICAS.get(nombre, ("untyped", ""))
+            texto.append(f"# HELP {nombre} {ayuda}")
+            texto.append(f"# TYPE {nombre} {tipo}")
+            texto.extend(muestras)
+        return "\n".join(texto) + "\n"
+
+
+# Singleton global
+mqtt_metrics = MqttMetrics()
@@ -0,0 +1,92 @@
+# app/services/mqtt_spool.py
+import json
+import os
+import threading
+from typing import List
+
+
+class MqttSpool:
+    """
+    Spool en disco, append-only (JSON por línea), para mensajes MQTT que no
+    se pudieron publicar (broker caído). Acotado a `max_mensajes`: al
+    superarlo se descartan los más antiguos.
+    """
+    def __init__(self, path: str, max_mensajes: int):
+        self.path = path
+        self.max_mensajes = max_mensajes
+        self._lock = threading.Lock()
+        self._n = self._contar()
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _contar(self) -> int:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return sum(1 for linea in f if linea.strip())
+        except FileNotFoundError:
+            return 0
+
+    def _escribir(self, mensajes: List[dict]) -> None:
+        """Reescritura atómica (tmp + replace)."""
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for m in mensajes:
+                f.write(json.dumps(m, ensure_ascii=False, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._n = len(mensajes)
+
+    def append(self, mensajes: List[dict]) -> int:
+        """Agrega al final (fsync). Devuelve cuántos antiguos se descartaron."""
+        if not mensajes:
+            return 0
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                for m in mensajes:
+                    f.write(json.dumps(m, ensure_ascii=False, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._n += len(mensajes)
+            if self._n <= self.max_mensajes:
+                return 0
+            todos = self._leer()
+            descartados = len(todos) - self.max_mensajes
+            self._escribir(todos[descartados:])
+            return descartados
+
+    def _leer(self) -> List[dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lineas = [l for l in f if l.strip()]
+        except FileNotFoundError:
+            return []
+        mensajes = []
+        for linea in lineas:
+            try:
+                mensajes.append(json.loads(linea))
+            except ValueError:
+                continue  # línea truncada por un corte: se ignora
+        return mensajes
+
+    def leer(self) -> List[dict]:
+        """Todos los mensajes, en orden de llegada."""
+        with self._lock:
+            return self._leer()
+
+    def reemplazar(self, mensajes: List[dict]) -> None:
+        """Deja en el spool solo `mensajes` (lo que falta por reenviar)."""
+        with self._lock:
+            if mensajes:
+                self._escribir(mensajes)
+            else:
+                self._vaciar()
+
+    def _vaciar(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        self._n = 0
@@ -0,0 +1,70 @@
+# app/services/reportes_cache.py
+import hashlib
+import json
+import threading
+import time
+from datetime import date
+from typing import Any, Callable, Dict, Tuple
+
+from app.core.config import settings
+
+
+class ReporteCacheado:
+    __slots__ = ("valor", "etag", "dia", "cargado_en")
+
+    def __init__(self, valor: Any, etag: str):
+        self.valor = valor
+        self.etag = etag
+        self.dia = date.today()
+        self.cargado_en = time.monotonic()
+
+
+def calcular_etag(valor: Any) -> str:
+    """ETag fuerte: hash del JSON canónico del resultado."""
+    crudo = json.dumps(valor, sort_keys=True, default=str).encode()
+    return '"' + hashlib.sha1(crudo).hexdigest()[:20] + '"'
+
+
+class ReportesCache:
+    """
+    Cache en memoria (por proceso) de resultados de ReportesService,
+    indexada por (método, argumentos).
+    - Una entrada caduca al cambiar el día o tras `ttl` segundos (cubre
+      escrituras hechas por otros procesos/workers).
+    - Los servicios que escriben asistencia, venta_membresia o cliente
+      llaman a invalidate().
+    """
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entradas: Dict[Tuple[str, tuple], ReporteCacheado] = {}
+        self._generacion = 0
+
+    def _vigente(self, entrada: ReporteCacheado) -> bool:
+        return entrada.dia == date.today() and (time.monotonic() - entrada.cargado_en) < self.ttl
+
+    def obtener(self, nombre: str, args: tuple, calcular: Callable[[], Any]) -> Tuple[Any, str]:
+        """(valor, etag) desde cache o calculándolo (fuera del lock)."""
+        clave = (nombre, args)
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and self._vigente(entrada):
+                return entrada.valor, entrada.etag
+            generacion = self._generacion
+
+        valor = calcular()
+        entrada = ReporteCacheado(valor, calcular_etag(valor))
+        with self._lock:
+            # Si hubo una escritura mientras se calculaba, el valor puede ser viejo
+            if self._generacion == generacion:
+                self._entradas[clave] = entrada
+        return entrada.valor, entrada.etag
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+            self._generacion += 1
+
+
+# Singleton global
+reportes_cache = ReportesCache(ttl=settings.REPORTES_CACHE_TTL)
@@ -1,15 +1,36 @@
-from datetime import date, timedelta, datetime, time
-from sqlalchemy import func, select, desc, case, and_, extract
+from datetime import date, timedelta
+from sqlalchemy import func, select, case, and_, extract
 from sqlalchemy.orm import Session
+from app.models.cliente import Cliente
 from app.models.venta_membresia import VentaMembresia
 from typing import List, Dict
-from app.models.asistencia import Asistencia
+from app.models.asistencia_diaria import AsistenciaDiaria
+
+
+# ---------- Ventanas [inicio, fin) de cada serie ----------
+def _ventana_diaria(hoy: date, dias: int):
+    fin = hoy + timedelta(days=1)
+    return fin - timedelta(days=dias), fin
+
+
+def _ventana_mensual(hoy: date, meses: int):
+    y, m = hoy.year, hoy.month - (meses - 1)
+    while m <= 0:
+        m += 12
+        y -= 1
+    fin = date(hoy.year + 1, 1, 1) if hoy.month == 12 else date(hoy.year, hoy.month + 1, 1)
+    return date(y, m, 1), fin
+
+
+def _ventana_anual(hoy: date, anios: int):
+    return date(hoy.year - (anios - 1), 1, 1), date(hoy.year + 1, 1, 1)
 
 
 class ReportesService:
     """
     Reportes agregados sobre el estado de membresías por cliente.
-    Toma la última venta por cliente (fecha_inicio más reciente).
+    Toma la última venta por cliente (fecha_inicio más reciente), vía
+    el puntero cliente.id_venta_actual.
     """
 
     def resumen_membresias(self, db: Session, dias_alerta: int = 5) -> dict:
@@ -22,21 +43,8 @@ class ReportesService:
           "vencidos": int
         }
         """
-        # 1) Subconsulta: última venta por cliente usando ventana
-        rn = func.row_number().over(
-            partition_by=VentaMembresia.id_cliente,
-            order_by=(desc(VentaMembresia.fecha_inicio), desc(VentaMembresia.id))
-        ).label("rn")
-
-        latest_sq = (
-            select(
-                VentaMembresia.id_cliente,
-                VentaMembresia.fecha_inicio,
-                VentaMembresia.fecha_fin,
-                # VentaMembresia.estado,  # descomenta si quieres condicionar por estado
-                rn,
-            )
-        ).subquery("latest")
+        # 1) Última venta por cliente: puntero mantenido cliente.id_venta_actual
+        vm = VentaMembresia
 
         # 2) Fechas de referencia
         hoy: date = date.today()
@@ -45,21 +53,21 @@ class ReportesService:
         # 3) Clasificaciones
         # Activo: hoy ∈ [inicio, fin]
         activo_case = case(
-            ((latest_sq.c.fecha_inicio <= hoy) & (latest_sq.c.fecha_fin >= hoy), 1),
+            ((vm.fecha_inicio <= hoy) & (vm.fecha_fin >= hoy), 1),
             else_=0
         )
         # Próximo a vencer: activo y fin < hoy + dias_alerta
         prox_case = case(
             (
-                (latest_sq.c.fecha_inicio <= hoy)
-                & (latest_sq.c.fecha_fin >= hoy)
-                & (latest_sq.c.fecha_fin < corte),
+                (vm.fecha_inicio <= hoy)
+                & (vm.fecha_fin >= hoy)
+                & (vm.fecha_fin < corte),
                 1
             ),
             else_=0
         )
         # Vencido: fin < hoy
-        vencido_case = case((latest_sq.c.fecha_fin < hoy, 1), else_=0)
+        vencido_case = case((vm.fecha_fin < hoy, 1), else_=0)
 
         stmt = (
             select(
@@ -68,7 +76,8 @@ class ReportesService:
                 func.sum(prox_case).label("proximos_vencer"),
                 func.sum(vencido_case).label("vencidos"),
             )
-            .where(latest_sq.c.rn == 1)
+            .select_from(Cliente)
+            .join(vm, vm.id == Cliente.id_venta_actual)
         )
 
         row = db.execute(stmt).one()
@@ -79,78 +88,61 @@ class ReportesService:
             "vencidos": int(row.vencidos or 0),
         }
 
+    # Asistencias de clientes (con venta): el staff y los intentos sin
+    # membresía no cuentan. Todo se lee del rollup asistencia_diaria.
+    _SOLO_CLIENTES = AsistenciaDiaria.con_venta.is_(True)
+
     # ---------- RESUMEN: hoy / mes / año ----------
     def resumen_asistencias(self, db: Session) -> dict:
         hoy = date.today()
+        R = AsistenciaDiaria
 
-        # Límites por rango
-        start_dia = datetime.combine(hoy, time.min)
-        end_dia   = start_dia + timedelta(days=1)
-
-        start_mes = start_dia.replace(day=1)
+        start_mes = hoy.replace(day=1)
         # siguiente mes:
         if start_mes.month == 12:
             next_month = start_mes.replace(year=start_mes.year + 1, month=1, day=1)
         else:
             next_month = start_mes.replace(month=start_mes.month + 1, day=1)
 
-        start_anio = start_dia.replace(month=1, day=1)
-        next_year  = start_anio.replace(year=start_anio.year + 1, month=1, day=1)
-
-        # Filters: Exclude Staff (id_venta is NULL)
-        common_filters = [Asistencia.id_venta != None]
+        start_anio = hoy.replace(month=1, day=1)
+        next_year  = start_anio.replace(year=start_anio.year + 1)
 
-        q_dia = select(func.count()).where(
-            and_(
-                Asistencia.fecha_hora_entrada >= start_dia,
-                Asistencia.fecha_hora_entrada <  end_dia,
-                *common_filters
-            )
-        )
-        q_mes = select(func.count()).where(
-            and_(
-                Asistencia.fecha_hora_entrada >= start_mes,
-                Asistencia.fecha_hora_entrada <  next_month,
-                *common_filters
-            )
-        )
-        q_anio = select(func.count()).where(
-            and_(
-                Asistencia.fecha_hora_entrada >= start_anio,
-                Asistencia.fecha_hora_entrada <  next_year,
-                *common_filters
-            )
-        )
-
-        dia  = db.execute(q_dia).scalar_one()
-        mes  = db.execute(q_mes).scalar_one()
-        anio = db.execute(q_anio).scalar_one()
+        # Una sola lectura del año en curso (≤ 366 días × sedes × 4 filas)
+        stmt = select(
+            func.sum(case((R.fecha == hoy, R.total), else_=0)).label("dia"),
+            func.sum(case((and_(R.fecha >= start_mes, R.fecha < next_month), R.total), else_=0)).label("mes"),
+            func.sum(R.total).label("anio"),
+        ).where(and_(
+            R.fecha >= start_anio,
+            R.fecha <  next_year,
+            self._SOLO_CLIENTES,
+        ))
+        row = db.execute(stmt).one()
 
         return {
-            "diarias_hoy": int(dia),
-            "mensuales_actual": int(mes),
-            "anuales_actual": int(anio),
+            "diarias_hoy": int(row.dia or 0),
+            "mensuales_actual": int(row.mes or 0),
+            "anuales_actual": int(row.anio or 0),
         }
 
     # ---------- SERIES: diarias en los últimos N días ----------
     def serie_asistencias_diarias(self, db: Session, dias: int = 30) -> List[Dict]:
         """
         Retorna [{"fecha": "YYYY-MM-DD", "total": N}, ...] para los últimos `dias`.
-        Only clients (id_venta != None).
+        Only clients (con_venta).
         """
-        fin   = datetime.combine(date.today(), time.min) + timedelta(days=1)
-        inicio = fin - timedelta(days=dias)
+        R = AsistenciaDiaria
+        inicio, fin = _ventana_diaria(date.today(), dias)
 
         stmt = (
-            select(func.date(Asistencia.fecha_hora_entrada).label("dia"),
-                   func.count().label("total"))
+            select(R.fecha.label("dia"), func.sum(R.total).label("total"))
             .where(and_(
-                Asistencia.fecha_hora_entrada >= inicio,
-                Asistencia.fecha_hora_entrada <  fin,
-                Asistencia.id_venta != None
+                R.fecha >= inicio,
+                R.fecha <  fin,
+                self._SOLO_CLIENTES,
             ))
-            .group_by("dia")
-            .order_by("dia")
+            .group_by(R.fecha)
+            .order_by(R.fecha)
         )
         rows = db.execute(stmt).all()
         return [{"fecha": r.dia.isoformat(), "total": int(r.total)} for r in rows]
@@ -159,32 +151,21 @@ class ReportesService:
     def serie_asistencias_mensuales(self, db: Session, meses: int = 12) -> List[Dict]:
         """
         Retorna [{"anio": 2025, "mes": 9, "total": N}, ...]
-        Only clients (id_venta != None).
+        Only clients (con_venta).
         """
-        hoy = date.today()
-        start_mes = date(hoy.year, hoy.month, 1)
-        y, m = start_mes.year, start_mes.month
-        m -= (meses - 1)
-        while m <= 0:
-            m += 12
-            y -= 1
-        inicio = datetime.combine(date(y, m, 1), time.min)
-
-        if hoy.month == 12:
-            fin = datetime.combine(date(hoy.year + 1, 1, 1), time.min)
-        else:
-            fin = datetime.combine(date(hoy.year, hoy.month + 1, 1), time.min)
+        R = AsistenciaDiaria
+        inicio, fin = _ventana_mensual(date.today(), meses)
 
         stmt = (
             select(
-                extract("year", Asistencia.fecha_hora_entrada).label("anio"),
-                extract("month", Asistencia.fecha_hora_entrada).label("mes"),
-                func.count().label("total"),
+                extract("year", R.fecha).label("anio"),
+                extract("month", R.fecha).label("mes"),
+                func.sum(R.total).label("total"),
             )
             .where(and_(
-                Asistencia.fecha_hora_entrada >= inicio,
-                Asistencia.fecha_hora_entrada <  fin,
-                Asistencia.id_venta != None
+                R.fecha >= inicio,
+                R.fecha <  fin,
+                self._SOLO_CLIENTES,
             ))
             .group_by("anio", "mes")
             .order_by("anio", "mes")
@@ -196,24 +177,82 @@ class ReportesService:
     def serie_asistencias_anuales(self, db: Session, anios: int = 5) -> List[Dict]:
         """
         Retorna [{"anio": 2021, "total": N}, ...]
-        Only clients (id_venta != None).
+        Only clients (con_venta).
         """
-        anio_actual = date.today().year
-        inicio = datetime.combine(date(anio_actual - (anios - 1), 1, 1), time.min)
-        fin    = datetime.combine(date(anio_actual + 1, 1, 1), time.min)
+        R = AsistenciaDiaria
+        inicio, fin = _ventana_anual(date.today(), anios)
 
         stmt = (
             select(
-                extract("year", Asistencia.fecha_hora_entrada).label("anio"),
-                func.count().label("total"),
+                extract("year", R.fecha).label("anio"),
+                func.sum(R.total).label("total"),
             )
             .where(and_(
-                Asistencia.fecha_hora_entrada >= inicio,
-                Asistencia.fecha_hora_entrada <  fin,
-                Asistencia.id_venta != None
+                R.fecha >= inicio,
+                R.fecha <  fin,
+                self._SOLO_CLIENTES,
             ))
             .group_by("anio")
             .order_by("anio")
         )
         rows = db.execute(stmt).all()
-        return [{"anio": int(r.anio), "total": int(r.total)} for r in rows]
\ No newline at end of file
+        return [{"anio": int(r.anio), "total": int(r.total)} for r in rows]
+
+    # ---------- DASHBOARD: todo en una sesión y dos sentencias ----------
+    def dashboard(self, db: Session, *, dias: int = 30, meses: int = 12,
+                  anios: int = 5, dias_alerta: int = 5) -> dict:
+        """
+        Lo mismo que resumen_membresias + resumen_asistencias + las tres
+        series, con dos consultas: el resumen de membresías y UNA lectura
+        del rollup (totales por día en la ventana más amplia) que se
+        pliega en memoria a resumen, días, meses y años.
+        """
+        hoy = date.today()
+        ventanas = {
+            "diarias": _ventana_diaria(hoy, dias),
+            "mensuales": _ventana_mensual(hoy, meses),
+            "anuales": _ventana_anual(hoy, anios),
+        }
+        # Las ventanas terminan en el mes/año en curso: cubren también el resumen
+        inicio = min(v[0] for v in ventanas.values())
+        fin = max(v[1] for v in ventanas.values())
+
+        R = AsistenciaDiaria
+        stmt = (
+            select(R.fecha, func.sum(R.total).label("total"))
+            .where(and_(R.fecha >= inicio, R.fecha < fin, self._SOLO_CLIENTES))
+            .group_by(R.fecha)
+            .order_by(R.fecha)
+        )
+        por_dia = [(r.fecha, int(r.total)) for r in db.execute(stmt).all()]
+
+        def en(ventana, fecha):
+            return ventana[0] <= fecha < ventana[1]
+
+        por_mes: Dict[tuple, int] = {}
+        por_anio: Dict[int, int] = {}
+        for fecha, total in por_dia:
+            if en(ventanas["mensuales"], fecha):
+                clave = (fecha.year, fecha.month)
+                por_mes[clave] = por_mes.get(clave, 0) + total
+            if en(ventanas["anuales"], fecha):
+                por_anio[fecha.year] = por_anio.get(fecha.year, 0) + total
+
+        return {
+            "membresias": self.resumen_membresias(db, dias_alerta=dias_alerta),
+            "asistencias": {
+                "diarias_hoy": sum(t for f, t in por_dia if f == hoy),
+                "mensuales_actual": por_mes.get((hoy.year, hoy.month), 0),
+                "anuales_actual": por_anio.get(hoy.year, 0),
+            },
+            "diarias": [
+                {"fecha": f.isoformat(), "total": t}
+                for f, t in por_dia if en(ventanas["diarias"], f)
+            ],
+            "mensuales": [
+                {"anio": y, "mes": m, "total": t} for (y, m), t in sorted(por_mes.items())
+            ],
+            "anuales": [
+                {"anio": y, "total": t} for y, t in sorted(por_anio.items())
+            ],
+        }
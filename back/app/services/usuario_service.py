@@ -3,12 +3,17 @@ from sqlalchemy.orm import Session
 from app.repositories.usuario_repository import UsuarioRepository
 from app.core.security import get_password_hash
 from app.models.usuario import Usuario
+from app.services.acceso_cache import acceso_cache, staff_cache
 from .base_service import BaseService
 
 class UsuarioService(BaseService):
     def __init__(self):
         super().__init__(UsuarioRepository())
 
+    # Recarga el set de staff (pocas filas) tras cambios en id_cliente/activo
+    def _refrescar_staff(self, db: Session):
+        staff_cache.reemplazar(self.repository.get_staff_cliente_ids(db))
+
     def create(self, db: Session, obj_in):
         # Convertimos Pydantic a dict
         user_data = obj_in.dict()
@@ -27,6 +32,9 @@ class UsuarioService(BaseService):
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
+        if db_obj.id_cliente is not None:
+            self._refrescar_staff(db)
+        acceso_cache.invalidate_cliente(db_obj.id_cliente)
         return db_obj
 
     def update(self, db: Session, id_value: int, obj_in):
@@ -35,6 +43,8 @@ class UsuarioService(BaseService):
             raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
         update_data = obj_in.dict(exclude_unset=True)
+        cliente_anterior = db_obj.id_cliente
+        activo_anterior = db_obj.activo
         
         # Si viene contraseña, la hasheamos y actualizamos contraseña_hash
         if "contraseña" in update_data:
@@ -47,4 +57,17 @@ class UsuarioService(BaseService):
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
+        if (cliente_anterior, activo_anterior) != (db_obj.id_cliente, db_obj.activo):
+            self._refrescar_staff(db)
+        acceso_cache.invalidate_cliente(cliente_anterior)
+        acceso_cache.invalidate_cliente(db_obj.id_cliente)
         return db_obj
+
+    def delete(self, db: Session, id_value: int):
+        db_obj = self.repository.get_by_id(db, id_value)
+        cliente_id = db_obj.id_cliente if db_obj else None
+        usuario = super().delete(db, id_value)
+        if cliente_id is not None:
+            self._refrescar_staff(db)
+        acceso_cache.invalidate_cliente(cliente_id)
+        return usuario
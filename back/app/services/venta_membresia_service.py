@@ -1,6 +1,54 @@
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
 from app.repositories.venta_membresia_repository import VentaMembresiaRepository
+from app.repositories.cliente_repository import ClienteRepository
+from app.services.acceso_cache import acceso_cache
+from app.services.reportes_cache import reportes_cache
 from .base_service import BaseService
 
 class VentaMembresiaService(BaseService):
     def __init__(self):
         super().__init__(VentaMembresiaRepository())
+        self.cliente_repo = ClienteRepository()
+
+    # Toda escritura de ventas recalcula el puntero cliente.id_venta_actual
+    # en la MISMA transacción: flush de la venta, UPDATE del puntero y un
+    # único commit (nunca queda una venta guardada con el puntero viejo).
+    def _guardar(self, db: Session, *cliente_ids):
+        db.flush()
+        self.cliente_repo.actualizar_venta_actual(db, *cliente_ids)
+        db.commit()
+
+    def create(self, db: Session, obj_in):
+        venta = self.repository.model(**obj_in.dict())
+        db.add(venta)
+        self._guardar(db, venta.id_cliente)
+        db.refresh(venta)
+        acceso_cache.invalidate_cliente(venta.id_cliente)
+        reportes_cache.invalidate()
+        return venta
+
+    def update(self, db: Session, id_value: int, obj_in):
+        venta = self.repository.get_by_id(db, id_value)
+        if not venta:
+            raise HTTPException(status_code=404, detail="Recurso no encontrado")
+        cliente_anterior = venta.id_cliente
+        for field, value in obj_in.dict(exclude_unset=True).items():
+            setattr(venta, field, value)
+        self._guardar(db, cliente_anterior, venta.id_cliente)
+        db.refresh(venta)
+        acceso_cache.invalidate_cliente(cliente_anterior)
+        acceso_cache.invalidate_cliente(venta.id_cliente)
+        reportes_cache.invalidate()
+        return venta
+
+    def delete(self, db: Session, id_value: int):
+        venta = self.repository.get_by_id(db, id_value)
+        if not venta:
+            raise HTTPException(status_code=404, detail="Recurso no encontrado")
+        cliente_id = venta.id_cliente
+        db.delete(venta)
+        self._guardar(db, cliente_id)
+        acceso_cache.invalidate_cliente(cliente_id)
+        reportes_cache.invalidate()
+        return venta
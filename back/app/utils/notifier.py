@@ -1,13 +1,5 @@
 # app/utils/notifier.py
-import json
-import os
-from paho.mqtt import publish
-
-# Cargar configuración desde variables de entorno (.env)
-BROKER_IP = os.getenv("MQTT_BROKER_IP", "127.0.0.1")
-MQTT_PORT = int(os.getenv("MQTT_PORT", "1883"))
-MQTT_USER = os.getenv("MQTT_USER", "backend")
-MQTT_PASS = os.getenv("MQTT_PASS", "backendpass")
+from app.mqtt_client import mqtt_client
 
 # 🔹 Topic unificado con el frontend
 TOPIC_EVENTO = "devices/pasto/gym/event"
@@ -16,6 +8,7 @@ TOPIC_EVENTO = "devices/pasto/gym/event"
 def notificar_asistencia(asistencia):
     """
     Envía una notificación MQTT cuando se registra un acceso (permitido o denegado).
+    No bloquea: encola el mensaje en la outbox del MQTTClient (conexión persistente).
     Puede recibir:
       - Un objeto SQLAlchemy `Asistencia`, o
       - Un diccionario `payload` ya estructurado desde el servicio.
@@ -54,18 +47,13 @@ def notificar_asistencia(asistencia):
                 ),
             }
 
-        # 🚀 Publicar mensaje MQTT
-        message = json.dumps(payload, ensure_ascii=False)
-        publish.single(
-            topic=TOPIC_EVENTO,
-            payload=message,
-            hostname=BROKER_IP,
-            port=MQTT_PORT,
-            auth={"username": MQTT_USER, "password": MQTT_PASS},
-        )
+        # 🚀 Encolar mensaje MQTT (lo publica el hilo de la outbox)
+        encolado = mqtt_client.enqueue_json(TOPIC_EVENTO, payload, qos=1)
 
         status = "✅" if payload.get("permitido") else "🚫"
-        print(f"{status} MQTT -> {BROKER_IP}:{MQTT_PORT} [{payload['nombre']}] -> {payload['mensaje']}")
+        if not encolado:
+            status += " ⚠️ outbox llena, se descartó el evento más antiguo"
+        print(f"{status} MQTT encolado [{payload['nombre']}] -> {payload['mensaje']}")
 
     except Exception as e:
         print(f"⚠️ Error enviando notificación MQTT: {e}")
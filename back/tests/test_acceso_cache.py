@@ -0,0 +1,115 @@
+# tests/test_acceso_cache.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import acceso_cache as cache_mod
+from app.services import acceso_service as service_mod
+from app.services.acceso_cache import AccesoCache, AccesoEntry
+from app.services.acceso_metrics import Cronometro
+
+
+def _fila(cliente_id=1, *, max_accesos=None, accesos_hoy=0):
+    return SimpleNamespace(
+        id=cliente_id, nombre="Ana", apellido="Paz", documento=f"doc-{cliente_id}",
+        fotografia=None, id_huella=100 + cliente_id,
+        id_venta=10, fecha_fin=None, sesiones_restantes=None,
+        nombre_membresia="Mensual", max_accesos_diarios=max_accesos, accesos_hoy=accesos_hoy,
+    )
+
+
+def _entry(cliente_id=1, **kw):
+    return AccesoEntry.desde_fila(_fila(cliente_id, **kw), es_staff=False)
+
+
+def test_put_y_get_por_huella_y_documento():
+    cache = AccesoCache(ttl=30)
+    entry = _entry()
+    assert cache.put(entry, cache.generacion)
+    assert cache.get(id_huella=101) is entry
+    assert cache.get(documento="doc-1") is entry
+
+
+def test_put_rechazado_si_hubo_invalidacion_durante_la_carga():
+    cache = AccesoCache(ttl=30)
+    generacion = cache.generacion   # antes del SELECT
+    cache.invalidate_cliente(2)     # escritura concurrente (de cualquier cliente)
+    assert not cache.put(_entry(), generacion)
+    assert cache.get(id_huella=101) is None
+    assert cache.put(_entry(), cache.generacion)
+
+
+def test_invalidate_y_clear_borran_y_suben_generacion():
+    cache = AccesoCache(ttl=30)
+    cache.put(_entry(1), cache.generacion)
+    cache.put(_entry(2), cache.generacion)
+    g = cache.generacion
+    cache.invalidate_cliente(1)
+    assert cache.get(documento="doc-1") is None
+    assert cache.get(documento="doc-2") is not None
+    cache.clear()
+    assert cache.get(documento="doc-2") is None
+    assert cache.generacion == g + 2
+    cache.invalidate_cliente(None)
+    assert cache.generacion == g + 2
+
+
+def test_entrada_caduca_tras_ttl(monkeypatch):
+    cache = AccesoCache(ttl=30)
+    ahora = [1000.0]
+    monkeypatch.setattr(cache_mod.time, "monotonic", lambda: ahora[0])
+    cache.put(_entry(), cache.generacion)
+    ahora[0] += 29
+    assert cache.get(id_huella=101) is not None
+    ahora[0] += 2
+    assert cache.get(id_huella=101) is None
+
+
+class DbFalsa:
+    def __init__(self):
+        self.agregados = []
+        self.commits = 0
+
+    def add(self, obj):
+        obj.id = len(self.agregados) + 1
+        self.agregados.append(obj)
+
+    async def flush(self):
+        pass
+
+    async def commit(self):
+        self.commits += 1
+
+
+@pytest.fixture
+def servicio(monkeypatch):
+    servicio = service_mod.AccesoService()
+    monkeypatch.setattr(service_mod, "notificar_asistencia", lambda payload: None)
+    monkeypatch.setattr(service_mod, "acceso_cache", AccesoCache(ttl=30))
+
+    async def nada(*args, **kw):
+        return None
+
+    monkeypatch.setattr(servicio.asistencia_diaria_repo_async, "incrementar", nada)
+    monkeypatch.setattr(servicio.acceso_diario_repo_async, "incrementar", nada)
+    return servicio
+
+
+@pytest.mark.parametrize("en_db, permitido", [(1, True), (2, True), (3, False)])
+def test_limite_diario_se_verifica_contra_la_db(servicio, monkeypatch, en_db, permitido):
+    # La entrada cacheada cree que hoy no hubo accesos; la DB (otro worker) dice otra cosa
+    async def incrementar_y_leer(db, cliente_id, dia):
+        return en_db  # incluye el acceso actual
+
+    monkeypatch.setattr(servicio.acceso_diario_repo_async, "incrementar_y_leer", incrementar_y_leer)
+    entry = _entry(max_accesos=2, accesos_hoy=0)
+    db = DbFalsa()
+
+    respuesta = asyncio.run(servicio._decidir_async(
+        db, entry, tipo_acceso="huella", id_sede=1, crono=Cronometro()
+    ))
+
+    assert respuesta["permitido"] is permitido
+    assert entry.accesos_hoy == en_db - 1
+    assert db.commits == 1 and len(db.agregados) == 1
@@ -0,0 +1,108 @@
+# tests/test_asistencia_diaria.py
+import asyncio
+from collections import Counter
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+import app.models  # noqa: F401  (registra todos los mappers)
+from app.db.base_class import Base
+from app.models.asistencia import Asistencia
+from app.models.asistencia_diaria import AsistenciaDiaria
+from app.models.sede import Sede
+from app.repositories.asistencia_diaria_repository import (
+    AsistenciaDiariaRepository,
+    AsyncAsistenciaDiariaRepository,
+    clave_rollup,
+)
+
+DIA = date(2026, 3, 10)
+OTRO_DIA = date(2026, 3, 11)
+
+
+def _asistencia(id_sede, fecha_hora, motivo_error=None, id_venta=1):
+    return Asistencia(
+        id_cliente=1, id_sede=id_sede, id_venta=id_venta, fecha_hora_entrada=fecha_hora,
+        tipo_acceso="huella", motivo_error=motivo_error,
+    )
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(
+        engine, tables=[Sede.__table__, Asistencia.__table__, AsistenciaDiaria.__table__]
+    )
+    with Session(engine) as db:
+        db.add_all([Sede(id=1, nombre_sede="Centro"), Sede(id=2, nombre_sede="Norte")])
+        db.add_all([
+            _asistencia(1, datetime(2026, 3, 10, 7, 0)),
+            _asistencia(1, datetime(2026, 3, 10, 8, 0)),
+            _asistencia(1, datetime(2026, 3, 10, 9, 0), motivo_error="Acceso denegado."),
+            _asistencia(2, datetime(2026, 3, 10, 10, 0), id_venta=None),  # staff
+            _asistencia(None, datetime(2026, 3, 10, 23, 59)),
+            _asistencia(1, datetime(2026, 3, 11, 6, 0)),
+        ])
+        db.commit()
+        yield db
+
+
+def _rollup(db):
+    return {
+        (r.id_sede, r.fecha, r.permitido, r.con_venta): r.total
+        for r in db.execute(select(AsistenciaDiaria)).scalars()
+    }
+
+
+def _desde_asistencia(db, dia=None):
+    conteos = Counter(
+        clave_rollup(a.id_sede, a.fecha_hora_entrada, a.motivo_error, a.id_venta)
+        for a in db.execute(select(Asistencia)).scalars()
+    )
+    return {k: n for k, n in conteos.items() if dia is None or k[1] == dia}
+
+
+def test_reconstruir_todo_coincide_con_asistencia(db):
+    AsistenciaDiariaRepository().reconstruir(db)
+    assert _rollup(db) == _desde_asistencia(db)
+    assert _rollup(db)[(0, DIA, True, True)] == 1  # sin sede -> id_sede 0
+
+
+def test_reconstruir_un_dia_reemplaza_solo_ese_dia(db):
+    repo = AsistenciaDiariaRepository()
+    repo.reconstruir(db)
+    # Filas obsoletas del día y un valor de otro día que no debe tocarse
+    db.add(AsistenciaDiaria(id_sede=9, fecha=DIA, permitido=True, con_venta=True, total=99))
+    db.get(AsistenciaDiaria, (OTRO_DIA, 1, True, True)).total = 42
+    db.flush()
+
+    repo.recalcular_dias(db, [DIA, DIA])
+
+    rollup = _rollup(db)
+    assert {k: n for k, n in rollup.items() if k[1] == DIA} == _desde_asistencia(db, DIA)
+    assert rollup[(1, OTRO_DIA, True, True)] == 42
+
+
+def test_incrementar_varios_agrupa_en_un_executemany():
+    class DbFalsa:
+        def __init__(self):
+            self.llamadas = []
+
+        async def execute(self, stmt, params=None):
+            self.llamadas.append(params)
+
+    filas = [
+        {"id_sede": 1, "fecha_hora_entrada": datetime(2026, 3, 10, 7), "motivo_error": None, "id_venta": 5},
+        {"id_sede": 1, "fecha_hora_entrada": datetime(2026, 3, 10, 9), "motivo_error": None, "id_venta": 5},
+        {"id_sede": None, "fecha_hora_entrada": datetime(2026, 3, 10, 9), "motivo_error": "x", "id_venta": None},
+    ]
+    db = DbFalsa()
+    asyncio.run(AsyncAsistenciaDiariaRepository().incrementar_varios(db, filas))
+
+    assert len(db.llamadas) == 1
+    assert sorted(db.llamadas[0], key=lambda p: p["id_sede"]) == [
+        {"id_sede": 0, "fecha": DIA, "permitido": False, "con_venta": False, "total": 1},
+        {"id_sede": 1, "fecha": DIA, "permitido": True, "con_venta": True, "total": 2},
+    ]
@@ -0,0 +1,90 @@
+# tests/test_dispositivos_bulk.py
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+import app.mqtt_client as mqtt_mod
+from app.api.v1 import dispositivo_mqtt_router as router_mod
+from app.api.v1.dispositivo_mqtt_router import BulkCommandIn, send_command_bulk
+from app.services.dispositivo_registry import DispositivoRegistry
+
+
+class Mensaje:
+    def __init__(self, topic, data, retain=False):
+        self.topic = topic
+        self.payload = json.dumps(data).encode()
+        self.retain = retain
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = DispositivoRegistry(offline_s=60)
+    monkeypatch.setattr(mqtt_mod, "dispositivo_registry", registry)
+    monkeypatch.setattr(router_mod, "dispositivo_registry", registry)
+    return registry
+
+
+@pytest.fixture
+def enviados(monkeypatch):
+    llamadas = []
+
+    async def send_command_many(sede, devices, action, payload=None, timeout=5.0):
+        llamadas.append((sede, list(devices), action, payload))
+        return {d: {"ok": True, "error": None} for d in devices}
+
+    monkeypatch.setattr(router_mod.mqtt_client, "send_command_many", send_command_many)
+    return llamadas
+
+
+def _recibir(topic, data, retain=False):
+    mqtt_mod.mqtt_client.on_message(None, None, Mensaje(topic, data, retain))
+
+
+def test_sin_devices_solo_los_online_con_state(registry, enviados, monkeypatch):
+    monkeypatch.setattr(mqtt_mod.mqtt_client, "_a_loop", lambda coro: coro.close())
+    _recibir("devices/pasto/puerta1/state", {"online": True})
+    _recibir("devices/pasto/puerta2/state", {"online": True}, retain=True)  # retenido: sin señal de vida
+    _recibir("devices/pasto/puerta3/state", {"online": False})               # LWT
+    _recibir("devices/pasto/puerta4/cmd/ack", {"id": "c-x", "ok": True})     # ack sin state
+    _recibir("devices/pasto/gym/event", {"permitido": True})                 # publicado por el backend
+    _recibir("devices/norte/puerta1/state", {"online": True})                # otra sede
+
+    out = asyncio.run(send_command_bulk("pasto", BulkCommandIn(action="open_door")))
+
+    assert enviados == [("pasto", ["puerta1"], "open_door", {"action": "open_door"})]
+    assert (out.total, out.ok) == (1, 1)
+    assert all(d["device"] != "gym" for d in registry.listar())
+
+
+def test_devices_explicitos_no_consultan_el_registro(registry, enviados):
+    body = BulkCommandIn(action="set_led", payload={"color": "green"}, devices=["a", "b"])
+    out = asyncio.run(send_command_bulk("pasto", body))
+
+    assert enviados == [("pasto", ["a", "b"], "set_led", {"action": "set_led", "color": "green"})]
+    assert out.total == 2
+
+
+def test_sin_dispositivos_online_404(registry, enviados):
+    registry.actualizar_state("pasto", "puerta1", {"online": True})
+    registry.offline_s = 0  # fuera de la ventana online
+
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(send_command_bulk("pasto", BulkCommandIn(action="open_door")))
+    assert e.value.status_code == 404
+    assert enviados == []
+
+
+@pytest.mark.parametrize("sede, devices", [("pas+to", None), ("pasto", ["puerta#1"])])
+def test_comodines_en_el_destino_422(registry, enviados, sede, devices):
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(send_command_bulk(sede, BulkCommandIn(action="open_door", devices=devices)))
+    assert e.value.status_code == 422
+    assert enviados == []
+
+
+@pytest.mark.parametrize("data", [[1, 2], 7, "ok", None])
+def test_ack_que_no_es_objeto_se_ignora(registry, data):
+    _recibir("devices/pasto/puerta1/cmd/ack", data)
+    assert registry.listar() == []
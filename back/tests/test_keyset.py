@@ -0,0 +1,84 @@
+# tests/test_keyset.py
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, insert, select
+
+from app.repositories import keyset
+
+metadata = MetaData()
+personas = Table(
+    "personas", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("nombre", String(20), nullable=True),
+)
+# Valores repetidos y NULL: el desempate por id decide el orden
+NOMBRES = ["ana", "bea", None, "ana", "carla", None, "bea", "dora", "ana", "eva", "flor"]
+
+
+@pytest.fixture
+def conn():
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    with engine.connect() as conn:
+        conn.execute(insert(personas), [{"id": i + 1, "nombre": n} for i, n in enumerate(NOMBRES)])
+        yield conn
+
+
+def _pagina(conn, descendente, token, limit=3):
+    cursor = keyset.decodificar_cursor(token, "nombre") if token else None
+    pagina = cursor.pagina if cursor else 1
+    stmt = keyset.aplicar(
+        select(personas.c.id, personas.c.nombre), personas.c.nombre, personas.c.id,
+        descendente, cursor, limit,
+    )
+    ventana = keyset.ventana(conn.execute(stmt).all(), limit, cursor, pagina)
+    siguiente, anterior = ventana.cursores(lambda f: (f.nombre, f.id), "nombre")
+    return [f.id for f in ventana.filas], siguiente, anterior
+
+
+def _esperado(descendente):
+    # Orden de MySQL: NULL es el menor valor
+    filas = sorted(
+        ((n is not None, n or "", i + 1) for i, n in enumerate(NOMBRES)), reverse=descendente
+    )
+    return [i for _, _, i in filas]
+
+
+@pytest.mark.parametrize("descendente", [False, True])
+def test_recorre_todas_las_paginas_hacia_adelante_y_atras(conn, descendente):
+    paginas, tokens = [], [None]
+    ids, siguiente, anterior = _pagina(conn, descendente, None)
+    assert anterior is None
+    paginas.append(ids)
+    while siguiente:
+        tokens.append(siguiente)
+        ids, siguiente, anterior = _pagina(conn, descendente, siguiente)
+        assert anterior is not None
+        paginas.append(ids)
+    assert [i for p in paginas for i in p] == _esperado(descendente)
+    assert len(paginas) == 4
+
+    # Hacia atrás con los cursores "anterior" se recuperan las mismas páginas
+    ids, _, anterior = _pagina(conn, descendente, tokens[-1])
+    for esperada in reversed(paginas[:-1]):
+        ids, siguiente, anterior = _pagina(conn, descendente, anterior)
+        assert ids == esperada
+        assert siguiente is not None
+    assert anterior is None
+
+
+def test_cursor_ida_y_vuelta():
+    token = keyset.codificar_cursor(keyset.Cursor("ana", 7, 3, True, "nombre"))
+    cursor = keyset.decodificar_cursor(token, "nombre")
+    assert (cursor.valor, cursor.id, cursor.pagina, cursor.atras, cursor.orden) == ("ana", 7, 3, True, "nombre")
+
+
+@pytest.mark.parametrize("token", ["%%%", "e30", keyset.codificar_cursor(keyset.Cursor(1, 1, 0, False, "nombre"))])
+def test_cursor_mal_formado(token):
+    with pytest.raises(ValueError):
+        keyset.decodificar_cursor(token, "nombre")
+
+
+def test_cursor_de_otro_orden():
+    token = keyset.codificar_cursor(keyset.Cursor("ana", 1, 2, False, "documento"))
+    with pytest.raises(ValueError):
+        keyset.decodificar_cursor(token, "nombre")
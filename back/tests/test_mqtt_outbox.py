@@ -0,0 +1,148 @@
+# tests/test_mqtt_outbox.py
+import json
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+import pytest
+
+from app.mqtt_client import MQTTClient, _registros_spool as _registros
+from app.services.mqtt_spool import MqttSpool
+
+
+class InfoFalsa:
+    """Imita paho MessageInfo: is_published() lanza si rc != SUCCESS."""
+    def __init__(self, rc, confirma):
+        self.rc = rc
+        self._confirma = confirma
+
+    def wait_for_publish(self, timeout=None):
+        if self.rc != mqtt.MQTT_ERR_SUCCESS:
+            raise RuntimeError("rc != SUCCESS")
+
+    def is_published(self):
+        if self.rc != mqtt.MQTT_ERR_SUCCESS:
+            raise RuntimeError("rc != SUCCESS")
+        return self._confirma
+
+
+class PahoFalso:
+    """publish() según la clave "r" del payload: ok | sin_ack | no_conn | cola_llena | grande | error."""
+    def __init__(self, al_publicar=None):
+        self.intentos = []
+        self.al_publicar = al_publicar
+
+    def publish(self, topic, msg, qos=0, retain=False):
+        if self.al_publicar:
+            self.al_publicar()
+        self.intentos.append(topic)
+        r = json.loads(msg)["r"]
+        if r == "error":
+            raise ValueError("Publish topic cannot contain wildcards.")
+        return {
+            "ok": InfoFalsa(mqtt.MQTT_ERR_SUCCESS, True),
+            "sin_ack": InfoFalsa(mqtt.MQTT_ERR_SUCCESS, False),
+            "no_conn": InfoFalsa(mqtt.MQTT_ERR_NO_CONN, False),
+            "cola_llena": InfoFalsa(mqtt.MQTT_ERR_QUEUE_SIZE, False),
+            "grande": InfoFalsa(mqtt.MQTT_ERR_PAYLOAD_SIZE, False),
+        }[r]
+
+
+def _msg(topic, r, qos=1):
+    return (topic, {"r": r}, qos, False, time.monotonic())
+
+
+@pytest.fixture
+def cliente(tmp_path):
+    c = MQTTClient()
+    c.client = PahoFalso()
+    c._spool = MqttSpool(str(tmp_path / "spool.jsonl"), 100)
+    c._connected.set()
+    return c
+
+
+def test_spool_append_leer_reemplazar_y_maximo(tmp_path):
+    spool = MqttSpool(str(tmp_path / "s.jsonl"), 3)
+    assert spool.append([{"n": 1}, {"n": 2}]) == 0
+    assert spool.append([{"n": 3}, {"n": 4}]) == 1  # descarta el más antiguo
+    assert [m["n"] for m in spool.leer()] == [2, 3, 4]
+    assert len(MqttSpool(spool.path, 3)) == 3          # sobrevive al reinicio
+    spool.reemplazar([{"n": 4}])
+    assert [m["n"] for m in spool.leer()] == [4] and len(spool) == 1
+    spool.reemplazar([])
+    assert spool.leer() == [] and len(spool) == 0
+
+
+def test_publicar_lote_spoolea_solo_lo_reintentable(cliente):
+    lote = [
+        _msg("t/1", "ok"),
+        _msg("t/2", "sin_ack"),          # paho lo reenvía: no va al spool
+        _msg("t/3", "no_conn"),          # QoS 1 sin conexión: paho lo guarda
+        _msg("t/4", "no_conn", qos=0),   # QoS 0 sin conexión: perdido para paho
+        _msg("t/5", "cola_llena"),
+        _msg("t/6", "error"),            # siempre fallaría: se descarta
+        _msg("t/7", "grande"),           # siempre fallaría: se descarta
+    ]
+    rechazados, sin_confirmar = cliente._publicar_lote(lote)
+
+    assert [m[0] for m in rechazados] == ["t/4", "t/5"]
+    assert sin_confirmar == 2
+    stats = cliente.outbox_stats()
+    assert (stats["publicados"], stats["fallidos"], stats["sin_confirmar"], stats["descartados"]) == (1, 2, 2, 2)
+
+
+def test_reenviar_spool_deja_en_disco_lo_que_falta_en_orden(cliente):
+    cliente._a_spool([_msg("t/1", "ok"), _msg("t/2", "cola_llena"), _msg("t/3", "ok")])
+
+    assert not cliente._reenviar_spool()
+
+    assert [m["topic"] for m in cliente._spool.leer()] == ["t/2"]
+    assert cliente.outbox_stats()["spool"]["reenviados"] == 2
+
+
+def test_a_spool_espera_a_que_termine_el_reenvio(cliente):
+    cliente._a_spool([_msg("t/1", "ok")])
+    hilo = threading.Thread(target=cliente._a_spool, args=([_msg("t/nuevo", "ok")],))
+
+    def al_publicar():
+        # _stop_outbox agrega mientras el hilo outbox reenvía el spool
+        if not hilo.is_alive():
+            hilo.start()
+            time.sleep(0.05)
+            assert hilo.is_alive()  # bloqueado en _spool_lock
+
+    cliente.client.al_publicar = al_publicar
+    cliente._reenviar_spool()
+    hilo.join(timeout=2)
+
+    assert [m["topic"] for m in cliente._spool.leer()] == ["t/nuevo"]
+
+
+def test_mensaje_que_siempre_falla_no_queda_en_el_spool(cliente):
+    cliente._spool.append(_registros([_msg("devices/+/x/cmd", "error"), _msg("t/2", "ok")]))
+
+    assert cliente._reenviar_spool()
+
+    assert cliente._spool.leer() == []
+    assert cliente.outbox_stats()["descartados"] == 1
+
+
+def test_spool_atascado_no_gira_ni_frena_la_cola(cliente):
+    cliente._a_spool([_msg("t/atascado", "cola_llena")])
+    cliente.enqueue_json("t/nuevo", {"r": "ok"})
+
+    cliente._start_outbox()
+    time.sleep(0.3)
+    cliente._outbox_stop.set()
+    cliente._outbox_thread.join(timeout=2)
+
+    intentos = cliente.client.intentos
+    assert "t/nuevo" in intentos                 # la cola en memoria sigue saliendo
+    assert intentos.count("t/atascado") == 1     # un reintento por MQTT_SPOOL_RETRY_S
+    assert [m["topic"] for m in cliente._spool.leer()] == ["t/atascado"]
+
+
+def test_enqueue_json_rechaza_comodines(cliente):
+    with pytest.raises(ValueError):
+        cliente.enqueue_json("devices/+/puerta/cmd", {"action": "open_door"})
+    assert cliente.outbox_stats()["encolados"] == 0